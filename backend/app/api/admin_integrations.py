@@ -2,19 +2,64 @@
 Admin integrations management endpoints
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
 from datetime import datetime, timezone
+from app.core.config import settings
 from app.core.dependencies import get_current_admin
 from app.core.database import get_supabase
 from app.services.tuya_service import get_tuya_service
 from app.services.ring_service import get_ring_service
 from app.services.home_assistant_service import get_home_assistant_service
+from app.services.home_assistant_ws import get_home_assistant_stream
+from app.services.reconciliation_service import get_reconciliation_service
+from app.services.device_status import get_device_status_poller
+from app.core.resilience import guard_snapshots
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _device_entry(device: dict) -> dict:
+    """
+    Integration device entry with online/battery from the device status cache
+    """
+    status = get_device_status_poller().get_status(device["id"])
+    return {
+        "id": device["device_id"],
+        "name": device["device_name"],
+        "battery": status["battery"],
+        "online": bool(status["online"]),
+        "stale": status["stale"],
+        "lastSeen": status["checked_at"],
+        "location": "Via Landolina #186"
+    }
+
+
+def _entity_entry(entity_id: str, state: Optional[dict]) -> dict:
+    """
+    Integration device entry for a Home Assistant entity
+    """
+    attributes = (state or {}).get("attributes") or {}
+    return {
+        "id": entity_id,
+        "name": attributes.get("friendly_name") or entity_id,
+        "battery": attributes.get("battery_level"),
+        "online": state is not None and state.get("state") != "unavailable",
+        "stale": False,
+        "lastSeen": (state or {}).get("last_updated"),
+        "location": "Via Landolina #186"
+    }
+
+
+def _last_seen(devices: List[dict]):
+    """
+    Most recent status check across devices (ISO strings sort chronologically)
+    """
+    seen = [d["lastSeen"] for d in devices if d["lastSeen"]]
+    return max(seen) if seen else None
+
+
 @router.get("/status")
 async def get_integrations_status(current_admin: dict = Depends(get_current_admin)):
     """
@@ -72,15 +117,16 @@ async def get_integrations_status(current_admin: dict = Depends(get_current_admi
             "lastSync": None
         })
 
-    # Home Assistant Status
+    # Home Assistant Status (websocket or a recent snapshot answers without a request)
     try:
         ha_service = get_home_assistant_service()
+        healthy = bool(settings.HOME_ASSISTANT_URL) and await ha_service.health_check()
         integrations.append({
             "id": "home_assistant",
             "name": "Home Assistant",
             "type": "home_assistant",
-            "status": "connected",
-            "message": "All services operational",
+            "status": "connected" if healthy else "error",
+            "message": "All services operational" if healthy else "Home Assistant unreachable",
             "lastSync": datetime.now(timezone.utc).isoformat()
         })
     except Exception as e:
@@ -120,15 +166,7 @@ async def get_all_integrations(current_admin: dict = Depends(get_current_admin))
             .eq("is_active", True)\
             .execute()
 
-        ring_devices = []
-        for device in ring_devices_result.data or []:
-            ring_devices.append({
-                "id": device["device_id"],
-                "name": device["device_name"],
-                "battery": 83,  # TODO: Get real battery status from Ring API
-                "online": True,
-                "location": "Via Landolina #186"
-            })
+        ring_devices = [_device_entry(device) for device in ring_devices_result.data or []]
 
         integrations.append({
             "id": "ring",
@@ -139,7 +177,7 @@ async def get_all_integrations(current_admin: dict = Depends(get_current_admin))
             "token": "eyJydCI6ImV5...truncated",
             "tokenExpiry": "2025-12-18T00:00:00Z",
             "devices": ring_devices,
-            "lastSync": datetime.now(timezone.utc).isoformat()
+            "lastSync": _last_seen(ring_devices)
         })
     except Exception as e:
         logger.error(f"Failed to get Ring integration: {e}")
@@ -154,42 +192,61 @@ async def get_all_integrations(current_admin: dict = Depends(get_current_admin))
             .eq("is_active", True)\
             .execute()
 
-        tuya_devices = []
-        for device in tuya_devices_result.data or []:
-            tuya_devices.append({
-                "id": device["device_id"],
-                "name": device["device_name"],
-                "battery": 95 if device["lock_type"] == "main_entrance" else 88,  # TODO: Get real battery
-                "online": True,
-                "location": "Via Landolina #186"
-            })
+        tuya_devices = [_device_entry(device) for device in tuya_devices_result.data or []]
+        online = sum(1 for d in tuya_devices if d["online"] and not d["stale"])
 
         integrations.append({
             "id": "tuya",
             "name": "Tuya Smart Locks",
             "type": "tuya",
-            "status": "connected",
-            "statusMessage": "All devices operational",
+            "status": "connected" if online == len(tuya_devices) else "warning",
+            "statusMessage": (
+                "All devices operational" if online == len(tuya_devices)
+                else f"{online}/{len(tuya_devices)} devices online"
+            ),
             "devices": tuya_devices,
-            "lastSync": datetime.now(timezone.utc).isoformat()
+            "lastSync": _last_seen(tuya_devices)
         })
     except Exception as e:
         logger.error(f"Failed to get Tuya integration: {e}")
 
-    # Home Assistant Integration
+    # Home Assistant Integration (all entities resolved from one /api/states snapshot)
     try:
         ha_service = get_home_assistant_service()
+        entities_result = supabase.table("locks")\
+            .select("ha_entity_id")\
+            .eq("is_active", True)\
+            .not_.is_("ha_entity_id", "null")\
+            .execute()
+        entity_ids = [lock["ha_entity_id"] for lock in entities_result.data or []]
+        if settings.RING_BUTTON_ENTITY_ID:
+            entity_ids.append(settings.RING_BUTTON_ENTITY_ID)
+
+        entity_count = await ha_service.get_entity_count() if settings.HOME_ASSISTANT_URL else None
+        states = await ha_service.get_states(entity_ids) if entity_count is not None else {}
+        ha_devices = [_entity_entry(entity_id, states.get(entity_id)) for entity_id in dict.fromkeys(entity_ids)]
+        available = sum(1 for d in ha_devices if d["online"])
+
+        if entity_count is None:
+            ha_status, ha_message = "error", "Home Assistant unreachable"
+        elif available < len(ha_devices):
+            ha_status, ha_message = "warning", f"{available}/{len(ha_devices)} entities available"
+        else:
+            ha_status, ha_message = "connected", "All services operational"
+
         integrations.append({
             "id": "home_assistant",
             "name": "Home Assistant",
             "type": "home_assistant",
-            "status": "connected",
-            "statusMessage": "All services operational",
+            "status": ha_status,
+            "statusMessage": ha_message,
             "config": {
-                "url": "http://homeassistant.local:8123",
-                "entities": 5  # TODO: Get actual entity count
+                "url": settings.HOME_ASSISTANT_URL,
+                "entities": entity_count,
+                "stream": get_home_assistant_stream().snapshot()
             },
-            "lastSync": datetime.now(timezone.utc).isoformat()
+            "devices": ha_devices,
+            "lastSync": _last_seen(ha_devices)
         })
     except Exception as e:
         logger.error(f"Failed to get Home Assistant integration: {e}")
@@ -197,18 +254,69 @@ async def get_all_integrations(current_admin: dict = Depends(get_current_admin))
     return integrations
 
 
+@router.get("/circuits")
+async def get_integration_circuits(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get circuit breaker and bulkhead state per vendor
+
+    Returns:
+        Dict of vendor -> {state, calls, failures, retry_in, last_error, in_flight, concurrency, timeout_seconds}
+    """
+    logger.info(f"Admin {current_admin['email']} fetching integration circuits")
+    return guard_snapshots()
+
+
 @router.post("/ring/refresh-token")
 async def refresh_ring_token(current_admin: dict = Depends(get_current_admin)):
     """
-    Refresh Ring API token
+    Refresh Ring API token (shared with every worker through integration_tokens)
 
     Returns:
         New token information
     """
     logger.info(f"Admin {current_admin['email']} refreshing Ring token")
 
-    # TODO: Implement actual Ring token refresh
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Ring token refresh not yet implemented"
-    )
+    ring_service = get_ring_service()
+    if not ring_service.is_configured:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ring is not configured"
+        )
+
+    try:
+        expires_at = await ring_service.refresh_access_token()
+    except Exception as e:
+        logger.error(f"Ring token refresh failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Ring token refresh failed: {e}"
+        )
+
+    return {
+        "success": True,
+        "expires_at": expires_at.isoformat(),
+        "refreshed_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+@router.post("/reconcile")
+async def reconcile_device_codes(
+    dry_run: bool = Query(True, description="Only report drift, don't change devices or database"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Diff the codes on every lock against the database
+
+    Returns:
+        Drift report with per-device details and totals
+    """
+    logger.info(f"Admin {current_admin['email']} running code reconciliation (dry_run={dry_run})")
+
+    try:
+        return await get_reconciliation_service().reconcile(dry_run=dry_run)
+    except Exception as e:
+        logger.error(f"Code reconciliation failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reconciliation failed: {str(e)}"
+        )
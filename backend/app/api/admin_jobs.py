@@ -0,0 +1,81 @@
+"""
+Admin scheduler job monitoring endpoints
+"""
+import logging
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+from typing import Optional
+from app.core.dependencies import get_current_admin
+from app.core.database import get_supabase
+from app.services.job_metrics import get_job_stats, WORKER_ID
+from app.services.leader_election import get_leader_elector
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_job_stats_summary(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get in-memory run statistics for every scheduler job on this worker
+
+    Returns:
+        Per-job totals, duration stats, per-dependency time and recent runs
+    """
+    logger.info(f"Admin {current_admin['email']} fetching job stats")
+
+    return {
+        "worker": WORKER_ID,
+        "isLeader": get_leader_elector().is_leader,
+        "jobs": get_job_stats().summary()
+    }
+
+
+@router.get("/runs")
+async def get_job_runs(
+    job_name: Optional[str] = Query(None, description="Filter by job name"),
+    job_status: Optional[str] = Query(None, alias="status", description="Filter by status: success, failed"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Get persisted job run history (all workers)
+
+    Args:
+        job_name: Optional job name filter
+        job_status: Optional status filter
+        limit: Maximum number of results
+        offset: Pagination offset
+
+    Returns:
+        Job runs, newest first
+    """
+    logger.info(f"Admin {current_admin['email']} fetching job runs")
+
+    supabase = get_supabase()
+
+    try:
+        query = supabase.table("job_runs")\
+            .select("*", count="exact")\
+            .order("started_at", desc=True)
+
+        if job_name:
+            query = query.eq("job_name", job_name)
+        if job_status:
+            query = query.eq("status", job_status)
+
+        result = query.range(offset, offset + limit - 1).execute()
+
+        return {
+            "runs": result.data or [],
+            "total": result.count or 0,
+            "limit": limit,
+            "offset": offset
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to fetch job runs: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch job runs: {str(e)}"
+        )
@@ -2,10 +2,15 @@
 Admin locations and locks management endpoints
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
 from app.core.dependencies import get_current_admin
 from app.core.database import get_supabase
+from app.services.device_status import get_device_status_poller
+from app.services.home_assistant_service import get_home_assistant_service
+from app.services.device_telemetry import get_device_telemetry_store, RESOLUTIONS
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -33,6 +38,8 @@ async def get_all_locations(current_admin: dict = Depends(get_current_admin)):
 
         locks = locks_result.data or []
 
+        device_status = get_device_status_poller()
+
         # Group locks by property_id
         locations = {}
         for lock in locks:
@@ -48,7 +55,8 @@ async def get_all_locations(current_admin: dict = Depends(get_current_admin)):
                     "locks": []
                 }
 
-            # Add lock to location
+            # Add lock to location (online/battery from the device status cache)
+            status = device_status.get_status(lock["id"])
             locations[property_id]["locks"].append({
                 "id": lock["id"],
                 "device_id": lock["device_id"],
@@ -59,10 +67,24 @@ async def get_all_locations(current_admin: dict = Depends(get_current_admin)):
                 "display_name_en": lock.get("display_name_en", ""),
                 "display_order": lock.get("display_order", 0),
                 "is_active": lock.get("is_active", True),
-                "battery": 95 if lock["lock_type"] == "main_entrance" else (83 if lock["lock_type"] == "floor_door" else 88),  # TODO: Get real battery
-                "online": True  # TODO: Get real online status
+                "battery": status["battery"],
+                "online": bool(status["online"]),
+                "lock_state": status["lock_state"],
+                "status_checked_at": status["checked_at"],
+                "status_stale": status["stale"],
+                "ha_entity_id": lock.get("ha_entity_id")
             })
 
+        # Live lock state for every Home Assistant entity in one round trip
+        entity_ids = [lock["ha_entity_id"] for lock in locks if lock.get("ha_entity_id")]
+        if entity_ids and settings.HOME_ASSISTANT_URL:
+            states = await get_home_assistant_service().get_states(entity_ids)
+            for location in locations.values():
+                for entry in location["locks"]:
+                    state = states.get(entry["ha_entity_id"]) if entry["ha_entity_id"] else None
+                    if state is not None:
+                        entry["lock_state"] = state.get("state")
+
         return list(locations.values())
 
     except Exception as e:
@@ -181,6 +203,56 @@ async def get_lock_details(
         )
 
 
+@router.get("/locks/{lock_id}/telemetry")
+async def get_lock_telemetry(
+    lock_id: str,
+    start: Optional[datetime] = Query(None, description="Range start (default: 24h before end)"),
+    end: Optional[datetime] = Query(None, description="Range end (default: now)"),
+    resolution: Optional[str] = Query(None, description="raw, hour or day (default: picked from the range)"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Get battery, connectivity, signal and status latency history for a lock
+
+    Args:
+        lock_id: Lock UUID
+        start: Range start
+        end: Range end
+        resolution: Series resolution
+
+    Returns:
+        Series with one point per sample (raw) or bucket (hour/day)
+    """
+    logger.info(f"Admin {current_admin['email']} fetching telemetry for lock {lock_id}")
+
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"resolution must be one of: {', '.join(RESOLUTIONS)}"
+        )
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    try:
+        return get_device_telemetry_store().query(lock_id, start, end, resolution)
+    except Exception as e:
+        logger.error(f"Failed to fetch lock telemetry: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch lock telemetry: {str(e)}"
+        )
+
+
 @router.patch("/locks/{lock_id}")
 async def update_lock(
     lock_id: str,
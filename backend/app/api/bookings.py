@@ -15,6 +15,10 @@ from app.services.code_generator import generate_pin_code, calculate_code_validi
 from app.services.tuya_service import get_tuya_service
 from app.services.ring_service import get_ring_service
 from app.services.notification_service import get_notification_service
+from app.services.provisioning_timer import get_provisioning_timer
+from app.services.revocation_service import get_revocation_service
+from app.services.revocation_timer import get_revocation_timer
+from app.services.booking_index import get_active_booking_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -44,6 +48,7 @@ async def create_booking(booking: BookingCreate):
         tuya_service = get_tuya_service()
         ring_service = get_ring_service()
         notification_service = get_notification_service()
+        revocation_timer = get_revocation_timer()
 
         # 1. Create booking in database
         logger.info(f"Creating booking for {booking.guest_name}")
@@ -69,6 +74,7 @@ async def create_booking(booking: BookingCreate):
             raise HTTPException(status_code=500, detail="Failed to create booking")
 
         booking_id = booking_result.data[0]["id"]
+        get_active_booking_index().update(booking_result.data[0])
 
         # 2. Get locks for this property
         locks_result = supabase.table("locks")\
@@ -96,7 +102,7 @@ async def create_booking(booking: BookingCreate):
             lock = locks_map["main_entrance"]
             code = generate_pin_code()
 
-            tuya_password_id = tuya_service.create_temporary_password(
+            tuya_password_id = await tuya_service.create_temporary_password(
                 device_id=lock["device_id"],
                 password=code,
                 valid_from=valid_from,
@@ -114,12 +120,14 @@ async def create_booking(booking: BookingCreate):
                 "valid_until": valid_until.isoformat(),
                 "status": "active" if tuya_password_id else "failed",
                 "tuya_sync_status": "synced" if tuya_password_id else "failed",
-                "tuya_password_id": tuya_password_id
+                "tuya_password_id": tuya_password_id,
+                "device_id": lock["device_id"]
             }
 
             code_result = supabase.table("access_codes").insert(code_data).execute()
 
             if code_result.data:
+                revocation_timer.schedule(code_result.data[0])
                 created_codes.append({
                     "lock_type": "main_entrance",
                     "code": code,
@@ -132,7 +140,7 @@ async def create_booking(booking: BookingCreate):
             lock = locks_map["apartment"]
             code = generate_pin_code()
 
-            tuya_password_id = tuya_service.create_temporary_password(
+            tuya_password_id = await tuya_service.create_temporary_password(
                 device_id=lock["device_id"],
                 password=code,
                 valid_from=valid_from,
@@ -150,12 +158,14 @@ async def create_booking(booking: BookingCreate):
                 "valid_until": valid_until.isoformat(),
                 "status": "active" if tuya_password_id else "failed",
                 "tuya_sync_status": "synced" if tuya_password_id else "failed",
-                "tuya_password_id": tuya_password_id
+                "tuya_password_id": tuya_password_id,
+                "device_id": lock["device_id"]
             }
 
             code_result = supabase.table("access_codes").insert(code_data).execute()
 
             if code_result.data:
+                revocation_timer.schedule(code_result.data[0])
                 created_codes.append({
                     "lock_type": "apartment",
                     "code": code,
@@ -185,12 +195,14 @@ async def create_booking(booking: BookingCreate):
                 "valid_until": valid_until.isoformat(),
                 "status": "active" if ring_code_id else "failed",
                 "tuya_sync_status": None,  # Not applicable for Ring
-                "ring_code_id": ring_code_id
+                "ring_code_id": ring_code_id,
+                "device_id": lock["device_id"]
             }
 
             code_result = supabase.table("access_codes").insert(code_data).execute()
 
             if code_result.data:
+                revocation_timer.schedule(code_result.data[0])
                 created_codes.append({
                     "lock_type": "floor_door",
                     "code": code,
@@ -204,9 +216,12 @@ async def create_booking(booking: BookingCreate):
         # 4. Generate JWT token
         guest_token = generate_guest_token(booking_id, booking.checkout_date)
 
-        # Update booking with token
+        # Update booking with token; codes were provisioned inline, so the
+        # provisioning timer and its resync must not provision them again
         supabase.table("bookings").update({
-            "guest_token": guest_token
+            "guest_token": guest_token,
+            "codes_provisioned": True,
+            "codes_provisioned_at": datetime.now(timezone.utc).isoformat()
         }).eq("id", booking_id).execute()
 
         # 5. Generate portal URL
@@ -275,8 +290,6 @@ async def cancel_booking(booking_id: str):
     """
     try:
         supabase = get_supabase()
-        tuya_service = get_tuya_service()
-        ring_service = get_ring_service()
 
         # Get booking
         booking_result = supabase.table("bookings").select("*").eq("id", booking_id).execute()
@@ -284,42 +297,18 @@ async def cancel_booking(booking_id: str):
         if not booking_result.data:
             raise HTTPException(status_code=404, detail="Booking not found")
 
-        # Get all codes for this booking
-        codes_result = supabase.table("access_codes")\
-            .select("*, locks(*)")\
-            .eq("booking_id", booking_id)\
-            .eq("status", "active")\
-            .execute()
-
-        # Revoke each code
-        revoked_count = 0
-        for code in codes_result.data:
-            success = False
-
-            # Revoke Tuya lock code
-            if code.get("tuya_password_id"):
-                success = tuya_service.delete_temporary_password(
-                    code["locks"]["device_id"],
-                    code["tuya_password_id"]
-                )
-
-            # Revoke Ring intercom code
-            elif code.get("ring_code_id"):
-                success = await ring_service.revoke_access_code(code["ring_code_id"])
-
-            if success:
-                supabase.table("access_codes").update({
-                    "status": "revoked",
-                    "revoked_at": datetime.now(timezone.utc).isoformat(),
-                    "revoked_reason": "Booking cancelled"
-                }).eq("id", code["id"]).execute()
-                revoked_count += 1
+        # Revoke all active codes for this booking
+        revocation = await get_revocation_service().revoke_booking_codes(booking_id, "Booking cancelled")
+        revoked_count = revocation["revoked"]
 
         # Update booking status
         supabase.table("bookings").update({
             "status": "cancelled"
         }).eq("id", booking_id).execute()
 
+        get_provisioning_timer().cancel(booking_id)
+        get_active_booking_index().invalidate(booking_id)
+
         logger.info(f"✅ Booking {booking_id} cancelled, {revoked_count} codes revoked")
 
         return {
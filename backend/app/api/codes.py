@@ -43,7 +43,7 @@ async def revoke_code(code_id: str):
 
         # Revoke on Tuya
         if code.get("tuya_password_id"):
-            success = tuya_service.delete_temporary_password(
+            success = await tuya_service.delete_temporary_password(
                 code["locks"]["device_id"],
                 code["tuya_password_id"]
             )
@@ -93,9 +93,13 @@ async def revoke_all_expired():
     """
     try:
         from app.services.scheduler import revoke_expired_codes
-        await revoke_expired_codes()
+        result = await revoke_expired_codes()
 
-        return {"message": "Expired codes revocation triggered"}
+        return {
+            "message": "Expired codes revocation triggered",
+            "codes_revoked": result["revoked"],
+            "codes_failed": result["failed"]
+        }
 
     except Exception as e:
         logger.error(f"❌ Failed to revoke expired codes: {e}", exc_info=True)
@@ -1,63 +1,72 @@
 """
 Ring Intercom integration via Home Assistant
 """
-from fastapi import APIRouter, HTTPException, status
-import httpx
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 import logging
 
-from app.core.config import settings
 from app.core.database import get_supabase
+from app.core.dependencies import get_current_guest
+from app.services.booking_index import get_active_booking_index
+from app.services.home_assistant_service import get_home_assistant_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _record_intercom_open(booking_id: str) -> None:
+    """
+    Write the audit entry after the response has been sent
+    (also what moves a confirmed booking to checked_in)
+    """
+    try:
+        get_supabase().table("audit_logs").insert({
+            "event_type": "intercom_opened",
+            "entity_type": "booking",
+            "entity_id": booking_id,
+            "actor_type": "guest",
+            "description": "Ring intercom opened from guest portal",
+            "status": "success"
+        }).execute()
+    except Exception as e:
+        logger.error(f"❌ Failed to record intercom open for booking {booking_id}: {e}")
+
+
 @router.post("/open")
-async def open_intercom(booking_id: str = None):
+async def open_intercom(background_tasks: BackgroundTasks, guest: dict = Depends(get_current_guest)):
     """
     Open Ring Intercom via Home Assistant
 
-    Args:
-        booking_id: Optional booking ID for audit logging
+    The guest portal token identifies the booking; the booking must be
+    within its stay (checked against the in-memory active booking index).
+    Nothing else runs before the Home Assistant call, and the audit entry
+    is written after responding.
 
     Returns:
         Success message
     """
-    try:
-        # Call Home Assistant REST API
-        url = f"{settings.HOME_ASSISTANT_URL}/api/services/button/press"
-
-        headers = {
-            "Authorization": f"Bearer {settings.HOME_ASSISTANT_TOKEN}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "entity_id": settings.RING_BUTTON_ENTITY_ID
-        }
+    booking_id = guest["booking_id"]
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers, timeout=10.0)
+    try:
+        entitled = await get_active_booking_index().is_entitled(booking_id)
+    except Exception as e:
+        logger.error(f"❌ Failed to check booking {booking_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not verify booking")
 
-            if response.status_code not in [200, 201]:
-                logger.error(f"Home Assistant error: {response.text}")
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY,
-                    detail="Failed to communicate with Home Assistant"
-                )
+    if not entitled:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Booking is not active"
+        )
 
-        # Audit log
-        if booking_id:
-            supabase = get_supabase()
-            supabase.table("audit_logs").insert({
-                "event_type": "intercom_opened",
-                "entity_type": "booking",
-                "entity_id": booking_id,
-                "actor_type": "guest",
-                "description": "Ring intercom opened from guest portal",
-                "status": "success"
-            }).execute()
+    try:
+        # Press the Ring button entity (pooled connection; fails fast while the Home Assistant circuit is open)
+        if not await get_home_assistant_service().open_ring_intercom():
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Failed to communicate with Home Assistant"
+            )
 
+        background_tasks.add_task(_record_intercom_open, booking_id)
         logger.info(f"✅ Ring intercom opened (booking: {booking_id})")
 
         return {"message": "Intercom opened successfully"}
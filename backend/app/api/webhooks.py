@@ -1,53 +1,98 @@
 """
-Webhook endpoints (primarily for n8n integration)
+Webhook endpoints (Hospitable/Lodgify booking events, n8n)
 """
 from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi.responses import JSONResponse
+from typing import Optional
 import logging
 
 from app.core.config import settings
+from app.services.webhook_pipeline import get_webhook_pipeline, PROVIDER_HOSPITABLE, PROVIDER_LODGIFY
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Delivery ID header set by the sender (or the n8n relay); same value on retries
+DELIVERY_ID_HEADER = "X-Webhook-Id"
+
+
+async def _accept_webhook(provider: str, request: Request, x_webhook_secret: Optional[str]) -> JSONResponse:
+    """
+    Validate, store, queue and acknowledge a booking webhook
+    The event is in webhook_events before the 202 is sent; processing
+    happens in the webhook pipeline
+    """
+    # Validate webhook secret if configured
+    if settings.N8N_WEBHOOK_SECRET and x_webhook_secret != settings.N8N_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    try:
+        outcome = await get_webhook_pipeline().accept(provider, payload, request.headers.get(DELIVERY_ID_HEADER))
+    except Exception as e:
+        logger.error(f"❌ Failed to persist {provider} webhook: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Webhook could not be stored, please retry")
+
+    if outcome == "duplicate":
+        return JSONResponse(
+            status_code=200,
+            content={
+                "status": "duplicate",
+                "message": "Webhook already received"
+            }
+        )
+
+    if outcome == "stored":
+        logger.warning(f"⚠️ Webhook queue full, {provider} event left for replay")
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "received",
+            "message": "Webhook received successfully"
+        }
+    )
+
 
 @router.post("/hospitable")
 async def hospitable_webhook(request: Request, x_webhook_secret: str = Header(None)):
     """
     Webhook endpoint for Hospitable
 
-    This is primarily called by n8n, which will then call /bookings/create
-    You can also configure Hospitable to call this directly.
+    The event is stored and acknowledged, then processed in the background:
+    the booking is upserted and codes are provisioned, re-provisioned or
+    revoked for that booking only.
 
     Args:
         request: FastAPI request with webhook payload
         x_webhook_secret: Optional webhook secret for validation
 
     Returns:
-        Acknowledgement
+        Acknowledgement (202)
     """
-    try:
-        # Validate webhook secret if configured
-        if settings.N8N_WEBHOOK_SECRET and x_webhook_secret != settings.N8N_WEBHOOK_SECRET:
-            raise HTTPException(status_code=401, detail="Invalid webhook secret")
-
-        # Get payload
-        payload = await request.json()
+    return await _accept_webhook(PROVIDER_HOSPITABLE, request, x_webhook_secret)
 
-        logger.info(f"📨 Received Hospitable webhook: {payload.get('event_type', 'unknown')}")
 
-        # Log webhook for debugging
-        # In production, you might want to forward this to n8n or process directly
+@router.post("/lodgify")
+async def lodgify_webhook(request: Request, x_webhook_secret: str = Header(None)):
+    """
+    Webhook endpoint for Lodgify booking events (booking_new_*, booking_change, booking_status_change_*)
 
-        return {
-            "status": "received",
-            "message": "Webhook received successfully"
-        }
+    Args:
+        request: FastAPI request with webhook payload
+        x_webhook_secret: Optional webhook secret for validation
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Webhook processing failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    Returns:
+        Acknowledgement (202)
+    """
+    return await _accept_webhook(PROVIDER_LODGIFY, request, x_webhook_secret)
 
 
 @router.get("/test")
@@ -6,7 +6,7 @@ Loads environment variables from .env file
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -28,9 +28,19 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_KEY: str
 
     # Tuya
-        TUYA_CLIENT_ID: Optional[str] = None
-        TUYA_SECRET: Optional[str] = None
-TUYA_REGION: Optional[str] = "eu"
+    TUYA_CLIENT_ID: Optional[str] = None
+    TUYA_SECRET: Optional[str] = None
+    TUYA_REGION: Optional[str] = "eu"
+    TUYA_TIMEOUT_SECONDS: float = 10.0  # Per-request timeout for Tuya OpenAPI
+    TUYA_MAX_CONNECTIONS: int = 10  # Pooled connections to Tuya OpenAPI
+    TUYA_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Refresh the access token 5 min before expiry
+    TUYA_COMMAND_BATCH_WINDOW_SECONDS: float = 0.5  # Commands for one device within 0.5s share a request
+    TUYA_COMMAND_BATCH_MAX: int = 10  # Max commands per request
+    # Local LAN control: {"<device_id>": {"ip": "192.168.1.50", "local_key": "...", "version": 3.3,
+    #                                     "dps": {"delete_temporary_password": "52", "residual_electricity": "8"}}}
+    TUYA_LOCAL_DEVICES: Dict[str, Dict] = {}
+    TUYA_LOCAL_TIMEOUT_SECONDS: float = 3.0  # Socket timeout for local requests
+    TUYA_LOCAL_RETRY_SECONDS: int = 60  # After a local failure, use the cloud for 60s before retrying LAN
     TUYA_DEVICE_MAIN_ENTRANCE: Optional[str] = None  # Ingresso principale (portone edificio)
     TUYA_DEVICE_FLOOR_DOOR: Optional[str] = None  # Optional - uses Ring intercom instead
     TUYA_DEVICE_APARTMENT: Optional[str] = None  # Porta appartamento
@@ -48,11 +58,38 @@ TUYA_REGION: Optional[str] = "eu"
     # Home Assistant (for Tuya locks automation)
     HOME_ASSISTANT_URL: Optional[str] = None
     HOME_ASSISTANT_TOKEN: Optional[str] = None
+    HOME_ASSISTANT_WS_ENABLED: bool = True  # Push-based entity state over the websocket API
+    HOME_ASSISTANT_WATCH_ENTITIES: List[str] = []  # Extra entities to track (locks' ha_entity_id and the Ring button are always tracked)
+    HOME_ASSISTANT_WS_HEARTBEAT_SECONDS: float = 30.0  # Websocket ping interval
+    HOME_ASSISTANT_WS_MAX_MESSAGE_BYTES: int = 64 * 1024 * 1024  # Largest websocket message (get_states snapshot); 0 = no limit
+    HOME_ASSISTANT_WS_RESYNC_SECONDS: int = 300  # Full state snapshot every 5 min in case an event was missed
+    HOME_ASSISTANT_WS_RECONNECT_MAX_SECONDS: float = 60.0  # Reconnect backoff cap
+    HOME_ASSISTANT_SNAPSHOT_TTL_SECONDS: float = 5.0  # Bulk /api/states snapshot reused for 5s
 
     # Ring Intercom (floor door)
     RING_REFRESH_TOKEN: Optional[str] = None  # Ring API refresh token
     RING_INTERCOM_DEVICE_ID: Optional[str] = None  # Ring intercom device ID
     RING_BUTTON_ENTITY_ID: str = "button.ring_intercom_unlock"  # HA entity for Ring
+    RING_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Refresh the access token 5 min before expiry
+    RING_TOKEN_CLAIM_SECONDS: int = 30  # A worker's refresh claim expires after 30s if it dies mid-refresh
+    RING_TOKEN_WAIT_SECONDS: float = 10.0  # Max wait for another worker's refresh before refreshing anyway
+
+    # Outbound integration resilience (bulkheads, timeouts, circuit breakers)
+    VENDOR_CONCURRENCY: Dict[str, int] = {"tuya": 10, "ring": 4, "home_assistant": 8, "twilio": 4, "telegram": 4}
+    VENDOR_TIMEOUT_SECONDS: Dict[str, float] = {"tuya": 20.0, "ring": 10.0, "home_assistant": 5.0, "twilio": 15.0, "telegram": 10.0}
+    VENDOR_DEFAULT_CONCURRENCY: int = 4
+    VENDOR_DEFAULT_TIMEOUT_SECONDS: float = 10.0
+    RESILIENCE_BULKHEAD_WAIT_SECONDS: float = 2.0  # Max wait for a free vendor slot before failing fast
+    RESILIENCE_WINDOW_SECONDS: int = 60  # Failure rate measured over the last 60s of calls
+    RESILIENCE_MIN_CALLS: int = 5  # Calls in the window before the breaker can open
+    RESILIENCE_FAILURE_RATE: float = 0.5  # Open the circuit at 50% failures
+    RESILIENCE_OPEN_SECONDS: int = 30  # Fail fast for 30s, then probe
+    RESILIENCE_HALF_OPEN_PROBES: int = 1  # Concurrent probe calls while half-open
+
+    # Pooled aiohttp sessions (Ring, Home Assistant); pool size follows VENDOR_CONCURRENCY
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_KEEPALIVE_SECONDS: float = 60.0  # Idle connections kept warm for 60s
+    HTTP_DNS_CACHE_SECONDS: int = 300  # Resolved hosts cached for 5 min
 
     # Email (Fallback)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -68,23 +105,70 @@ TUYA_REGION: Optional[str] = "eu"
 
     # n8n
     N8N_WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_QUEUE_SIZE: int = 1000  # Stored webhook events queued in memory; beyond this they wait for replay
+    WEBHOOK_MAX_ATTEMPTS: int = 5  # Failed events are replayed until this many attempts
+    WEBHOOK_REPLAY_INTERVAL_MINUTES: int = 5  # Leader re-queues pending/failed events every 5 min
+    WEBHOOK_REPLAY_MIN_AGE_SECONDS: int = 60  # Younger pending events are still queued where they arrived
+    WEBHOOK_BATCH_WINDOW_SECONDS: float = 2.0  # Events per reservation within this window collapse into one change
+    WEBHOOK_DEDUPE_TTL_SECONDS: int = 3600  # Remember event IDs for 1 hour in memory
+    WEBHOOK_DEDUPE_MAX_SIZE: int = 10000  # Max event IDs kept in memory
 
     # Lodgify API (for booking sync)
+    # Default key/property; properties.lodgify_property_id and property_credentials.lodgify_api_key take precedence
     LODGIFY_API_KEY: Optional[str] = None
     LODGIFY_PROPERTY_ID: Optional[str] = None
+    LODGIFY_SYNC_DAYS: int = 90  # Sync reservations arriving in the next 90 days
+    LODGIFY_PAGE_SIZE: int = 50  # Reservations per Lodgify page
+    LODGIFY_PAGE_CONCURRENCY: int = 4  # Pages fetched in parallel per property
+    LODGIFY_PROPERTY_CONCURRENCY: int = 3  # Properties synced in parallel
+    LODGIFY_SYNC_QUEUE_SIZE: int = 8  # Pages buffered between fetcher and DB writer
+    LODGIFY_UPSERT_BATCH_SIZE: int = 200  # Bookings per bulk upsert round trip
+    LODGIFY_FULL_SYNC_HOURS: int = 24  # Full window sync at least daily; delta syncs in between
+    LODGIFY_SYNC_OVERLAP_MINUTES: int = 5  # Re-request changes this far before the watermark
+    LODGIFY_TIMEOUT_SECONDS: float = 15.0  # Per-page read timeout
+    LODGIFY_MAX_RETRIES: int = 4  # Retries per request on 429/5xx/transport errors
+    LODGIFY_RETRY_BASE_SECONDS: float = 0.5  # Backoff base (full jitter, doubles per retry)
+    LODGIFY_RETRY_MAX_SECONDS: float = 30.0  # Backoff cap; longer Retry-After fails the request
 
     # Scheduler
     SCHEDULER_TIMEZONE: str = "Europe/Rome"
-    AUTO_REVOKE_HOUR: int = 14  # 2 PM daily check
+    AUTO_REVOKE_HOUR: int = 14  # 2 PM daily safety-net sweep (codes are revoked at expiry)
     BOOKING_SYNC_HOURS: List[int] = [0, 18]  # Sync bookings at 12 AM and 6 PM
-    CODE_PROVISIONING_HOURS: List[int] = [0, 18]  # Check at 12 AM and 6 PM for codes to provision
     CODE_PROVISIONING_WINDOW_HOURS: int = 48  # Provision codes 48h before checkin
+    SCHEDULER_LEADER_ELECTION: bool = True  # Only the lease holder runs jobs (multi-worker safe)
+    SCHEDULER_LEASE_TTL_SECONDS: int = 15  # Leader lease expires 15s after the last heartbeat
+    SCHEDULER_HEARTBEAT_SECONDS: int = 5  # Lease renewal interval
+    SCHEDULER_TIMER_RESYNC_MINUTES: int = 10  # Leader rebuilds provisioning/revocation timers every 10 min
+    SCHEDULER_TIMER_POLL_SECONDS: int = 15  # Leader picks up bookings changed on other workers within 15s
+    LIFECYCLE_INTERVAL_MINUTES: int = 5  # Booking status transitions every 5 min
+    JOB_RUN_HISTORY_SIZE: int = 50  # Recent runs kept in memory per job
+    JOB_RUN_ERROR_SAMPLES: int = 5  # Error messages kept per run
+    JOB_RUNS_RETENTION_DAYS: int = 30  # job_runs rows older than 30 days pruned daily
+    JOB_RUNS_PRUNE_HOUR: int = 3  # 3 AM daily job_runs prune
+    CODE_PROVISIONING_RETRY_MINUTES: int = 30  # Retry failed provisioning after 30 min
+    REVOCATION_TUYA_CONCURRENCY: int = 4  # Tuya devices revoked in parallel
+    REVOCATION_RING_CONCURRENCY: int = 2  # Ring devices revoked in parallel
+    REVOCATION_SPREAD_SECONDS: int = 30  # Spread expiring codes across devices within 30s
+    REVOCATION_RETRY_MINUTES: int = 15  # Retry failed revocations after 15 min
+    RECONCILIATION_HOUR: int = 4  # 4 AM daily device-vs-database code audit
+    RECONCILIATION_GRACE_MINUTES: int = 10  # Codes created in the last 10 min aren't re-created if not listed yet
+    RECONCILIATION_DELETE_ORPHANS: bool = True  # Delete app-created codes left on devices (False = report only)
+    DEVICE_STATUS_POLL_SECONDS: int = 300  # Every active lock's status refreshed every 5 min (staggered)
+    DEVICE_STATUS_REFRESH_SECONDS: int = 30  # Non-leader workers reload the leader's statuses every 30s
+    DEVICE_STATUS_STALE_SECONDS: int = 900  # Cached status older than 15 min is reported as stale
+    DEVICE_STATUS_TIMEOUT_SECONDS: float = 20.0  # Per-lock status request timeout
+    DEVICE_TELEMETRY_RAW_DAYS: int = 7  # Raw status samples kept 7 days
+    DEVICE_TELEMETRY_HOURLY_DAYS: int = 90  # Hourly rollups kept 90 days
+    DEVICE_TELEMETRY_DAILY_DAYS: int = 730  # Daily rollups kept 2 years
+    DEVICE_TELEMETRY_MAX_POINTS: int = 5000  # Max points returned per series query
+    DEVICE_TELEMETRY_BUFFER_MAX: int = 2000  # Unwritten samples kept in memory while inserts fail
 
     # Property defaults
     DEFAULT_PROPERTY_ID: str = "alcova_landolina_fi"
     CODE_LENGTH: int = 6
     CODE_BUFFER_HOURS_BEFORE: int = 2  # Code valid 2h before checkin
     CODE_EXPIRY_NEXT_DAY_HOUR: int = 9  # Code expires at 9 AM the day after checkout
+    BOOKING_INDEX_TTL_SECONDS: int = 60  # Active booking index (guest entitlement) reloaded every minute
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -4,6 +4,7 @@ FastAPI dependencies for authentication and authorization
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.admin_auth import verify_token
+from app.core.security import decode_token
 from typing import Optional
 
 security = HTTPBearer()
@@ -32,6 +33,28 @@ def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(securi
     return payload
 
 
+def get_current_guest(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Dependency to get the guest from a guest portal JWT token
+
+    Raises:
+        HTTPException: If token is invalid, expired or not a guest portal token
+
+    Returns:
+        Token payload (booking_id, checkout_date)
+    """
+    payload = decode_token(credentials.credentials)
+
+    if not payload or payload.get("type") != "guest_portal" or not payload.get("booking_id"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return payload
+
+
 def get_optional_admin(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
 ) -> Optional[dict]:
@@ -0,0 +1,31 @@
+"""
+Pooled HTTP sessions for outbound integrations
+One long-lived aiohttp session per vendor service, so repeated calls reuse
+warm keep-alive connections instead of paying DNS + TCP + TLS every time
+"""
+import aiohttp
+from app.core.config import settings
+from app.core.resilience import vendor_guard
+
+
+def create_vendor_session(vendor: str) -> aiohttp.ClientSession:
+    """
+    Create a pooled session sized to the vendor's bulkhead
+
+    Args:
+        vendor: Vendor guard name (e.g. "ring", "home_assistant")
+
+    Returns:
+        aiohttp session (must be created inside the running event loop and closed on shutdown)
+    """
+    guard = vendor_guard(vendor)
+    connector = aiohttp.TCPConnector(
+        limit=guard.concurrency,
+        limit_per_host=guard.concurrency,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_SECONDS
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=guard.timeout, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+    )
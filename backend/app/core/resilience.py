@@ -0,0 +1,248 @@
+"""
+Resilience layer for outbound integrations
+Per-vendor bulkheads (bounded concurrency), call timeouts and circuit
+breakers, so one slow or failing vendor can't tie up the whole worker
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+import async_timeout
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Call rejected because the vendor's circuit is open
+    """
+
+    def __init__(self, vendor: str, retry_in: float):
+        super().__init__(f"{vendor} circuit open, retry in {retry_in:.0f}s")
+        self.vendor = vendor
+        self.retry_in = retry_in
+
+
+class BulkheadFullError(Exception):
+    """
+    Call rejected because every slot for the vendor stayed busy
+    """
+
+    def __init__(self, vendor: str):
+        super().__init__(f"{vendor} has too many calls in flight")
+        self.vendor = vendor
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker
+
+    closed     calls pass; outcomes kept for RESILIENCE_WINDOW_SECONDS. Once the
+               window holds RESILIENCE_MIN_CALLS and the failure rate reaches
+               RESILIENCE_FAILURE_RATE the circuit opens.
+    open       calls fail fast with CircuitOpenError for RESILIENCE_OPEN_SECONDS.
+    half_open  up to RESILIENCE_HALF_OPEN_PROBES calls go through; a success
+               closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = STATE_CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes = 0
+        self.last_error: Optional[str] = None
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - settings.RESILIENCE_WINDOW_SECONDS
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def before_call(self) -> bool:
+        """
+        Admit or reject a call
+
+        Returns:
+            True if the call is a half-open probe
+
+        Raises:
+            CircuitOpenError: Circuit is open (or half-open with every probe slot taken)
+        """
+        now = time.monotonic()
+        if self.state == STATE_OPEN:
+            retry_in = self._opened_at + settings.RESILIENCE_OPEN_SECONDS - now
+            if retry_in > 0:
+                raise CircuitOpenError(self.name, retry_in)
+            self.state = STATE_HALF_OPEN
+            self._probes = 0
+            logger.info(f"🔄 {self.name} circuit half-open, probing")
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probes >= settings.RESILIENCE_HALF_OPEN_PROBES:
+                raise CircuitOpenError(self.name, 0)
+            self._probes += 1
+            return True
+
+        return False
+
+    def release_probe(self) -> None:
+        """
+        Give back a probe slot for a call that never reached the vendor
+        """
+        if self.state == STATE_HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self) -> None:
+        now = time.monotonic()
+        if self.state == STATE_HALF_OPEN:
+            self.state = STATE_CLOSED
+            self._outcomes.clear()
+            logger.info(f"✅ {self.name} circuit closed")
+        self._outcomes.append((now, True))
+        self._trim(now)
+
+    def record_failure(self, error: BaseException) -> None:
+        now = time.monotonic()
+        self.last_error = (f"{type(error).__name__}: {error}" if str(error) else type(error).__name__)[:200]
+
+        if self.state == STATE_HALF_OPEN:
+            self._open(now)
+            return
+
+        self._outcomes.append((now, False))
+        self._trim(now)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (
+            self.state == STATE_CLOSED
+            and len(self._outcomes) >= settings.RESILIENCE_MIN_CALLS
+            and failures / len(self._outcomes) >= settings.RESILIENCE_FAILURE_RATE
+        ):
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = STATE_OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        logger.warning(
+            f"⚠️ {self.name} circuit opened for {settings.RESILIENCE_OPEN_SECONDS}s "
+            f"(last error: {self.last_error})"
+        )
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        self._trim(now)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "state": self.state,
+            "calls": len(self._outcomes),
+            "failures": failures,
+            "retry_in": max(self._opened_at + settings.RESILIENCE_OPEN_SECONDS - now, 0) if self.state == STATE_OPEN else None,
+            "last_error": self.last_error
+        }
+
+
+class VendorGuard:
+    """
+    Bulkhead + timeout + circuit breaker for one vendor
+
+    Usage:
+        async with vendor_guard("ring").call():
+            ... one outbound request ...
+
+    Exceptions raised inside the block (including the timeout) count as
+    failures; callers raise for 5xx responses so vendor errors count too.
+    """
+
+    def __init__(self, name: str, concurrency: int, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.breaker = CircuitBreaker(name)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight = 0
+
+    @asynccontextmanager
+    async def call(self, timeout: Optional[float] = None):
+        """
+        Run one outbound call under the vendor's limits
+
+        Args:
+            timeout: Override of the vendor's default call timeout
+
+        Raises:
+            CircuitOpenError: Circuit is open
+            BulkheadFullError: No slot freed up within RESILIENCE_BULKHEAD_WAIT_SECONDS
+            asyncio.TimeoutError: The call exceeded its timeout
+        """
+        is_probe = self.breaker.before_call()
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), settings.RESILIENCE_BULKHEAD_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            if is_probe:
+                self.breaker.release_probe()
+            raise BulkheadFullError(self.name)
+        except BaseException:
+            # Cancelled while waiting for a slot
+            if is_probe:
+                self.breaker.release_probe()
+            raise
+
+        self._in_flight += 1
+        try:
+            async with async_timeout.timeout(timeout or self.timeout):
+                yield
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled by the caller: says nothing about the vendor, but a
+            # probe must give its slot back or the circuit stays half-open
+            if is_probe:
+                self.breaker.release_probe()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.breaker.snapshot(),
+            "in_flight": self._in_flight,
+            "concurrency": self.concurrency,
+            "timeout_seconds": self.timeout
+        }
+
+
+_guards: Dict[str, VendorGuard] = {}
+
+
+def vendor_guard(name: str) -> VendorGuard:
+    """
+    Get or create the guard for a vendor (limits from VENDOR_CONCURRENCY / VENDOR_TIMEOUT_SECONDS)
+    """
+    guard = _guards.get(name)
+    if guard is None:
+        guard = VendorGuard(
+            name,
+            concurrency=settings.VENDOR_CONCURRENCY.get(name, settings.VENDOR_DEFAULT_CONCURRENCY),
+            timeout=settings.VENDOR_TIMEOUT_SECONDS.get(name, settings.VENDOR_DEFAULT_TIMEOUT_SECONDS)
+        )
+        _guards[name] = guard
+    return guard
+
+
+def guard_snapshots() -> Dict[str, Dict]:
+    """
+    Current breaker and bulkhead state of every vendor used so far
+    """
+    return {name: guard.snapshot() for name, guard in _guards.items()}
@@ -10,8 +10,20 @@ from contextlib import asynccontextmanager
 from app.core.config import settings, get_cors_origins
 from app.core.database import init_database
 from app.services.scheduler import init_scheduler, shutdown_scheduler
+from app.services.provisioning_timer import start_provisioning_timer, stop_provisioning_timer
+from app.services.revocation_timer import start_revocation_timer, stop_revocation_timer
+from app.services.leader_election import get_leader_elector
+from app.services.lodgify_client import close_lodgify_client
+from app.services.tuya_service import close_tuya_service
+from app.services.ring_service import open_ring_service, close_ring_service
+from app.services.home_assistant_service import open_home_assistant_service, close_home_assistant_service
+from app.services.home_assistant_ws import start_home_assistant_stream, stop_home_assistant_stream
+from app.services.booking_index import get_active_booking_index
+from app.services.lifecycle_service import get_lifecycle_service
+from app.services.device_status import start_device_status_poller, stop_device_status_poller
+from app.services.webhook_pipeline import start_webhook_pipeline, stop_webhook_pipeline, replay_webhook_events
 from app.api import bookings, guests, codes, intercom, webhooks
-from app.api import admin_auth, admin_dashboard, admin_bookings, admin_activity, admin_integrations, admin_locations
+from app.api import admin_auth, admin_dashboard, admin_bookings, admin_activity, admin_integrations, admin_locations, admin_jobs
 
 # Configure logging
 logging.basicConfig(
@@ -33,15 +45,49 @@ async def lifespan(app: FastAPI):
     await init_database()
     logger.info("✅ Database initialized")
 
+    # Long-lived pooled HTTP sessions for the device integrations
+    await open_ring_service()
+    await open_home_assistant_service()
+
     # Initialize scheduler for auto-revoke
     init_scheduler()
     logger.info("✅ Scheduler initialized")
 
+    # Event-driven code provisioning and revocation run on the elected leader only
+    leader_elector = get_leader_elector()
+    leader_elector.on_elected(start_provisioning_timer)
+    leader_elector.on_elected(start_revocation_timer)
+    leader_elector.on_demoted(stop_provisioning_timer)
+    leader_elector.on_demoted(stop_revocation_timer)
+
+    # Webhooks are processed on every worker; the leader replays unprocessed events
+    await start_webhook_pipeline()
+    leader_elector.on_elected(replay_webhook_events)
+
+    # Device status cache for the admin pages (the leader polls, other workers read its results)
+    await start_device_status_poller()
+    await start_home_assistant_stream()
+
+    # Guest entitlement index for the intercom fast path; lifecycle transitions update it
+    booking_index = get_active_booking_index()
+    get_lifecycle_service().add_listener(booking_index.on_lifecycle_changes)
+    await booking_index.warm()
+
+    await leader_elector.start()
+
     yield
 
     # Shutdown
     logger.info("🛑 Shutting down Alcova Smart Check-in API")
+    await get_leader_elector().stop()
+    await stop_webhook_pipeline()
+    await stop_device_status_poller()
+    await stop_home_assistant_stream()
     shutdown_scheduler()
+    await close_lodgify_client()
+    await close_tuya_service()
+    await close_ring_service()
+    await close_home_assistant_service()
 
 
 # Create FastAPI app
@@ -117,6 +163,7 @@ app.include_router(admin_bookings.router, prefix="/api/admin/bookings", tags=["A
 app.include_router(admin_activity.router, prefix="/api/admin/activity", tags=["Admin Activity"])
 app.include_router(admin_integrations.router, prefix="/api/admin/integrations", tags=["Admin Integrations"])
 app.include_router(admin_locations.router, prefix="/api/admin/locations", tags=["Admin Locations"])
+app.include_router(admin_jobs.router, prefix="/api/admin/jobs", tags=["Admin Jobs"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""
+Active booking index
+In-memory view of the bookings whose guests may currently use the building
+entrances, so guest actions (intercom) are authorized without a DB round trip
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.deadline_timer import parse_timestamp
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses whose guests may open the doors
+ENTITLED_STATUSES = ("confirmed", "checked_in")
+
+
+class ActiveBookingIndex:
+    """
+    booking_id -> {status, checkin, checkout} for bookings around now
+
+    The whole window (check-in within the next day, checkout not yet past)
+    is loaded in one query and reloaded in the background once older than
+    BOOKING_INDEX_TTL_SECONDS; readers never wait for a reload once the
+    index is warm. Bookings missing from the index are looked up once and
+    cached, including unknown IDs. Changes made in this worker (webhooks,
+    sync, cancel, lifecycle) update the index immediately; changes made by
+    other workers show up within the TTL.
+    """
+
+    def __init__(self):
+        """
+        Initialize active booking index
+        """
+        self._entries: Dict[str, Optional[Dict]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._load_lock = asyncio.Lock()
+        # Local changes made while a reload query is in flight (None = invalidated)
+        self._changes: Optional[Dict[str, Optional[Dict]]] = None
+        logger.info("✅ Active booking index initialized")
+
+    async def is_entitled(self, booking_id: str) -> bool:
+        """
+        True if the booking's guest may open the doors right now
+
+        Access runs from CODE_BUFFER_HOURS_BEFORE before check-in until
+        checkout, for confirmed and checked-in bookings.
+
+        Args:
+            booking_id: Booking UUID
+
+        Returns:
+            True if entitled
+        """
+        await self._ensure_loaded()
+
+        if booking_id not in self._entries:
+            self._entries[booking_id] = await asyncio.to_thread(self._fetch_one, booking_id)
+
+        entry = self._entries[booking_id]
+        if entry is None or entry["status"] not in ENTITLED_STATUSES:
+            return False
+
+        now = datetime.now(timezone.utc)
+        return entry["checkin"] - timedelta(hours=settings.CODE_BUFFER_HOURS_BEFORE) <= now <= entry["checkout"]
+
+    def update(self, booking: Dict) -> None:
+        """
+        Apply a booking row written by this worker
+
+        Args:
+            booking: Row with id, status, checkin_date, checkout_date
+        """
+        entry = self._entry(booking)
+        self._entries[booking["id"]] = entry
+        if self._changes is not None:
+            self._changes[booking["id"]] = entry
+
+    def on_lifecycle_changes(self, changes: Dict) -> None:
+        """
+        Lifecycle listener: forget bookings whose status just changed
+        """
+        for booking_ids in changes.get("bookings", {}).values():
+            for booking_id in booking_ids:
+                self.invalidate(booking_id)
+
+    def invalidate(self, booking_id: str) -> None:
+        """
+        Forget a booking so the next check reads it from the database
+        """
+        self._entries.pop(booking_id, None)
+        if self._changes is not None:
+            self._changes[booking_id] = None
+
+    async def warm(self) -> None:
+        """
+        Load the index ahead of the first request (called from application lifespan)
+        """
+        try:
+            await self._ensure_loaded()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not warm active booking index: {e}")
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            async with self._load_lock:
+                if self._loaded_at is None:
+                    await self._reload()
+            return
+
+        stale = time.monotonic() - self._loaded_at > settings.BOOKING_INDEX_TTL_SECONDS
+        if stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._background_reload())
+
+    async def _background_reload(self) -> None:
+        try:
+            await self._reload()
+        except Exception as e:
+            # Keep serving the previous index; the next request retries
+            logger.warning(f"⚠️ Active booking index reload failed: {e}")
+
+    async def _reload(self) -> None:
+        started = time.monotonic()
+        self._changes = {}
+        try:
+            rows = await asyncio.to_thread(self._fetch_window)
+            entries = {row["id"]: self._entry(row) for row in rows}
+            # The query may predate changes this worker made meanwhile
+            for booking_id, entry in self._changes.items():
+                if entry is None:
+                    entries.pop(booking_id, None)
+                else:
+                    entries[booking_id] = entry
+        finally:
+            self._changes = None
+        self._entries = entries
+        self._loaded_at = started
+        logger.info(f"🔄 Active booking index loaded ({len(rows)} bookings)")
+
+    def _fetch_window(self):
+        now = datetime.now(timezone.utc)
+        supabase = get_supabase()
+        with track_dependency("db"):
+            result = supabase.table("bookings")\
+                .select("id, status, checkin_date, checkout_date")\
+                .in_("status", list(ENTITLED_STATUSES))\
+                .gte("checkout_date", now.isoformat())\
+                .lte("checkin_date", (now + timedelta(days=1)).isoformat())\
+                .execute()
+        return result.data or []
+
+    def _fetch_one(self, booking_id: str) -> Optional[Dict]:
+        supabase = get_supabase()
+        with track_dependency("db"):
+            result = supabase.table("bookings")\
+                .select("id, status, checkin_date, checkout_date")\
+                .eq("id", booking_id)\
+                .execute()
+        return self._entry(result.data[0]) if result.data else None
+
+    @staticmethod
+    def _entry(row: Dict) -> Dict:
+        return {
+            "status": row["status"],
+            "checkin": parse_timestamp(row["checkin_date"]),
+            "checkout": parse_timestamp(row["checkout_date"])
+        }
+
+
+# Global instance
+_active_booking_index: Optional[ActiveBookingIndex] = None
+
+
+def get_active_booking_index() -> ActiveBookingIndex:
+    """
+    Get or create active booking index singleton
+    """
+    global _active_booking_index
+    if _active_booking_index is None:
+        _active_booking_index = ActiveBookingIndex()
+    return _active_booking_index
@@ -2,20 +2,45 @@
 Booking synchronization and access code provisioning service
 Handles automated workflow for Lodgify booking sync and code generation
 """
+import asyncio
+import hashlib
+import json
+import math
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from app.core.config import settings
 from app.core.database import get_supabase
 from app.services.code_generator import generate_pin_code, calculate_code_validity
 from app.services.tuya_service import get_tuya_service
 from app.services.ring_service import get_ring_service
 from app.services.notification_service import get_notification_service
+from app.services.deadline_timer import parse_timestamp
+from app.services.provisioning_timer import get_provisioning_timer, needs_codes
+from app.services.revocation_timer import get_revocation_timer
+from app.services.revocation_service import get_revocation_service
+from app.services.booking_index import get_active_booking_index
+from app.services.job_metrics import record_error, track_dependency
+from app.services.lodgify_client import get_lodgify_client, LodgifyAPIError
 import logging
-import httpx
 
 logger = logging.getLogger(__name__)
 
 
+def with_content_hash(booking_data: Dict) -> Dict:
+    """
+    Add the content hash used by upsert_bookings() to skip unchanged rows
+
+    Args:
+        booking_data: Mapped bookings row
+
+    Returns:
+        Copy of the row with content_hash set
+    """
+    content = {k: v for k, v in booking_data.items() if k != "content_hash"}
+    content_hash = hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+    return {**content, "content_hash": content_hash}
+
+
 class BookingSyncService:
     """
     Service for syncing bookings from Lodgify and provisioning access codes
@@ -29,103 +54,513 @@ class BookingSyncService:
         self.tuya_service = get_tuya_service()
         self.ring_service = get_ring_service()
         self.notification_service = get_notification_service()
+        self.provisioning_timer = get_provisioning_timer()
+        self.revocation_timer = get_revocation_timer()
+        self.lodgify = get_lodgify_client()
+        self.revocation_service = get_revocation_service()
+        # Lodgify property ID -> our property ID, refreshed on every sync
+        self._property_by_lodgify_id: Optional[Dict[str, str]] = None
         logger.info("✅ Booking sync service initialized")
 
-    async def sync_bookings_from_lodgify(self) -> Dict:
+    async def sync_bookings_from_lodgify(self, full: bool = False) -> Dict:
         """
-        Sync upcoming bookings from Lodgify API
+        Sync upcoming bookings from Lodgify API for every active property
+
+        Properties with Lodgify credentials are synced concurrently, at most
+        LODGIFY_PROPERTY_CONCURRENCY at a time. Each property has its own
+        watermark, and a failing property doesn't affect the others.
+
+        Args:
+            full: Ignore the watermarks and fetch the whole window
 
         Returns:
-            Dict with sync statistics
+            Dict with aggregated sync statistics and per-property results
         """
         logger.info("🔄 Starting Lodgify booking sync...")
 
-        if not settings.LODGIFY_API_KEY or not settings.LODGIFY_PROPERTY_ID:
+        sources = self._get_lodgify_sources()
+        if not sources:
             logger.warning("⚠️ Lodgify API credentials not configured, skipping sync")
             return {"status": "skipped", "reason": "no_credentials"}
 
+        limit = asyncio.Semaphore(settings.LODGIFY_PROPERTY_CONCURRENCY)
+
+        async def sync_source(source: Dict) -> Dict:
+            async with limit:
+                return await self._sync_property(source, full)
+
+        results = await asyncio.gather(*[sync_source(source) for source in sources])
+
+        succeeded = [r for r in results if r["status"] == "success"]
+        failed = [r for r in results if r["status"] != "success"]
+
+        summary = {
+            "status": "success" if not failed else ("partial" if succeeded else "error"),
+            "properties": len(sources),
+            "properties_failed": len(failed),
+            "new_bookings": sum(r["new_bookings"] for r in succeeded),
+            "updated_bookings": sum(r["updated_bookings"] for r in succeeded),
+            "unchanged_bookings": sum(r["unchanged_bookings"] for r in succeeded),
+            "failed_bookings": sum(r["failed_bookings"] for r in succeeded),
+            "results": results
+        }
+        summary["total"] = summary["new_bookings"] + summary["updated_bookings"]
+        if failed:
+            summary["message"] = "; ".join(f"{r['property_id']}: {r['message']}" for r in failed)
+
+        logger.info(
+            f"✅ Lodgify sync finished for {len(sources)} properties "
+            f"({len(failed)} failed): {summary['total']} bookings written"
+        )
+        return summary
+
+    def _get_lodgify_sources(self) -> List[Dict]:
+        """
+        Active properties with Lodgify credentials
+
+        Falls back to LODGIFY_PROPERTY_ID/LODGIFY_API_KEY mapped to
+        DEFAULT_PROPERTY_ID when no property has its own Lodgify ID.
+
+        Returns:
+            List of {"property_id", "lodgify_property_id", "api_key"}
+        """
+        sources = []
         try:
-            # Calculate date range (next 90 days)
-            start_date = datetime.now(timezone.utc).date()
-            end_date = (datetime.now(timezone.utc) + timedelta(days=90)).date()
-
-            # Fetch bookings from Lodgify API
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"https://api.lodgify.com/v2/reservations",
-                    headers={
-                        "X-ApiKey": settings.LODGIFY_API_KEY,
-                        "Accept": "application/json"
-                    },
-                    params={
-                        "property_id": settings.LODGIFY_PROPERTY_ID,
-                        "start": start_date.isoformat(),
-                        "end": end_date.isoformat()
-                    },
-                    timeout=30.0
-                )
-
-                if response.status_code != 200:
-                    logger.error(f"❌ Lodgify API error: {response.status_code}")
-                    return {"status": "error", "message": response.text}
-
-                lodgify_bookings = response.json()
-
-            # Process each booking
-            new_count = 0
-            updated_count = 0
+            with track_dependency("db"):
+                result = self.supabase.table("properties")\
+                    .select("id, lodgify_property_id")\
+                    .eq("is_active", True)\
+                    .not_.is_("lodgify_property_id", "null")\
+                    .execute()
+                # API keys live in property_credentials (service role only)
+                credentials_result = self.supabase.table("property_credentials")\
+                    .select("property_id, lodgify_api_key")\
+                    .in_("property_id", [prop["id"] for prop in result.data or []])\
+                    .execute() if result.data else None
+            api_keys = {
+                row["property_id"]: row["lodgify_api_key"]
+                for row in (credentials_result.data if credentials_result else None) or []
+            }
+            for prop in result.data or []:
+                api_key = api_keys.get(prop["id"]) or settings.LODGIFY_API_KEY
+                if api_key:
+                    sources.append({
+                        "property_id": prop["id"],
+                        "lodgify_property_id": prop["lodgify_property_id"],
+                        "api_key": api_key
+                    })
+        except Exception as e:
+            logger.error(f"❌ Failed to load Lodgify properties: {e}")
 
-            for lb in lodgify_bookings:
-                try:
-                    # Extract booking data
-                    booking_data = {
-                        "hospitable_id": lb.get("id") or lb.get("booking_id"),
-                        "confirmation_code": lb.get("confirmation_code"),
-                        "guest_name": lb.get("guest", {}).get("name", "Guest"),
-                        "guest_email": lb.get("guest", {}).get("email", ""),
-                        "guest_phone": lb.get("guest", {}).get("phone", ""),
-                        "guest_language": lb.get("guest", {}).get("language", "en"),
-                        "property_id": settings.DEFAULT_PROPERTY_ID,
-                        "checkin_date": lb.get("arrival"),
-                        "checkout_date": lb.get("departure"),
-                        "num_guests": lb.get("people", 1),
-                        "status": self._map_lodgify_status(lb.get("status"))
-                    }
+        if not sources and settings.LODGIFY_API_KEY and settings.LODGIFY_PROPERTY_ID:
+            sources.append({
+                "property_id": settings.DEFAULT_PROPERTY_ID,
+                "lodgify_property_id": settings.LODGIFY_PROPERTY_ID,
+                "api_key": settings.LODGIFY_API_KEY
+            })
 
-                    # Upsert booking to database
-                    result = self.supabase.table("bookings").upsert(
-                        booking_data,
-                        on_conflict="hospitable_id"
-                    ).execute()
+        self._property_by_lodgify_id = {str(src["lodgify_property_id"]): src["property_id"] for src in sources}
+        return sources
 
-                    if result.data:
-                        if len(result.data) > 0:
-                            # Check if this was an insert or update
-                            existing = self.supabase.table("bookings").select("id").eq(
-                                "hospitable_id", booking_data["hospitable_id"]
-                            ).execute()
+    def property_for_lodgify_id(self, lodgify_property_id) -> str:
+        """
+        Our property ID for a Lodgify property ID (webhook path)
 
-                            if existing.data:
-                                updated_count += 1
-                            else:
-                                new_count += 1
+        Args:
+            lodgify_property_id: Lodgify property ID from a reservation
 
-                except Exception as e:
-                    logger.error(f"❌ Failed to process booking {lb.get('id')}: {e}")
-                    continue
+        Returns:
+            Property ID, DEFAULT_PROPERTY_ID if unknown
+        """
+        if self._property_by_lodgify_id is None:
+            self._get_lodgify_sources()
+        return self._property_by_lodgify_id.get(str(lodgify_property_id), settings.DEFAULT_PROPERTY_ID)
+
+    async def _sync_property(self, source: Dict, full: bool) -> Dict:
+        """
+        Sync one property's upcoming bookings
+
+        Pages are fetched concurrently by a producer task and handed to the
+        DB writer through a bounded queue, so memory stays constant no matter
+        how many reservations fall in the sync window.
+
+        Delta sync: only reservations updated since the property's watermark
+        are requested, and rows whose content hash is unchanged are not
+        written. A full sync runs every LODGIFY_FULL_SYNC_HOURS so bookings
+        moving into the window are still picked up.
+
+        Args:
+            source: Property with Lodgify credentials (see _get_lodgify_sources)
+            full: Ignore the watermark and fetch the whole window
+
+        Returns:
+            Dict with sync statistics for the property
+        """
+        property_id = source["property_id"]
+
+        try:
+            started_at = datetime.now(timezone.utc)
+            lodgify_property_id = source["lodgify_property_id"]
+
+            # Calculate date range (next LODGIFY_SYNC_DAYS days)
+            start_date = started_at.date()
+            end_date = (started_at + timedelta(days=settings.LODGIFY_SYNC_DAYS)).date()
+
+            updated_since = None if full else self._get_sync_watermark(lodgify_property_id, started_at)
+            query = {
+                "property_id": lodgify_property_id,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            }
+            if updated_since:
+                query["updatedSince"] = updated_since.isoformat()
 
-            logger.info(f"✅ Lodgify sync complete: {new_count} new, {updated_count} updated")
+            new_count = 0
+            updated_count = 0
+            unchanged_count = 0
+            failed_count = 0
+            pages = 0
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LODGIFY_SYNC_QUEUE_SIZE)
+            producer = asyncio.create_task(self._enqueue_reservation_pages(query, source["api_key"], queue))
+
+            try:
+                # Pages are smaller than an upsert batch - accumulate until a batch is full
+                batch: List[Dict] = []
+                while True:
+                    page = await queue.get()
+                    if page is not None:
+                        pages += 1
+                        batch.extend(page)
+                        if len(batch) < settings.LODGIFY_UPSERT_BATCH_SIZE:
+                            continue
+                    elif not batch:
+                        break
+
+                    # Supabase client is blocking - write off the event loop so fetching continues
+                    changes, batch_counts = await asyncio.to_thread(self._write_bookings, batch, property_id)
+                    new_count += batch_counts["new"]
+                    updated_count += batch_counts["updated"]
+                    unchanged_count += batch_counts["unchanged"]
+                    failed_count += batch_counts["failed"]
+                    batch = []
+
+                    # Cancellations and date changes seen here first revoke or re-provision codes
+                    for previous, row in changes:
+                        try:
+                            await self.apply_booking_change(previous, row)
+                        except Exception as e:
+                            logger.error(f"❌ Failed to apply change for booking {row['id']}: {e}", exc_info=True)
+                            record_error(f"Booking {row['hospitable_id']} change: {e}")
+
+                    if page is None:
+                        break
+
+                # Surface fetch errors from the producer
+                await producer
+            finally:
+                if not producer.done():
+                    producer.cancel()
+
+            # Keep the old watermark if any booking failed, so the next delta sync retries it
+            if failed_count:
+                logger.warning(f"⚠️ {property_id}: {failed_count} bookings failed, sync watermark not advanced")
+            else:
+                self._set_sync_watermark(lodgify_property_id, started_at, full_sync=updated_since is None)
+
+            mode = f"delta since {updated_since.isoformat()}" if updated_since else "full"
+            logger.info(
+                f"✅ Lodgify sync complete for {property_id} ({mode}): {new_count} new, "
+                f"{updated_count} updated, {unchanged_count} unchanged ({pages} pages)"
+            )
 
             return {
                 "status": "success",
+                "property_id": property_id,
+                "mode": "delta" if updated_since else "full",
                 "new_bookings": new_count,
                 "updated_bookings": updated_count,
+                "unchanged_bookings": unchanged_count,
+                "failed_bookings": failed_count,
                 "total": new_count + updated_count
             }
 
+        except LodgifyAPIError as e:
+            logger.error(f"❌ Lodgify API error for {property_id}: {e.status_code}")
+            record_error(f"{property_id}: Lodgify API error {e.status_code}")
+            return {"status": "error", "property_id": property_id, "message": e.message}
+
         except Exception as e:
-            logger.error(f"❌ Lodgify sync failed: {e}", exc_info=True)
-            return {"status": "error", "message": str(e)}
+            logger.error(f"❌ Lodgify sync failed for {property_id}: {e}", exc_info=True)
+            record_error(f"{property_id}: {e}")
+            return {"status": "error", "property_id": property_id, "message": str(e)}
+
+    async def _enqueue_reservation_pages(self, query: Dict, api_key: str, queue: asyncio.Queue) -> None:
+        """
+        Producer: push each reservation page onto the queue, then a None sentinel
+        Blocks on a full queue, so at most LODGIFY_SYNC_QUEUE_SIZE pages are held
+        """
+        try:
+            async for page in self._iter_reservation_pages(query, api_key):
+                await queue.put(page)
+        except asyncio.CancelledError:
+            # Writer is gone, nobody is left to read the sentinel
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def _iter_reservation_pages(self, query: Dict, api_key: str) -> AsyncIterator[List[Dict]]:
+        """
+        Async generator over Lodgify reservation pages
+
+        The first page carries the total count; remaining pages are fetched
+        LODGIFY_PAGE_CONCURRENCY at a time. Without a count, pages are walked
+        sequentially until a short page.
+        """
+        size = settings.LODGIFY_PAGE_SIZE
+
+        items, total = await self._fetch_reservation_page(query, api_key, 1)
+        if items:
+            yield items
+
+        if total is None:
+            page = 1
+            while len(items) == size:
+                page += 1
+                items, _ = await self._fetch_reservation_page(query, api_key, page)
+                if items:
+                    yield items
+            return
+
+        last_page = math.ceil(total / size)
+        for window_start in range(2, last_page + 1, settings.LODGIFY_PAGE_CONCURRENCY):
+            window = range(window_start, min(window_start + settings.LODGIFY_PAGE_CONCURRENCY, last_page + 1))
+            results = await asyncio.gather(*[
+                self._fetch_reservation_page(query, api_key, page)
+                for page in window
+            ])
+            for items, _ in results:
+                if items:
+                    yield items
+
+    async def _fetch_reservation_page(self, query: Dict, api_key: str, page: int) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Fetch one page of reservations
+
+        Returns:
+            (items, total count or None if Lodgify didn't report one)
+        """
+        data = await self.lodgify.get_json(
+            "/v2/reservations",
+            params={
+                **query,
+                "page": page,
+                "size": settings.LODGIFY_PAGE_SIZE,
+                "includeCount": "true"
+            },
+            api_key=api_key
+        )
+        if isinstance(data, list):
+            return data, None
+        return data.get("items", []), data.get("count")
+
+    def map_lodgify_booking(self, lb: Dict, property_id: Optional[str] = None) -> Dict:
+        """
+        Map a Lodgify reservation to a bookings row, with its content hash
+
+        Args:
+            lb: Lodgify reservation
+            property_id: Our property ID (defaults to DEFAULT_PROPERTY_ID)
+        """
+        return with_content_hash({
+            "hospitable_id": lb.get("id") or lb.get("booking_id"),
+            "confirmation_code": lb.get("confirmation_code"),
+            "guest_name": lb.get("guest", {}).get("name", "Guest"),
+            "guest_email": lb.get("guest", {}).get("email", ""),
+            "guest_phone": lb.get("guest", {}).get("phone", ""),
+            "guest_language": lb.get("guest", {}).get("language", "en"),
+            "property_id": property_id or settings.DEFAULT_PROPERTY_ID,
+            "checkin_date": lb.get("arrival"),
+            "checkout_date": lb.get("departure"),
+            "num_guests": lb.get("people", 1),
+            "status": self._map_lodgify_status(lb.get("status"))
+        })
+
+    async def apply_booking_change(self, previous: Optional[Dict], booking: Dict) -> Dict:
+        """
+        Act on one booking that was just created or changed
+
+        - cancelled: revoke its codes and drop it from the provisioning timer
+        - dates moved after codes were provisioned: revoke the old codes and re-provision
+        - otherwise: (re)schedule provisioning
+
+        Args:
+            previous: Row before the change (None for new bookings)
+            booking: Row after the change
+
+        Returns:
+            Dict describing the action taken
+        """
+        booking_id = booking["id"]
+        get_active_booking_index().update(booking)
+
+        if booking["status"] == "cancelled":
+            revocation = await self.revocation_service.revoke_booking_codes(booking_id, "Booking cancelled")
+            self.provisioning_timer.cancel(booking_id)
+            logger.info(f"✅ Booking {booking_id} cancelled, {revocation['revoked']} codes revoked")
+            return {"action": "cancelled", "codes_revoked": revocation["revoked"]}
+
+        dates_moved = previous is not None and (
+            parse_timestamp(previous["checkin_date"]) != parse_timestamp(booking["checkin_date"])
+            or parse_timestamp(previous["checkout_date"]) != parse_timestamp(booking["checkout_date"])
+        )
+        if dates_moved and booking.get("codes_provisioned"):
+            revocation = await self.revocation_service.revoke_booking_codes(booking_id, "Booking dates changed")
+            with track_dependency("db"):
+                result = self.supabase.table("bookings").update({
+                    "codes_provisioned": False,
+                    "codes_provisioned_at": None
+                }).eq("id", booking_id).execute()
+            booking = result.data[0] if result.data else {**booking, "codes_provisioned": False}
+            self.provisioning_timer.schedule(booking)
+            logger.info(f"✅ Booking {booking_id} dates changed, {revocation['revoked']} codes revoked for re-provisioning")
+            return {"action": "rescheduled", "codes_revoked": revocation["revoked"]}
+
+        self.provisioning_timer.schedule(booking)
+        return {"action": "created" if previous is None else "updated"}
+
+    def _get_sync_watermark(self, property_id: str, now: datetime) -> Optional[datetime]:
+        """
+        updatedSince for a delta sync, or None when a full sync is due
+
+        Args:
+            property_id: Lodgify property ID
+            now: Start time of this sync
+
+        Returns:
+            Watermark minus LODGIFY_SYNC_OVERLAP_MINUTES, or None
+        """
+        try:
+            with track_dependency("db"):
+                response = self.supabase.table("lodgify_sync_state").select("*").eq(
+                    "property_id", property_id
+                ).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read sync watermark for {property_id}, running full sync: {e}")
+            return None
+
+        if not response.data:
+            return None
+
+        state = response.data[0]
+        if not state.get("last_synced_at") or not state.get("last_full_sync_at"):
+            return None
+
+        last_full_sync = parse_timestamp(state["last_full_sync_at"])
+        if now - last_full_sync >= timedelta(hours=settings.LODGIFY_FULL_SYNC_HOURS):
+            return None
+
+        # Overlap absorbs clock skew between us and Lodgify
+        return parse_timestamp(state["last_synced_at"]) - timedelta(minutes=settings.LODGIFY_SYNC_OVERLAP_MINUTES)
+
+    def _set_sync_watermark(self, property_id: str, started_at: datetime, full_sync: bool) -> None:
+        """
+        Advance the watermark to the start of a successful sync
+        """
+        state = {
+            "property_id": property_id,
+            "last_synced_at": started_at.isoformat(),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        if full_sync:
+            state["last_full_sync_at"] = started_at.isoformat()
+
+        with track_dependency("db"):
+            self.supabase.table("lodgify_sync_state").upsert(state, on_conflict="property_id").execute()
+
+    def _write_bookings(
+        self, lodgify_bookings: List[Dict], property_id: str
+    ) -> Tuple[List[Tuple[Optional[Dict], Dict]], Dict[str, int]]:
+        """
+        DB writer: bulk upsert Lodgify reservations, LODGIFY_UPSERT_BATCH_SIZE per round trip
+        Rows with an unchanged content hash are skipped by upsert_bookings()
+
+        Returns:
+            ((previous row or None, written row) per written booking, {"new", "updated", "unchanged", "failed"} counts)
+        """
+        counts = {"new": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+        # ON CONFLICT can't touch the same row twice in one statement - last one wins
+        by_id: Dict[str, Dict] = {}
+        for lb in lodgify_bookings:
+            try:
+                booking_data = self.map_lodgify_booking(lb, property_id)
+                by_id[str(booking_data["hospitable_id"])] = booking_data
+            except Exception as e:
+                logger.error(f"❌ Failed to map booking {lb.get('id')}: {e}")
+                record_error(f"Booking {lb.get('id')}: {e}")
+                counts["failed"] += 1
+
+        bookings = list(by_id.values())
+        changes = []
+
+        for i in range(0, len(bookings), settings.LODGIFY_UPSERT_BATCH_SIZE):
+            chunk = bookings[i:i + settings.LODGIFY_UPSERT_BATCH_SIZE]
+            try:
+                previous = self._get_previous_rows([booking["hospitable_id"] for booking in chunk])
+            except Exception as e:
+                # Without the old rows date changes can't be detected - leave the chunk for the next sync
+                logger.error(f"❌ Failed to read {len(chunk)} existing bookings, skipping their write: {e}")
+                record_error(f"Previous booking rows: {e}")
+                counts["failed"] += len(chunk)
+                continue
+            written, failed = self.upsert_bookings(chunk)
+            counts["failed"] += failed
+            counts["unchanged"] += len(chunk) - len(written) - failed
+            for inserted, row in written:
+                changes.append((None if inserted else previous.get(row["hospitable_id"]), row))
+                counts["new" if inserted else "updated"] += 1
+
+        return changes, counts
+
+    def _get_previous_rows(self, hospitable_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Current rows for bookings about to be upserted, keyed by hospitable_id
+        """
+        with track_dependency("db"):
+            result = self.supabase.table("bookings").select("*").in_("hospitable_id", hospitable_ids).execute()
+        return {row["hospitable_id"]: row for row in result.data or []}
+
+    def upsert_bookings(self, bookings: List[Dict]) -> Tuple[List[Tuple[bool, Dict]], int]:
+        """
+        Upsert mapped bookings with one upsert_bookings() call
+        If the batch is rejected, retry row by row so one bad booking doesn't drop the rest
+        Unchanged rows (same content hash) are neither written nor returned
+
+        Returns:
+            ((inserted, booking row) per written booking, number of failed bookings)
+        """
+        try:
+            with track_dependency("db"):
+                response = self.supabase.rpc("upsert_bookings", {"p_bookings": bookings}).execute()
+            return [(row["inserted"], row["booking"]) for row in response.data or []], 0
+
+        except Exception as e:
+            if len(bookings) == 1:
+                logger.error(f"❌ Failed to process booking {bookings[0]['hospitable_id']}: {e}")
+                record_error(f"Booking {bookings[0]['hospitable_id']}: {e}")
+                return [], 1
+
+            logger.warning(f"⚠️ Bulk upsert of {len(bookings)} bookings failed, retrying individually: {e}")
+            written = []
+            failed = 0
+            for booking in bookings:
+                booking_written, booking_failed = self.upsert_bookings([booking])
+                written.extend(booking_written)
+                failed += booking_failed
+            return written, failed
 
     async def provision_codes_for_upcoming_bookings(self) -> Dict:
         """
@@ -184,6 +619,36 @@ class BookingSyncService:
             )
             return {"status": "error", "message": str(e)}
 
+    async def provision_booking_by_id(self, booking_id: str) -> Optional[bool]:
+        """
+        Provision access codes for one booking when the provisioning timer fires
+        Re-reads the booking so cancellations or manual provisioning since
+        scheduling are respected
+
+        Args:
+            booking_id: UUID of the booking
+
+        Returns:
+            True/False for provisioning success, None if no longer needed
+        """
+        try:
+            with track_dependency("db"):
+                response = self.supabase.table("bookings").select("*").eq("id", booking_id).execute()
+        except Exception as e:
+            logger.error(f"❌ Failed to load booking {booking_id} for provisioning: {e}")
+            return False
+
+        if not response.data:
+            logger.info(f"⏭️ Booking {booking_id} no longer exists, skipping provisioning")
+            return None
+
+        booking = response.data[0]
+        if not needs_codes(booking):
+            logger.info(f"⏭️ Booking {booking_id} no longer needs codes, skipping provisioning")
+            return None
+
+        return await self._provision_codes_for_booking(booking)
+
     async def _provision_codes_for_booking(self, booking: Dict) -> bool:
         """
         Provision access codes for a single booking
@@ -207,9 +672,10 @@ class BookingSyncService:
             valid_from, valid_until = calculate_code_validity(checkin_date, checkout_date)
 
             # Get all active locks for this property
-            locks_response = self.supabase.table("locks").select("*").eq(
-                "property_id", booking["property_id"]
-            ).eq("is_active", True).execute()
+            with track_dependency("db"):
+                locks_response = self.supabase.table("locks").select("*").eq(
+                    "property_id", booking["property_id"]
+                ).eq("is_active", True).execute()
 
             locks = locks_response.data or []
 
@@ -228,7 +694,7 @@ class BookingSyncService:
                     # Provision on Tuya device
                     tuya_password_id = None
                     if lock_type in ['main_entrance', 'apartment_door']:
-                        tuya_password_id = self.tuya_service.create_temporary_password(
+                        tuya_password_id = await self.tuya_service.create_temporary_password(
                             device_id=device_id,
                             password=pin_code,
                             valid_from=valid_from,
@@ -239,11 +705,11 @@ class BookingSyncService:
                     # Provision on Ring device
                     ring_code_id = None
                     if lock_type == 'floor_door':
-                        ring_code_id = await self.ring_service.create_guest_code(
+                        ring_code_id = await self.ring_service.create_access_code(
+                            guest_name=f"{booking['guest_name'][:20]}",
                             code=pin_code,
-                            label=f"{booking['guest_name'][:20]}",
-                            start_time=valid_from,
-                            end_time=valid_until
+                            valid_from=valid_from,
+                            valid_until=valid_until
                         )
 
                     # Create access_code record
@@ -261,9 +727,11 @@ class BookingSyncService:
                         "device_id": device_id
                     }
 
-                    result = self.supabase.table("access_codes").insert(code_data).execute()
+                    with track_dependency("db"):
+                        result = self.supabase.table("access_codes").insert(code_data).execute()
 
                     if result.data:
+                        self.revocation_timer.schedule(result.data[0])
                         codes_created.append({
                             "lock_type": lock_type,
                             "code": pin_code,
@@ -273,6 +741,7 @@ class BookingSyncService:
 
                 except Exception as e:
                     logger.error(f"❌ Failed to provision code for lock {lock['id']}: {e}")
+                    record_error(f"Lock {lock['id']}: {e}")
                     continue
 
             if not codes_created:
@@ -280,10 +749,11 @@ class BookingSyncService:
                 return False
 
             # Update booking - mark codes as provisioned
-            self.supabase.table("bookings").update({
-                "codes_provisioned": True,
-                "codes_provisioned_at": datetime.now(timezone.utc).isoformat()
-            }).eq("id", booking_id).execute()
+            with track_dependency("db"):
+                self.supabase.table("bookings").update({
+                    "codes_provisioned": True,
+                    "codes_provisioned_at": datetime.now(timezone.utc).isoformat()
+                }).eq("id", booking_id).execute()
 
             # TODO: Send access codes to guest via Lodgify messaging API
             # Lodgify handles guest communication, no need for Twilio/WhatsApp/SMS
@@ -0,0 +1,183 @@
+"""
+Min-heap deadline timer
+Base for the event-driven provisioning and revocation timers
+"""
+import asyncio
+import heapq
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.job_metrics import job_run
+from app.services.leader_election import get_leader_elector
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Parse a DB/ISO timestamp into an aware datetime
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class DeadlineTimer(ABC):
+    """
+    Min-heap of keys with due times; fires every key whose due time has passed
+
+    Heap entries are (due_at, key). Rescheduling or cancelling a key only
+    updates the _due map; stale heap entries are skipped when popped.
+    Keys sharing a due time are popped together and fired as one batch.
+    """
+
+    name = "Deadline timer"
+    # Job name used for run history (see job_metrics)
+    job_name = "deadline_timer"
+
+    def __init__(self):
+        """
+        Initialize an empty timer
+        """
+        self._heap: List[Tuple[datetime, str]] = []
+        self._due: Dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def _set(self, key: str, due_at: datetime) -> None:
+        """
+        Schedule or reschedule a key
+        Ignored on other workers: only the leader runs the timer, and it picks
+        their changes up through its change poll / periodic rebuild
+        """
+        if not get_leader_elector().is_leader:
+            return
+        if self._due.get(key) == due_at:
+            return
+        self._due[key] = due_at
+        heapq.heappush(self._heap, (due_at, key))
+        self._wakeup.set()
+
+    def _replace(self, due: Dict[str, datetime]) -> None:
+        """
+        Replace the whole schedule (used by rebuild)
+        """
+        self._due = due
+        self._heap = [(due_at, key) for key, due_at in due.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def cancel(self, key: str) -> None:
+        """
+        Remove a key from the timer
+
+        Args:
+            key: Key to remove
+        """
+        if self._due.pop(key, None) is not None:
+            self._wakeup.set()
+
+    def next_due_at(self) -> Optional[datetime]:
+        """
+        Due time of the earliest live entry, or None if the timer is empty
+        """
+        while self._heap:
+            due_at, key = self._heap[0]
+            if self._due.get(key) == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        """
+        Pop all live entries whose due time has passed
+        """
+        due_keys = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, key = heapq.heappop(self._heap)
+            if self._due.get(key) != due_at:
+                continue
+            del self._due[key]
+            due_keys.append(key)
+        return due_keys
+
+    @abstractmethod
+    async def rebuild(self) -> int:
+        """
+        Rebuild the schedule from the database
+
+        Returns:
+            Number of keys scheduled
+        """
+
+    @abstractmethod
+    async def _fire(self, keys: List[str]) -> None:
+        """
+        Handle keys whose due time has passed
+        """
+
+    async def start(self) -> None:
+        """
+        Rebuild from the database and start the timer loop
+        """
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"❌ Failed to rebuild {self.name.lower()}: {e}", exc_info=True)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+        logger.info(f"✅ {self.name} started")
+
+    async def stop(self) -> None:
+        """
+        Stop the timer loop
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info(f"🛑 {self.name} stopped")
+
+    async def _run(self) -> None:
+        """
+        Sleep until the next due key (or until the heap changes), then fire
+        """
+        while True:
+            self._wakeup.clear()
+
+            next_due = self.next_due_at()
+            timeout = None
+            if next_due is not None:
+                timeout = max((next_due - datetime.now(timezone.utc)).total_seconds(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            if not get_leader_elector().is_leader:
+                # Lease ran out (e.g. stalled heartbeat): don't act until it's renewed or we're demoted
+                await asyncio.sleep(settings.SCHEDULER_HEARTBEAT_SECONDS)
+                continue
+
+            try:
+                due_keys = self._pop_due(datetime.now(timezone.utc))
+                if due_keys:
+                    async with job_run(self.job_name):
+                        await self._fire(due_keys)
+            except Exception as e:
+                logger.error(f"❌ {self.name} error: {e}", exc_info=True)
@@ -0,0 +1,356 @@
+"""
+Device status cache
+A background poller refreshes every active lock's online/battery state on a
+staggered interval; admin pages read the cache instead of calling vendor APIs.
+Only the leader polls: it shares each result through the device_status table
+(which the other workers mirror) and records it as a telemetry sample.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.tuya_service import get_tuya_service
+from app.services.ring_service import get_ring_service
+from app.services.home_assistant_service import get_home_assistant_service
+from app.services.reconciliation_service import lock_vendor
+from app.services.revocation_service import VENDOR_RING
+from app.services.device_telemetry import get_device_telemetry_store
+from app.services.deadline_timer import parse_timestamp
+from app.services.leader_election import get_leader_elector
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tuya data points carrying the battery percentage (varies by lock model)
+TUYA_BATTERY_CODES = ("residual_electricity", "battery_percentage", "va_battery")
+TUYA_SIGNAL_CODES = ("signal_strength", "wireless_signal", "rssi")
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _percent(value) -> Optional[int]:
+    try:
+        return max(0, min(100, int(float(value))))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_tuya_status(device: Dict) -> Dict:
+    """
+    Online flag, battery level and signal from a Tuya device details response
+    """
+    battery = signal = None
+    for point in device.get("status") or []:
+        if battery is None and point.get("code") in TUYA_BATTERY_CODES:
+            battery = _percent(point.get("value"))
+        elif signal is None and point.get("code") in TUYA_SIGNAL_CODES:
+            signal = _int(point.get("value"))
+    return {"online": bool(device.get("online")), "battery": battery, "signal": signal}
+
+
+def parse_ring_status(device: Dict) -> Dict:
+    """
+    Online flag, battery level and Wi-Fi RSSI from a Ring ring_devices intercom entry
+    """
+    connection = (device.get("alerts") or {}).get("connection")
+    health = device.get("health") or {}
+    return {
+        "online": connection != "offline",
+        "battery": _percent(device.get("battery_life")),
+        "signal": _int(health.get("rssi") or health.get("latest_signal_strength"))
+    }
+
+
+class DeviceStatusPoller:
+    """
+    In-memory status cache keyed by lock ID
+
+    On the leader, each cycle (DEVICE_STATUS_POLL_SECONDS) reloads the active
+    locks and polls them one at a time, spaced evenly across the interval so
+    vendor APIs see a steady trickle instead of a burst. Other workers reload
+    the leader's results from device_status every DEVICE_STATUS_REFRESH_SECONDS
+    instead, so vendor load doesn't grow with the number of workers. A failed
+    poll keeps the last known values; readers see them as stale once
+    checked_at is older than DEVICE_STATUS_STALE_SECONDS.
+    """
+
+    def __init__(self):
+        """
+        Initialize device status poller
+        """
+        self.tuya_service = get_tuya_service()
+        self.ring_service = get_ring_service()
+        self.ha_service = get_home_assistant_service()
+        self.telemetry = get_device_telemetry_store()
+        self._statuses: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        logger.info("✅ Device status poller initialized")
+
+    async def start(self) -> None:
+        """
+        Start the background polling loop
+        """
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="Device status poller")
+        logger.info(f"✅ Device status poller started (every {settings.DEVICE_STATUS_POLL_SECONDS}s)")
+
+    async def stop(self) -> None:
+        """
+        Stop the background polling loop
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.telemetry.flush()
+        logger.info("🛑 Device status poller stopped")
+
+    def get_status(self, lock_id: str) -> Dict:
+        """
+        Cached status of a lock
+
+        Args:
+            lock_id: Lock UUID
+
+        Returns:
+            {online, battery, lock_state, checked_at, age_seconds, stale, error};
+            online/battery are None until the lock has been polled once
+        """
+        entry = self._statuses.get(lock_id)
+        if entry is None or entry["checked_at"] is None:
+            return {
+                "online": None,
+                "battery": None,
+                "lock_state": None,
+                "checked_at": None,
+                "age_seconds": None,
+                "stale": True,
+                "error": entry["error"] if entry else None
+            }
+
+        age = (datetime.now(timezone.utc) - entry["checked_at"]).total_seconds()
+        return {
+            "online": entry["online"],
+            "battery": entry["battery"],
+            "lock_state": entry["lock_state"],
+            "checked_at": entry["checked_at"].isoformat(),
+            "age_seconds": int(age),
+            "stale": age > settings.DEVICE_STATUS_STALE_SECONDS,
+            "error": entry["error"]
+        }
+
+    async def _run(self) -> None:
+        """
+        Poll every active lock once per interval, staggered (leader),
+        or mirror the leader's results (other workers)
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if not get_leader_elector().is_leader:
+                try:
+                    await self._refresh()
+                except Exception as e:
+                    logger.error(f"❌ Device status poller failed to load shared statuses: {e}")
+                await asyncio.sleep(settings.DEVICE_STATUS_REFRESH_SECONDS)
+                continue
+
+            interval = settings.DEVICE_STATUS_POLL_SECONDS
+            try:
+                # Supabase client is blocking - query off the event loop
+                locks = await asyncio.to_thread(self._load_locks)
+            except Exception as e:
+                logger.error(f"❌ Device status poller failed to load locks: {e}")
+                await asyncio.sleep(interval)
+                continue
+
+            # Forget locks that were deactivated or removed
+            active_ids = {lock["id"] for lock in locks}
+            for lock_id in list(self._statuses):
+                if lock_id not in active_ids:
+                    del self._statuses[lock_id]
+
+            if not locks:
+                await asyncio.sleep(interval)
+                continue
+
+            step = interval / len(locks)
+            for lock in locks:
+                if not get_leader_elector().is_leader:
+                    break
+                started = loop.time()
+                await self._poll(lock)
+                await asyncio.sleep(max(step - (loop.time() - started), 0))
+
+            await self.telemetry.flush()
+
+    async def _refresh(self) -> None:
+        """
+        Replace the cache with the statuses the leader stored in device_status
+        """
+        supabase = get_supabase()
+        with track_dependency("db"):
+            result = await asyncio.to_thread(
+                supabase.table("device_status")
+                .select("lock_id, online, battery, lock_state, checked_at, error")
+                .execute
+            )
+
+        self._statuses = {
+            row["lock_id"]: {
+                "online": row["online"],
+                "battery": row["battery"],
+                "lock_state": row["lock_state"],
+                "checked_at": parse_timestamp(row["checked_at"]) if row["checked_at"] else None,
+                "error": row["error"]
+            }
+            for row in result.data or []
+        }
+
+    async def _store(self, lock_id: str, fields: Dict) -> None:
+        """
+        Share one poll result with the other workers through device_status
+        """
+        row = {"lock_id": lock_id, **fields, "updated_at": datetime.now(timezone.utc).isoformat()}
+        try:
+            with track_dependency("db"):
+                await asyncio.to_thread(
+                    get_supabase().table("device_status").upsert(row, on_conflict="lock_id").execute
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to store status for lock {lock_id}: {e}")
+
+    def _load_locks(self) -> List[Dict]:
+        supabase = get_supabase()
+        with track_dependency("db"):
+            result = supabase.table("locks")\
+                .select("id, device_id, lock_type, ha_entity_id")\
+                .eq("is_active", True)\
+                .order("property_id")\
+                .order("display_order")\
+                .execute()
+
+        # Vendors in mock mode have nothing real to report
+        return [
+            lock for lock in result.data or []
+            if (self.ring_service.is_configured if lock_vendor(lock) == VENDOR_RING else self.tuya_service.is_configured)
+            or (lock.get("ha_entity_id") and settings.HOME_ASSISTANT_URL)
+        ]
+
+    async def _poll(self, lock: Dict) -> None:
+        """
+        Refresh one lock's cache entry
+        """
+        entry = self._statuses.setdefault(lock["id"], {
+            "online": None,
+            "battery": None,
+            "lock_state": None,
+            "checked_at": None,
+            "error": None
+        })
+
+        started = asyncio.get_running_loop().time()
+        try:
+            status = await asyncio.wait_for(self._fetch(lock), timeout=settings.DEVICE_STATUS_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            status, error = None, "Status request timed out"
+        except Exception as e:
+            status, error = None, str(e)
+        else:
+            error = None if status is not None else "Device status unavailable"
+
+        if status is None:
+            entry["error"] = error
+            logger.warning(f"⚠️ Status poll failed for lock {lock['device_id']}: {error}")
+            await self._store(lock["id"], {"error": error})
+            return
+
+        checked_at = datetime.now(timezone.utc)
+        entry.update({key: value for key, value in status.items() if key != "signal"})
+        entry["checked_at"] = checked_at
+        entry["error"] = None
+
+        await self._store(lock["id"], {
+            "online": entry["online"],
+            "battery": entry["battery"],
+            "lock_state": entry["lock_state"],
+            "checked_at": checked_at.isoformat(),
+            "error": None
+        })
+
+        # Leadership can lapse mid-cycle; only the leader stores the series
+        if get_leader_elector().is_leader:
+            latency_ms = int((asyncio.get_running_loop().time() - started) * 1000)
+            self.telemetry.record(lock["id"], checked_at, status, latency_ms)
+
+    async def _fetch(self, lock: Dict) -> Optional[Dict]:
+        """
+        Query the vendor (and Home Assistant, if the lock has an entity) for one lock
+        """
+        status: Dict = {}
+
+        if lock_vendor(lock) == VENDOR_RING:
+            if self.ring_service.is_configured:
+                device = await self.ring_service.get_device_status()
+                if device is None:
+                    return None
+                status = parse_ring_status(device)
+        elif self.tuya_service.is_configured:
+            device = await self.tuya_service.get_device_info(lock["device_id"])
+            if device is None:
+                return None
+            status = parse_tuya_status(device)
+
+        if lock.get("ha_entity_id") and settings.HOME_ASSISTANT_URL:
+            state = await self.ha_service.get_state(lock["ha_entity_id"])
+            if state is None:
+                return status or None
+            attributes = state.get("attributes") or {}
+            status["lock_state"] = state.get("state")
+            if status.get("battery") is None:
+                status["battery"] = _percent(attributes.get("battery_level"))
+            if "online" not in status:
+                status["online"] = state.get("state") != "unavailable"
+
+        return status
+
+
+# Global instance
+_device_status_poller: Optional[DeviceStatusPoller] = None
+
+
+def get_device_status_poller() -> DeviceStatusPoller:
+    """
+    Get or create device status poller singleton
+    """
+    global _device_status_poller
+    if _device_status_poller is None:
+        _device_status_poller = DeviceStatusPoller()
+    return _device_status_poller
+
+
+async def start_device_status_poller():
+    """
+    Start polling (called from application lifespan, every worker process;
+    only the leader calls vendor APIs)
+    """
+    await get_device_status_poller().start()
+
+
+async def stop_device_status_poller():
+    """
+    Stop polling
+    """
+    if _device_status_poller:
+        await _device_status_poller.stop()
@@ -0,0 +1,183 @@
+"""
+Device telemetry time series
+Polled lock status is buffered in memory and written to device_telemetry in
+batches; downsample_device_telemetry() rolls it into hourly and daily buckets
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESOLUTION_RAW = "raw"
+RESOLUTION_HOUR = "hour"
+RESOLUTION_DAY = "day"
+RESOLUTIONS = (RESOLUTION_RAW, RESOLUTION_HOUR, RESOLUTION_DAY)
+
+ROLLUP_COLUMNS = (
+    "bucket, samples, online_ratio, battery_min, battery_avg, battery_max, "
+    "signal_avg, latency_avg_ms, latency_max_ms"
+)
+
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """
+    Coarsest resolution that still gives a useful number of points for a range
+
+    Raw samples are only kept DEVICE_TELEMETRY_RAW_DAYS, hourly buckets
+    DEVICE_TELEMETRY_HOURLY_DAYS; older ranges fall through to daily buckets.
+
+    Args:
+        start: Range start
+        end: Range end
+
+    Returns:
+        "raw", "hour" or "day"
+    """
+    span = end - start
+    if span <= timedelta(days=min(2, settings.DEVICE_TELEMETRY_RAW_DAYS)):
+        return RESOLUTION_RAW
+    if span <= timedelta(days=min(60, settings.DEVICE_TELEMETRY_HOURLY_DAYS)):
+        return RESOLUTION_HOUR
+    return RESOLUTION_DAY
+
+
+class DeviceTelemetryStore:
+    """
+    Buffered writer and reader for device telemetry
+    """
+
+    def __init__(self):
+        """
+        Initialize telemetry store
+        """
+        self.supabase = get_supabase()
+        self._buffer: List[Dict] = []
+        logger.info("✅ Device telemetry store initialized")
+
+    def record(self, lock_id: str, recorded_at: datetime, status: Dict, latency_ms: int) -> None:
+        """
+        Buffer one polled status sample
+
+        Args:
+            lock_id: Lock UUID
+            recorded_at: Poll time
+            status: Parsed status (online, battery, signal)
+            latency_ms: Duration of the status call(s)
+        """
+        self._buffer.append({
+            "lock_id": lock_id,
+            "recorded_at": recorded_at.isoformat(),
+            "online": status.get("online"),
+            "battery": status.get("battery"),
+            "signal": status.get("signal"),
+            "latency_ms": latency_ms
+        })
+
+    async def flush(self) -> int:
+        """
+        Write buffered samples in one insert
+
+        Returns:
+            Number of samples written (0 if the insert failed; samples are kept for the next flush)
+        """
+        if not self._buffer:
+            return 0
+
+        rows, self._buffer = self._buffer, []
+        try:
+            # Supabase client is blocking - write off the event loop
+            await asyncio.to_thread(self._insert, rows)
+            return len(rows)
+        except Exception as e:
+            # Put the batch back ahead of samples buffered meanwhile, keeping the newest ones
+            buffered = rows + self._buffer
+            limit = settings.DEVICE_TELEMETRY_BUFFER_MAX
+            self._buffer = buffered[-limit:]
+            dropped = len(buffered) - len(self._buffer)
+            logger.error(
+                f"❌ Failed to store {len(rows)} telemetry samples, retrying on the next flush"
+                f"{f' ({dropped} oldest dropped)' if dropped else ''}: {e}"
+            )
+            return 0
+
+    def _insert(self, rows: List[Dict]) -> None:
+        with track_dependency("db"):
+            self.supabase.table("device_telemetry").insert(rows).execute()
+
+    def downsample(self) -> Dict:
+        """
+        Refresh hourly/daily rollups and prune rows past retention
+
+        Returns:
+            {hourly_buckets, daily_buckets, raw_pruned, rollups_pruned}
+        """
+        with track_dependency("db"):
+            result = self.supabase.rpc("downsample_device_telemetry", {
+                "p_raw_retention_days": settings.DEVICE_TELEMETRY_RAW_DAYS,
+                "p_hourly_retention_days": settings.DEVICE_TELEMETRY_HOURLY_DAYS,
+                "p_daily_retention_days": settings.DEVICE_TELEMETRY_DAILY_DAYS
+            }).execute()
+        return (result.data or [{}])[0]
+
+    def query(self, lock_id: str, start: datetime, end: datetime, resolution: Optional[str] = None) -> Dict:
+        """
+        Telemetry series for one lock
+
+        Args:
+            lock_id: Lock UUID
+            start: Range start
+            end: Range end
+            resolution: "raw", "hour" or "day" (default: picked from the range)
+
+        Returns:
+            {lock_id, resolution, start, end, points}
+        """
+        resolution = resolution or pick_resolution(start, end)
+
+        with track_dependency("db"):
+            if resolution == RESOLUTION_RAW:
+                result = self.supabase.table("device_telemetry")\
+                    .select("recorded_at, online, battery, signal, latency_ms")\
+                    .eq("lock_id", lock_id)\
+                    .gte("recorded_at", start.isoformat())\
+                    .lt("recorded_at", end.isoformat())\
+                    .order("recorded_at")\
+                    .limit(settings.DEVICE_TELEMETRY_MAX_POINTS)\
+                    .execute()
+            else:
+                result = self.supabase.table("device_telemetry_rollups")\
+                    .select(ROLLUP_COLUMNS)\
+                    .eq("lock_id", lock_id)\
+                    .eq("resolution", resolution)\
+                    .gte("bucket", start.isoformat())\
+                    .lt("bucket", end.isoformat())\
+                    .order("bucket")\
+                    .limit(settings.DEVICE_TELEMETRY_MAX_POINTS)\
+                    .execute()
+
+        return {
+            "lock_id": lock_id,
+            "resolution": resolution,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": result.data or []
+        }
+
+
+# Global instance
+_device_telemetry_store: Optional[DeviceTelemetryStore] = None
+
+
+def get_device_telemetry_store() -> DeviceTelemetryStore:
+    """
+    Get or create device telemetry store singleton
+    """
+    global _device_telemetry_store
+    if _device_telemetry_store is None:
+        _device_telemetry_store = DeviceTelemetryStore()
+    return _device_telemetry_store
@@ -3,9 +3,14 @@ Home Assistant integration service
 Controls Tuya smart locks through Home Assistant
 """
 import aiohttp
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from app.core.config import settings
+from app.core.resilience import vendor_guard
+from app.core.http import create_vendor_session
+from app.services.home_assistant_ws import get_home_assistant_stream
 
 logger = logging.getLogger(__name__)
 
@@ -13,17 +18,83 @@ logger = logging.getLogger(__name__)
 class HomeAssistantService:
     """
     Service for controlling devices through Home Assistant REST API
+    Every call goes through the "home_assistant" vendor guard (bulkhead, timeout, circuit breaker)
+    over one pooled keep-alive session. State reads and health checks are
+    answered by the websocket state stream while it is connected, then by a
+    bulk /api/states snapshot (indexed by entity and domain, reused for
+    HOME_ASSISTANT_SNAPSHOT_TTL_SECONDS), then by a per-entity request.
     """
 
     def __init__(self):
         """
         Initialize Home Assistant service
         """
-        self.url = settings.HOME_ASSISTANT_URL.rstrip('/')
+        self.url = (settings.HOME_ASSISTANT_URL or "").rstrip('/')
         self.token = settings.HOME_ASSISTANT_TOKEN
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._states: Dict[str, Dict] = {}
+        self._domains: Dict[str, List[str]] = {}
+        self._snapshot_at: Optional[float] = None
+        self._snapshot_lock = asyncio.Lock()
 
         logger.info("✅ Home Assistant service initialized")
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_vendor_session("home_assistant")
+        return self._session
+
+    async def open(self) -> None:
+        """
+        Create the pooled HTTP session (called from application lifespan)
+        """
+        self._get_session()
+
+    async def close(self) -> None:
+        """
+        Close the pooled HTTP session
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, json: Optional[Dict] = None) -> Tuple[int, Any]:
+        """
+        Send one authenticated request to Home Assistant under the vendor guard
+
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/api/states/lock.front")
+            json: JSON body
+
+        Returns:
+            (status, decoded JSON or response text)
+
+        Raises:
+            aiohttp.ClientResponseError on 5xx (counted as a vendor failure),
+            aiohttp.ClientError / TimeoutError / CircuitOpenError / BulkheadFullError
+        """
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if json is not None:
+            headers["Content-Type"] = "application/json"
+
+        guard = vendor_guard("home_assistant")
+        async with guard.call():
+            async with self._get_session().request(method, f"{self.url}{path}", headers=headers, json=json) as response:
+                if response.content_type == "application/json":
+                    body = await response.json()
+                else:
+                    body = await response.text()
+
+                if response.status >= 500:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message=str(body)[:200]
+                    )
+                return response.status, body
+
     async def _call_service(
         self,
         domain: str,
@@ -44,11 +115,6 @@ class HomeAssistantService:
             True if successful
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
-
             payload = {
                 "entity_id": entity_id
             }
@@ -56,17 +122,13 @@ class HomeAssistantService:
             if service_data:
                 payload.update(service_data)
 
-            url = f"{self.url}/api/services/{domain}/{service}"
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status in [200, 201]:
-                        logger.info(f"✅ HA service called: {domain}.{service} on {entity_id}")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ HA service error: {response.status} - {error_text}")
-                        return False
+            status, result = await self._request("POST", f"/api/services/{domain}/{service}", json=payload)
+            if status in [200, 201]:
+                logger.info(f"✅ HA service called: {domain}.{service} on {entity_id}")
+                return True
+            else:
+                logger.error(f"❌ HA service error: {status} - {result}")
+                return False
 
         except Exception as e:
             logger.error(f"❌ Failed to call HA service: {e}", exc_info=True)
@@ -180,28 +242,109 @@ class HomeAssistantService:
         Returns:
             Entity state dict or None
         """
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-            }
-
-            url = f"{self.url}/api/states/{entity_id}"
+        # Watched entities are kept current by the websocket, no request needed
+        state = get_home_assistant_stream().get(entity_id)
+        if state is not None:
+            return state
+        if self._snapshot_fresh() and entity_id in self._states:
+            return self._states[entity_id]
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        state = await response.json()
-                        logger.info(f"✅ Retrieved state for {entity_id}")
-                        return state
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to get HA state: {response.status} - {error_text}")
-                        return None
+        try:
+            status, state = await self._request("GET", f"/api/states/{entity_id}")
+            if status == 200:
+                logger.info(f"✅ Retrieved state for {entity_id}")
+                return state
+            else:
+                logger.error(f"❌ Failed to get HA state: {status} - {state}")
+                return None
 
         except Exception as e:
             logger.error(f"❌ Failed to get HA state: {e}", exc_info=True)
             return None
 
+    def _snapshot_fresh(self) -> bool:
+        return self._snapshot_at is not None and time.monotonic() - self._snapshot_at < settings.HOME_ASSISTANT_SNAPSHOT_TTL_SECONDS
+
+    async def _load_snapshot(self) -> bool:
+        """
+        Fetch every entity state in one request and index it (shared by concurrent callers)
+
+        Returns:
+            True if a fresh snapshot is available
+        """
+        if self._snapshot_fresh():
+            return True
+
+        async with self._snapshot_lock:
+            # Another caller may have loaded it while we waited
+            if self._snapshot_fresh():
+                return True
+
+            try:
+                status, states = await self._request("GET", "/api/states")
+                if status != 200 or not isinstance(states, list):
+                    logger.error(f"❌ Failed to get HA states: {status} - {str(states)[:200]}")
+                    return False
+            except Exception as e:
+                logger.error(f"❌ Failed to get HA states: {e}", exc_info=True)
+                return False
+
+            by_id: Dict[str, Dict] = {}
+            by_domain: Dict[str, List[str]] = {}
+            for state in states:
+                entity_id = state.get("entity_id")
+                if not entity_id:
+                    continue
+                by_id[entity_id] = state
+                by_domain.setdefault(entity_id.split(".", 1)[0], []).append(entity_id)
+
+            self._states, self._domains = by_id, by_domain
+            self._snapshot_at = time.monotonic()
+            logger.info(f"✅ Retrieved HA snapshot ({len(by_id)} entities)")
+            return True
+
+    async def get_states(self, entity_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Get the current state of several entities with at most one request
+
+        Args:
+            entity_ids: Entity IDs to resolve
+
+        Returns:
+            Dict of entity_id -> state dict (None if unknown or HA unreachable)
+        """
+        stream = get_home_assistant_stream()
+        result: Dict[str, Optional[Dict]] = {entity_id: stream.get(entity_id) for entity_id in entity_ids}
+
+        missing = [entity_id for entity_id, state in result.items() if state is None]
+        if missing and await self._load_snapshot():
+            for entity_id in missing:
+                result[entity_id] = self._states.get(entity_id)
+
+        return result
+
+    async def get_domain_states(self, domain: str) -> Optional[List[Dict]]:
+        """
+        Get every entity of a domain (e.g. 'lock', 'button') from the snapshot
+
+        Args:
+            domain: Entity domain
+
+        Returns:
+            List of state dicts, or None if HA is unreachable
+        """
+        if not await self._load_snapshot():
+            return None
+        return [self._states[entity_id] for entity_id in self._domains.get(domain, [])]
+
+    async def get_entity_count(self) -> Optional[int]:
+        """
+        Number of entities known to Home Assistant (from the snapshot)
+        """
+        if not await self._load_snapshot():
+            return None
+        return len(self._states)
+
     async def get_lock_status(self, entity_id: str) -> Optional[str]:
         """
         Get the lock status (locked/unlocked)
@@ -224,22 +367,17 @@ class HomeAssistantService:
         Returns:
             True if HA is responding
         """
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-            }
-
-            url = f"{self.url}/api/"
+        if get_home_assistant_stream().connected or self._snapshot_fresh():
+            return True
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"✅ HA health check passed: {result.get('message')}")
-                        return True
-                    else:
-                        logger.error(f"❌ HA health check failed: {response.status}")
-                        return False
+        try:
+            status, result = await self._request("GET", "/api/")
+            if status == 200:
+                logger.info(f"✅ HA health check passed: {result.get('message')}")
+                return True
+            else:
+                logger.error(f"❌ HA health check failed: {status}")
+                return False
 
         except Exception as e:
             logger.error(f"❌ HA health check error: {e}", exc_info=True)
@@ -258,3 +396,18 @@ def get_home_assistant_service() -> HomeAssistantService:
     if _ha_service is None:
         _ha_service = HomeAssistantService()
     return _ha_service
+
+
+async def open_home_assistant_service():
+    """
+    Create the Home Assistant service and its pooled session (called from application lifespan)
+    """
+    await get_home_assistant_service().open()
+
+
+async def close_home_assistant_service():
+    """
+    Close the Home Assistant service's pooled connections on shutdown
+    """
+    if _ha_service is not None:
+        await _ha_service.close()
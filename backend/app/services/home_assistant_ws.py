@@ -0,0 +1,315 @@
+"""
+Home Assistant websocket state stream
+One persistent websocket per worker: authenticates once, subscribes to
+state_changed and keeps the state of the watched lock/button entities in
+memory, so state reads are local and changes arrive as they happen
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+import aiohttp
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.core.resilience import vendor_guard
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HomeAssistantStreamError(Exception):
+    """
+    Websocket handshake or command failed
+    """
+
+
+class HomeAssistantStateStream:
+    """
+    In-memory entity state map fed by the Home Assistant websocket API
+
+    Watched entities: every active lock's ha_entity_id, RING_BUTTON_ENTITY_ID
+    and HOME_ASSISTANT_WATCH_ENTITIES. After (re)connecting the stream
+    subscribes to state_changed, then loads a full get_states snapshot; the
+    snapshot (and the entity list) is refreshed every
+    HOME_ASSISTANT_WS_RESYNC_SECONDS in case an event was missed. While
+    disconnected the map is not served and callers fall back to REST;
+    reconnects back off exponentially up to HOME_ASSISTANT_WS_RECONNECT_MAX_SECONDS.
+    """
+
+    def __init__(self):
+        """
+        Initialize state stream
+        """
+        base_url = (settings.HOME_ASSISTANT_URL or "").rstrip('/')
+        self.url = base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/api/websocket"
+        self._states: Dict[str, Dict] = {}
+        self._entities: Set[str] = set()
+        self._synced = False
+        self._next_id = 1
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self.connected_at: Optional[datetime] = None
+        self.last_event_at: Optional[datetime] = None
+        logger.info("✅ Home Assistant state stream initialized")
+
+    @property
+    def connected(self) -> bool:
+        """
+        True while the websocket is up and the state map has been synced
+        """
+        return self._synced
+
+    def get(self, entity_id: str) -> Optional[Dict]:
+        """
+        Current state of a watched entity
+
+        Args:
+            entity_id: Entity ID
+
+        Returns:
+            State dict as returned by /api/states, or None if the entity isn't
+            watched or the stream is not connected (callers then use REST)
+        """
+        if not self._synced:
+            return None
+        return self._states.get(entity_id)
+
+    def snapshot(self) -> Dict:
+        return {
+            "connected": self._synced,
+            "connected_at": self.connected_at.isoformat() if self.connected_at else None,
+            "last_event_at": self.last_event_at.isoformat() if self.last_event_at else None,
+            "entities": len(self._entities)
+        }
+
+    async def start(self) -> None:
+        """
+        Start the background connection loop
+        """
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="Home Assistant state stream")
+        logger.info("✅ Home Assistant state stream started")
+
+    async def stop(self) -> None:
+        """
+        Close the websocket and stop reconnecting
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        logger.info("🛑 Home Assistant state stream stopped")
+
+    async def _run(self) -> None:
+        """
+        Connect, listen until the socket drops, back off, repeat
+        """
+        delay = 1.0
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                self._disconnected()
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Home Assistant websocket error: {e}")
+
+            # A connection that got as far as a full sync resets the backoff
+            if self._synced:
+                delay = 1.0
+            self._disconnected()
+            wait = delay * (0.5 + random.random() / 2)
+            logger.info(f"🔄 Reconnecting to Home Assistant websocket in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, settings.HOME_ASSISTANT_WS_RECONNECT_MAX_SECONDS)
+
+    async def _listen(self) -> None:
+        if self._session is None or self._session.closed:
+            # No total timeout: the socket stays open indefinitely
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+            )
+
+        # get_states returns every entity in one message, well past aiohttp's 4 MB default on large installs
+        async with self._session.ws_connect(
+            self.url,
+            heartbeat=settings.HOME_ASSISTANT_WS_HEARTBEAT_SECONDS,
+            max_msg_size=settings.HOME_ASSISTANT_WS_MAX_MESSAGE_BYTES
+        ) as ws:
+            await self._authenticate(ws)
+
+            sync_task = asyncio.create_task(self._sync_loop(ws))
+            try:
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self._handle(message.json())
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        raise HomeAssistantStreamError(f"Websocket error: {ws.exception()}")
+            finally:
+                sync_task.cancel()
+
+    async def _authenticate(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        timeout = settings.HTTP_CONNECT_TIMEOUT_SECONDS
+        message = await ws.receive_json(timeout=timeout)
+        if message.get("type") != "auth_required":
+            raise HomeAssistantStreamError(f"Unexpected handshake message: {message.get('type')}")
+
+        await ws.send_json({"type": "auth", "access_token": settings.HOME_ASSISTANT_TOKEN})
+        message = await ws.receive_json(timeout=timeout)
+        if message.get("type") != "auth_ok":
+            raise HomeAssistantStreamError(f"Authentication failed: {message.get('message', message.get('type'))}")
+
+    async def _sync_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """
+        Subscribe, then keep the snapshot fresh; any failure drops the socket so it reconnects
+        """
+        try:
+            await self._command(ws, {"type": "subscribe_events", "event_type": "state_changed"})
+            while True:
+                await self._resync(ws)
+                await asyncio.sleep(settings.HOME_ASSISTANT_WS_RESYNC_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Home Assistant state sync failed: {e}")
+            await ws.close()
+
+    async def _resync(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """
+        Reload the watched entity list and replace the map with a full snapshot
+        """
+        self._entities = await self._load_entities()
+        states = await self._command(ws, {"type": "get_states"})
+
+        fresh: Dict[str, Dict] = {}
+        for state in states or []:
+            entity_id = state.get("entity_id")
+            if entity_id not in self._entities:
+                continue
+            # Keep an event that arrived while the snapshot was in flight if it's newer
+            current = self._states.get(entity_id)
+            if current and (current.get("last_updated") or "") > (state.get("last_updated") or ""):
+                state = current
+            fresh[entity_id] = state
+        self._states = fresh
+
+        if not self._synced:
+            self._synced = True
+            self.connected_at = datetime.now(timezone.utc)
+            logger.info(f"✅ Home Assistant websocket connected ({len(fresh)}/{len(self._entities)} entities)")
+
+    async def _command(self, ws: aiohttp.ClientWebSocketResponse, payload: Dict):
+        """
+        Send a command and wait for its result message
+        """
+        message_id = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await ws.send_json({"id": message_id, **payload})
+            return await asyncio.wait_for(future, timeout=vendor_guard("home_assistant").timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def _handle(self, message: Dict) -> None:
+        if message.get("type") == "result":
+            future = self._pending.get(message.get("id"))
+            if future is None or future.done():
+                return
+            if message.get("success"):
+                future.set_result(message.get("result"))
+            else:
+                future.set_exception(HomeAssistantStreamError(str(message.get("error"))))
+            return
+
+        if message.get("type") != "event":
+            return
+
+        data = (message.get("event") or {}).get("data") or {}
+        entity_id = data.get("entity_id")
+        if entity_id not in self._entities:
+            return
+
+        self.last_event_at = datetime.now(timezone.utc)
+        new_state = data.get("new_state")
+        if new_state is None:
+            # Entity removed from Home Assistant
+            self._states.pop(entity_id, None)
+        else:
+            self._states[entity_id] = new_state
+
+    def _disconnected(self) -> None:
+        if self._synced:
+            logger.warning("⚠️ Home Assistant websocket disconnected, serving state over REST")
+        self._synced = False
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(HomeAssistantStreamError("Websocket closed"))
+        self._pending.clear()
+
+    async def _load_entities(self) -> Set[str]:
+        """
+        Watched entity IDs: configured entities plus every active lock's ha_entity_id
+        """
+        entities = set(settings.HOME_ASSISTANT_WATCH_ENTITIES)
+        if settings.RING_BUTTON_ENTITY_ID:
+            entities.add(settings.RING_BUTTON_ENTITY_ID)
+
+        try:
+            supabase = get_supabase()
+            with track_dependency("db"):
+                result = await asyncio.to_thread(
+                    lambda: supabase.table("locks")
+                    .select("ha_entity_id")
+                    .eq("is_active", True)
+                    .not_.is_("ha_entity_id", "null")
+                    .execute()
+                )
+            entities.update(lock["ha_entity_id"] for lock in result.data or [])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load lock entities, keeping the previous list: {e}")
+            entities.update(self._entities)
+
+        return entities
+
+
+# Global instance
+_ha_state_stream: Optional[HomeAssistantStateStream] = None
+
+
+def get_home_assistant_stream() -> HomeAssistantStateStream:
+    """
+    Get or create Home Assistant state stream singleton
+    """
+    global _ha_state_stream
+    if _ha_state_stream is None:
+        _ha_state_stream = HomeAssistantStateStream()
+    return _ha_state_stream
+
+
+async def start_home_assistant_stream():
+    """
+    Start the websocket (called from application lifespan, every worker process)
+    """
+    if not settings.HOME_ASSISTANT_WS_ENABLED or not settings.HOME_ASSISTANT_URL or not settings.HOME_ASSISTANT_TOKEN:
+        return
+    await get_home_assistant_stream().start()
+
+
+async def stop_home_assistant_stream():
+    """
+    Stop the websocket
+    """
+    if _ha_state_stream:
+        await _ha_state_stream.stop()
@@ -0,0 +1,298 @@
+"""
+Scheduler job run history and timing instrumentation
+Records duration, counts, error samples and per-dependency time (DB, Tuya,
+Ring, Twilio, ...) for every job run, in memory and in the job_runs table
+"""
+import asyncio
+import functools
+import inspect
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Identifies the worker that ran a job
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobRun:
+    """
+    A single execution of a scheduled job
+    """
+
+    def __init__(self, job_name: str):
+        self.id = str(uuid.uuid4())
+        self.job_name = job_name
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.duration_ms: Optional[int] = None
+        self.status = "running"
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.dependency_ms: Dict[str, float] = defaultdict(float)
+        self.dependency_calls: Dict[str, int] = defaultdict(int)
+        self.errors: List[str] = []
+        self._failed = False
+        self._started_monotonic = time.monotonic()
+
+    def count(self, key: str, n: int = 1) -> None:
+        """
+        Increment a counter (items processed, revoked, failed, ...)
+        """
+        self.counts[key] += n
+
+    def record_error(self, message: str, fatal: bool = False) -> None:
+        """
+        Keep a bounded sample of error messages; fatal errors fail the run
+        """
+        if len(self.errors) < settings.JOB_RUN_ERROR_SAMPLES:
+            self.errors.append(message[:500])
+        self.count("errors")
+        if fatal:
+            self._failed = True
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """
+        Close the run and compute its duration
+        """
+        self.finished_at = datetime.now(timezone.utc)
+        self.duration_ms = int((time.monotonic() - self._started_monotonic) * 1000)
+        if error is not None:
+            self.record_error(f"{type(error).__name__}: {error}", fatal=True)
+        self.status = "failed" if self._failed else "success"
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "job_name": self.job_name,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_ms": self.duration_ms,
+            "counts": dict(self.counts),
+            "dependency_ms": {name: round(ms, 1) for name, ms in self.dependency_ms.items()},
+            "dependency_calls": dict(self.dependency_calls),
+            "errors": list(self.errors),
+            "worker": WORKER_ID
+        }
+
+
+_current_run: ContextVar[Optional[JobRun]] = ContextVar("current_job_run", default=None)
+
+
+def current_job_run() -> Optional[JobRun]:
+    """
+    The job run active in this context, if any
+    """
+    return _current_run.get()
+
+
+def record_counts(**counts: int) -> None:
+    """
+    Add counters to the current job run (no-op outside a job)
+    """
+    run = _current_run.get()
+    if run is None:
+        return
+    for key, value in counts.items():
+        if isinstance(value, int) and not isinstance(value, bool):
+            run.count(key, value)
+
+
+def record_error(message: str, fatal: bool = False) -> None:
+    """
+    Add an error sample to the current job run (no-op outside a job)
+    """
+    run = _current_run.get()
+    if run is not None:
+        run.record_error(message, fatal=fatal)
+
+
+@contextmanager
+def track_dependency(name: str):
+    """
+    Time a call to an external dependency and charge it to the current job run
+
+    Usage:
+        with track_dependency("db"):
+            supabase.table(...).execute()
+    """
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        run.dependency_ms[name] += (time.monotonic() - started) * 1000
+        run.dependency_calls[name] += 1
+
+
+def timed_dependency(name: str):
+    """
+    Decorator form of track_dependency for sync and async service methods
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_dependency(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_dependency(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class JobStats:
+    """
+    In-memory run history per job (bounded)
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, Deque[Dict]] = defaultdict(
+            lambda: deque(maxlen=settings.JOB_RUN_HISTORY_SIZE)
+        )
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"runs": 0, "failures": 0})
+
+    def add(self, run: JobRun) -> None:
+        self._runs[run.job_name].append(run.to_dict())
+        totals = self._totals[run.job_name]
+        totals["runs"] += 1
+        if run.status == "failed":
+            totals["failures"] += 1
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Per-job summary: totals, duration stats over recent runs and the recent runs themselves
+        """
+        result = {}
+        for job_name, runs in self._runs.items():
+            durations = sorted(r["duration_ms"] for r in runs if r["duration_ms"] is not None)
+
+            dependency_ms: Dict[str, float] = defaultdict(float)
+            for r in runs:
+                for name, ms in r["dependency_ms"].items():
+                    dependency_ms[name] += ms
+
+            result[job_name] = {
+                **self._totals[job_name],
+                "last_run": runs[-1] if runs else None,
+                "avg_duration_ms": round(sum(durations) / len(durations)) if durations else None,
+                "p95_duration_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None,
+                "max_duration_ms": durations[-1] if durations else None,
+                "avg_dependency_ms": {
+                    name: round(ms / len(runs), 1) for name, ms in dependency_ms.items()
+                },
+                "recent_runs": list(runs)
+            }
+        return result
+
+
+_job_stats = JobStats()
+
+
+def get_job_stats() -> JobStats:
+    """
+    Get the in-memory job stats
+    """
+    return _job_stats
+
+
+def _persist_run(run: JobRun) -> None:
+    """
+    Store a finished run in the job_runs table
+    """
+    data = run.to_dict()
+    get_supabase().table("job_runs").insert({
+        "id": data["id"],
+        "job_name": data["job_name"],
+        "status": data["status"],
+        "started_at": data["started_at"],
+        "finished_at": data["finished_at"],
+        "duration_ms": data["duration_ms"],
+        "counts": data["counts"],
+        "dependency_ms": data["dependency_ms"],
+        "errors": data["errors"],
+        "worker": data["worker"]
+    }).execute()
+
+
+def prune_job_runs() -> int:
+    """
+    Delete job_runs rows older than JOB_RUNS_RETENTION_DAYS
+
+    Returns:
+        Number of rows deleted
+    """
+    with track_dependency("db"):
+        response = get_supabase().rpc("prune_job_runs", {
+            "p_retention_days": settings.JOB_RUNS_RETENTION_DAYS
+        }).execute()
+    return response.data or 0
+
+
+@asynccontextmanager
+async def job_run(job_name: str):
+    """
+    Instrument a block as one run of job_name
+
+    Usage:
+        async with job_run("revoke_expired_codes") as run:
+            ...
+    """
+    run = JobRun(job_name)
+    token = _current_run.set(run)
+    error: Optional[BaseException] = None
+    try:
+        yield run
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_run.reset(token)
+        run.finish(None if isinstance(error, asyncio.CancelledError) else error)
+        _job_stats.add(run)
+
+        logger.info(
+            f"📊 Job {job_name} {run.status} in {run.duration_ms} ms "
+            f"(counts: {dict(run.counts)}, deps: {run.to_dict()['dependency_ms']})"
+        )
+
+        try:
+            await asyncio.to_thread(_persist_run, run)
+        except Exception as e:
+            logger.error(f"❌ Failed to persist job run {run.id}: {e}")
+
+
+def instrumented_job(job_name: Optional[str] = None):
+    """
+    Decorator recording every call of an async job as a job run
+    """
+    def decorator(func):
+        name = job_name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with job_run(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,233 @@
+"""
+Cross-worker leader election for scheduler jobs
+Each API worker heartbeats a lease row in Postgres; only the lease holder
+runs the scheduled jobs and the provisioning/revocation timers
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Awaitable, Callable, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lease shared by all scheduler jobs
+SCHEDULER_LEASE_NAME = "scheduler"
+
+# PostgREST / Postgres errors meaning the lease functions (migration 008) don't exist
+MISSING_RPC_MARKERS = ("PGRST202", "42883", "Could not find the function")
+
+
+class LeaderElector:
+    """
+    Lease-based leader election
+
+    A worker is leader while its last successful renewal is younger than the
+    lease TTL. Heartbeats run every SCHEDULER_HEARTBEAT_SECONDS; if the leader
+    dies, another worker takes over once the lease expires. Jobs and timers
+    check is_leader (the lease expiry) before acting, so a worker whose
+    heartbeat stalls stops acting when its lease runs out, even before its
+    demoted callbacks run. Elected/demoted callbacks run in a background task,
+    one transition after the other, so they never delay lease renewal.
+
+    If the lease functions are missing (migration 008 not applied) every
+    worker runs the jobs, as with SCHEDULER_LEADER_ELECTION off, and an
+    error is logged.
+    """
+
+    def __init__(self, lease_name: str = SCHEDULER_LEASE_NAME):
+        """
+        Initialize elector with a unique holder ID for this process
+        """
+        self.lease_name = lease_name
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._leader_until: Optional[datetime] = None
+        self._was_leader = False
+        self._on_elected: List[Callable[[], Awaitable[None]]] = []
+        self._on_demoted: List[Callable[[], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks_task: Optional[asyncio.Task] = None
+        self._election_unavailable = False
+
+    @property
+    def is_leader(self) -> bool:
+        """
+        True while this worker holds an unexpired lease
+        """
+        if not settings.SCHEDULER_LEADER_ELECTION or self._election_unavailable:
+            return True
+        return self._leader_until is not None and datetime.now(timezone.utc) < self._leader_until
+
+    def on_elected(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Register a coroutine function to run when this worker becomes leader
+        """
+        self._on_elected.append(callback)
+
+    def on_demoted(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Register a coroutine function to run when this worker loses leadership
+        """
+        self._on_demoted.append(callback)
+
+    async def _try_acquire(self) -> bool:
+        """
+        Acquire or renew the lease
+
+        Returns:
+            True if this worker holds the lease
+        """
+        ttl = settings.SCHEDULER_LEASE_TTL_SECONDS
+        started = datetime.now(timezone.utc)
+
+        supabase = get_supabase()
+        response = await asyncio.to_thread(
+            lambda: supabase.rpc("acquire_scheduler_lease", {
+                "p_name": self.lease_name,
+                "p_holder": self.holder_id,
+                "p_ttl_seconds": ttl
+            }).execute()
+        )
+
+        acquired = bool(response.data)
+        # Measured from before the call so local expiry never outlives the DB lease
+        self._leader_until = started + timedelta(seconds=ttl) if acquired else None
+        return acquired
+
+    async def _transition(self) -> None:
+        """
+        Fire elected/demoted callbacks when leadership changes
+        """
+        leader = self.is_leader
+        if leader == self._was_leader:
+            return
+        self._was_leader = leader
+
+        if leader:
+            logger.info(f"👑 Worker {self.holder_id} elected scheduler leader")
+            callbacks = self._on_elected
+        else:
+            logger.warning(f"⚠️ Worker {self.holder_id} lost scheduler leadership")
+            callbacks = self._on_demoted
+
+        # Off the heartbeat loop; each transition waits for the previous one's callbacks
+        self._callbacks_task = asyncio.create_task(
+            self._run_callbacks(callbacks, self._callbacks_task),
+            name="leader_election_callbacks"
+        )
+
+    async def _run_callbacks(
+        self,
+        callbacks: List[Callable[[], Awaitable[None]]],
+        previous: Optional[asyncio.Task] = None
+    ) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"❌ Leader election callback failed: {e}", exc_info=True)
+
+    async def _run(self) -> None:
+        """
+        Heartbeat loop
+        """
+        while True:
+            try:
+                await self._try_acquire()
+            except Exception as e:
+                if any(marker in str(e) for marker in MISSING_RPC_MARKERS):
+                    logger.error(
+                        "❌ Scheduler lease functions not found (apply migration 008) - "
+                        "leader election disabled, THIS WORKER RUNS ALL SCHEDULER JOBS"
+                    )
+                    self._election_unavailable = True
+                    await self._transition()
+                    return
+                # Keep leadership only until the last successful lease runs out
+                logger.error(f"❌ Scheduler lease heartbeat failed: {e}")
+
+            await self._transition()
+            await asyncio.sleep(settings.SCHEDULER_HEARTBEAT_SECONDS)
+
+    async def start(self) -> None:
+        """
+        Start heartbeating (first acquisition attempt runs immediately)
+        """
+        if not settings.SCHEDULER_LEADER_ELECTION:
+            logger.info("⏭️ Leader election disabled, this worker runs all scheduler jobs")
+            await self._transition()
+            return
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="leader_election")
+        logger.info(f"✅ Leader election started (holder: {self.holder_id})")
+
+    async def stop(self) -> None:
+        """
+        Stop heartbeating and release the lease so another worker takes over immediately
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._callbacks_task is not None:
+            await asyncio.gather(self._callbacks_task, return_exceptions=True)
+            self._callbacks_task = None
+
+        if settings.SCHEDULER_LEADER_ELECTION and self._leader_until is not None:
+            try:
+                supabase = get_supabase()
+                await asyncio.to_thread(
+                    lambda: supabase.rpc("release_scheduler_lease", {
+                        "p_name": self.lease_name,
+                        "p_holder": self.holder_id
+                    }).execute()
+                )
+                logger.info("🛑 Scheduler lease released")
+            except Exception as e:
+                logger.error(f"❌ Failed to release scheduler lease: {e}")
+
+        self._leader_until = None
+        self._election_unavailable = False
+        if self._was_leader:
+            self._was_leader = False
+            await self._run_callbacks(self._on_demoted)
+
+
+# Global instance
+_leader_elector: Optional[LeaderElector] = None
+
+
+def get_leader_elector() -> LeaderElector:
+    """
+    Get or create leader elector singleton
+    """
+    global _leader_elector
+    if _leader_elector is None:
+        _leader_elector = LeaderElector()
+    return _leader_elector
+
+
+def leader_only(job: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """
+    Wrap a scheduler job so it only runs on the elected leader
+    """
+    @wraps(job)
+    async def wrapper(*args, **kwargs):
+        if not get_leader_elector().is_leader:
+            logger.debug(f"⏭️ Skipping {job.__name__}: not the scheduler leader")
+            return None
+        return await job(*args, **kwargs)
+
+    return wrapper
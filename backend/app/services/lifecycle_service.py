@@ -0,0 +1,113 @@
+"""
+Booking lifecycle transition engine
+Applies all booking status transitions and code expiry in one set-based
+SQL pass and emits the changed IDs to registered listeners
+"""
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+from app.core.database import get_supabase
+from app.services.job_metrics import record_counts, track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Listener signature: receives the change set returned by apply_transitions()
+LifecycleListener = Callable[[Dict], Union[None, Awaitable[None]]]
+
+
+class LifecycleService:
+    """
+    Runs the apply_booking_lifecycle() database function
+
+    Transitions:
+        confirmed -> checked_in     on first door open or at check-in time
+        confirmed/checked_in -> checked_out   once checkout has passed
+        active code -> expired      validity ended and nothing held on a device
+    """
+
+    def __init__(self):
+        """
+        Initialize lifecycle service
+        """
+        self.supabase = get_supabase()
+        self._listeners: List[LifecycleListener] = []
+        logger.info("✅ Lifecycle service initialized")
+
+    def add_listener(self, listener: LifecycleListener) -> None:
+        """
+        Register a callback for changed IDs (e.g. cache invalidation)
+
+        Args:
+            listener: Sync or async callable receiving the change set
+        """
+        self._listeners.append(listener)
+
+    async def apply_transitions(self) -> Dict:
+        """
+        Apply every pending transition in one round trip
+
+        Returns:
+            Change set:
+                {
+                    "bookings": {"checked_in": [ids], "checked_out": [ids]},
+                    "codes": {"expired": [ids]},
+                    "total": int
+                }
+        """
+        with track_dependency("db"):
+            response = self.supabase.rpc("apply_booking_lifecycle").execute()
+
+        bookings: Dict[str, List[str]] = defaultdict(list)
+        codes: Dict[str, List[str]] = defaultdict(list)
+        for row in response.data or []:
+            target = bookings if row["entity_type"] == "booking" else codes
+            target[row["new_status"]].append(row["entity_id"])
+
+        changes = {
+            "bookings": dict(bookings),
+            "codes": dict(codes),
+            "total": len(response.data or [])
+        }
+
+        record_counts(
+            checked_in=len(bookings.get("checked_in", [])),
+            checked_out=len(bookings.get("checked_out", [])),
+            codes_expired=len(codes.get("expired", []))
+        )
+
+        if changes["total"]:
+            logger.info(
+                f"✅ Lifecycle: {len(bookings.get('checked_in', []))} checked in, "
+                f"{len(bookings.get('checked_out', []))} checked out, "
+                f"{len(codes.get('expired', []))} codes expired"
+            )
+            await self._emit(changes)
+
+        return changes
+
+    async def _emit(self, changes: Dict) -> None:
+        """
+        Notify listeners; a failing listener never blocks the others
+        """
+        for listener in self._listeners:
+            try:
+                result = listener(changes)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"❌ Lifecycle listener failed: {e}", exc_info=True)
+
+
+# Global instance
+_lifecycle_service: Optional[LifecycleService] = None
+
+
+def get_lifecycle_service() -> LifecycleService:
+    """
+    Get or create lifecycle service singleton
+    """
+    global _lifecycle_service
+    if _lifecycle_service is None:
+        _lifecycle_service = LifecycleService()
+    return _lifecycle_service
@@ -0,0 +1,175 @@
+"""
+Shared Lodgify API client
+Long-lived pooled HTTP/2 connection with jittered retry and Retry-After support
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.services.job_metrics import track_dependency
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Transient statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LodgifyAPIError(Exception):
+    """
+    Non-200 response from the Lodgify API
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Lodgify API error {status_code}")
+        self.status_code = status_code
+        self.message = message
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date)
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds to wait, or None if absent/unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class LodgifyClient:
+    """
+    Lodgify API client shared by every sync run
+
+    One httpx.AsyncClient (HTTP/2, pooled connections) lives for the whole
+    process. Requests are retried on transport errors, 429 and 5xx with full
+    jitter exponential backoff; a Retry-After header takes precedence (a
+    Retry-After longer than LODGIFY_RETRY_MAX_SECONDS fails the request).
+    """
+
+    BASE_URL = "https://api.lodgify.com"
+
+    def __init__(self):
+        """
+        Initialize Lodgify client (the HTTP client is created lazily)
+        """
+        self._client: Optional[httpx.AsyncClient] = None
+        logger.info("✅ Lodgify client initialized")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                http2=True,
+                headers={"Accept": "application/json"},
+                timeout=httpx.Timeout(settings.LODGIFY_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=settings.LODGIFY_PAGE_CONCURRENCY * settings.LODGIFY_PROPERTY_CONCURRENCY,
+                    max_keepalive_connections=settings.LODGIFY_PAGE_CONCURRENCY * settings.LODGIFY_PROPERTY_CONCURRENCY
+                )
+            )
+        return self._client
+
+    async def get_json(self, path: str, params: Optional[Dict] = None, api_key: Optional[str] = None) -> Any:
+        """
+        GET a Lodgify endpoint and decode the JSON body
+
+        Args:
+            path: API path (e.g. "/v2/reservations")
+            params: Query parameters
+            api_key: Lodgify API key (defaults to LODGIFY_API_KEY)
+
+        Returns:
+            Decoded JSON
+
+        Raises:
+            LodgifyAPIError: Non-200 response after retries
+            httpx.HTTPError: Transport failure after retries
+        """
+        client = self._get_client()
+        headers = {"X-ApiKey": api_key or settings.LODGIFY_API_KEY}
+
+        attempt = 0
+        while True:
+            delay = None
+            try:
+                with track_dependency("lodgify"):
+                    response = await client.get(path, params=params, headers=headers)
+
+                if response.status_code == 200:
+                    return response.json()
+
+                if response.status_code not in RETRY_STATUSES or attempt >= settings.LODGIFY_MAX_RETRIES:
+                    raise LodgifyAPIError(response.status_code, response.text)
+
+                delay = retry_after_seconds(response.headers.get("Retry-After"))
+                if delay is not None and delay > settings.LODGIFY_RETRY_MAX_SECONDS:
+                    # Upstream asked for a longer pause than a sync run should wait
+                    raise LodgifyAPIError(response.status_code, response.text)
+                reason = f"HTTP {response.status_code}"
+
+            except httpx.TransportError as e:
+                if attempt >= settings.LODGIFY_MAX_RETRIES:
+                    raise
+                reason = type(e).__name__
+
+            if delay is None:
+                # Full jitter: uniform(0, base * 2^attempt), capped
+                delay = random.uniform(0, min(
+                    settings.LODGIFY_RETRY_MAX_SECONDS,
+                    settings.LODGIFY_RETRY_BASE_SECONDS * (2 ** attempt)
+                ))
+
+            attempt += 1
+            logger.warning(
+                f"⚠️ Lodgify {path} failed ({reason}), retry {attempt}/{settings.LODGIFY_MAX_RETRIES} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        """
+        Close pooled connections
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("🛑 Lodgify client closed")
+        self._client = None
+
+
+# Global instance
+_lodgify_client: Optional[LodgifyClient] = None
+
+
+def get_lodgify_client() -> LodgifyClient:
+    """
+    Get or create Lodgify client singleton
+    """
+    global _lodgify_client
+    if _lodgify_client is None:
+        _lodgify_client = LodgifyClient()
+    return _lodgify_client
+
+
+async def close_lodgify_client() -> None:
+    """
+    Close the Lodgify client on shutdown
+    """
+    if _lodgify_client is not None:
+        await _lodgify_client.close()
@@ -1,12 +1,15 @@
 """
 Notification service for WhatsApp, SMS, Email, and Telegram
 """
+import asyncio
 from twilio.rest import Client as TwilioClient
 from telegram import Bot
 from typing import Optional
 from datetime import datetime, timezone
 from app.core.config import settings
 from app.core.database import get_supabase
+from app.core.resilience import vendor_guard
+from app.services.job_metrics import track_dependency
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,7 @@ logger = logging.getLogger(__name__)
 class NotificationService:
     """
     Unified notification service for multiple channels
+    Twilio and Telegram calls go through their vendor guards (bulkhead, timeout, circuit breaker)
     """
 
     def __init__(self):
@@ -54,12 +58,15 @@ class NotificationService:
             if not to.startswith('whatsapp:'):
                 to = f'whatsapp:{to}'
 
-            # Send via Twilio
-            twilio_message = self.twilio.messages.create(
-                from_=settings.TWILIO_WHATSAPP_FROM,
-                to=to,
-                body=message
-            )
+            # Send via Twilio (blocking client - run off the event loop)
+            with track_dependency("twilio"):
+                async with vendor_guard("twilio").call():
+                    twilio_message = await asyncio.to_thread(
+                        self.twilio.messages.create,
+                        from_=settings.TWILIO_WHATSAPP_FROM,
+                        to=to,
+                        body=message
+                    )
 
             # Log to database
             await self._log_notification(
@@ -105,11 +112,14 @@ class NotificationService:
             True if sent successfully
         """
         try:
-            twilio_message = self.twilio.messages.create(
-                from_=settings.TWILIO_SMS_FROM,
-                to=to,
-                body=message
-            )
+            with track_dependency("twilio"):
+                async with vendor_guard("twilio").call():
+                    twilio_message = await asyncio.to_thread(
+                        self.twilio.messages.create,
+                        from_=settings.TWILIO_SMS_FROM,
+                        to=to,
+                        body=message
+                    )
 
             await self._log_notification(
                 booking_id=booking_id,
@@ -155,11 +165,13 @@ class NotificationService:
             if chat_id is None:
                 chat_id = settings.TELEGRAM_ADMIN_CHAT_ID
 
-            await self.telegram.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode='Markdown'
-            )
+            with track_dependency("telegram"):
+                async with vendor_guard("telegram").call():
+                    await self.telegram.send_message(
+                        chat_id=chat_id,
+                        text=message,
+                        parse_mode='Markdown'
+                    )
 
             logger.info(f"✅ Telegram sent to {chat_id}")
             return True
@@ -342,7 +354,8 @@ Dettagli:
                 "sent_at": datetime.now(timezone.utc).isoformat() if status == "sent" else None
             }
 
-            supabase.table("notifications").insert(data).execute()
+            with track_dependency("db"):
+                supabase.table("notifications").insert(data).execute()
 
         except Exception as e:
             logger.error(f"Failed to log notification: {e}")
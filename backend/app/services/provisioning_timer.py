@@ -0,0 +1,262 @@
+"""
+Event-driven provisioning timer
+Keeps a min-heap of upcoming bookings keyed by the moment they enter the
+provisioning window and provisions each one exactly when it becomes due
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.deadline_timer import DeadlineTimer, parse_timestamp
+from app.services.job_metrics import record_counts, track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Booking statuses that still need access codes
+PROVISIONABLE_STATUSES = ("confirmed", "checked_in")
+
+# Each poll re-reads this much of the previous one, for transactions that committed late
+POLL_OVERLAP = timedelta(seconds=60)
+
+
+def needs_codes(booking: Dict, now: Optional[datetime] = None) -> bool:
+    """
+    Check whether a booking still needs access codes provisioned
+    (same rules as the bookings_needing_codes() database function)
+
+    Args:
+        booking: Booking row
+        now: Reference time (defaults to current UTC time)
+
+    Returns:
+        True if the booking is upcoming and has no codes yet
+    """
+    now = now or datetime.now(timezone.utc)
+
+    if booking.get("status") not in PROVISIONABLE_STATUSES:
+        return False
+    if booking.get("codes_provisioned"):
+        return False
+    if not booking.get("guest_phone"):
+        return False
+    if not booking.get("checkin_date"):
+        return False
+
+    return parse_timestamp(booking["checkin_date"]) > now
+
+
+def provisioning_due_at(booking: Dict) -> datetime:
+    """
+    Moment a booking enters the provisioning window
+
+    Args:
+        booking: Booking row
+
+    Returns:
+        checkin_date - CODE_PROVISIONING_WINDOW_HOURS
+    """
+    checkin_date = parse_timestamp(booking["checkin_date"])
+    return checkin_date - timedelta(hours=settings.CODE_PROVISIONING_WINDOW_HOURS)
+
+
+class ProvisioningTimer(DeadlineTimer):
+    """
+    Deadline timer keyed by booking ID that provisions each booking
+    as soon as it enters the provisioning window
+
+    Bookings written on the leader are scheduled directly. Bookings written
+    by other workers (webhooks, API) are picked up by polling bookings.updated_at
+    every SCHEDULER_TIMER_POLL_SECONDS, so they are provisioned at most that
+    late; the periodic rebuild remains the safety net.
+    """
+
+    name = "Provisioning timer"
+    job_name = "provision_access_codes"
+
+    def __init__(self):
+        """
+        Initialize an empty timer
+        """
+        super().__init__()
+        self._poll_task: Optional[asyncio.Task] = None
+        self._polled_at: Optional[datetime] = None
+        # booking_id -> updated_at seen by the last poll, so overlapping rows aren't applied twice
+        self._polled_versions: Dict[str, str] = {}
+
+    def schedule(self, booking: Dict) -> None:
+        """
+        Add or update a booking in the timer
+        Bookings that no longer need codes (cancelled, provisioned, past) are removed
+
+        Args:
+            booking: Booking row (needs id, status, checkin_date, guest_phone, codes_provisioned)
+        """
+        booking_id = booking.get("id")
+        if not booking_id:
+            return
+
+        if not needs_codes(booking):
+            self.cancel(booking_id)
+            return
+
+        self._set(booking_id, provisioning_due_at(booking))
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the heap from the database
+        Called at startup and as a periodic safety net
+
+        Returns:
+            Number of bookings scheduled
+        """
+        supabase = get_supabase()
+        now = datetime.now(timezone.utc)
+        self._polled_at = now
+
+        with track_dependency("db"):
+            response = await asyncio.to_thread(
+                supabase.table("bookings")
+                .select("id, status, checkin_date, guest_phone, codes_provisioned")
+                .in_("status", list(PROVISIONABLE_STATUSES))
+                .or_("codes_provisioned.is.null,codes_provisioned.eq.false")
+                .gt("checkin_date", now.isoformat())
+                .execute
+            )
+
+        due: Dict[str, datetime] = {}
+        for booking in response.data or []:
+            if needs_codes(booking, now):
+                due[booking["id"]] = provisioning_due_at(booking)
+
+        self._replace(due)
+
+        logger.info(f"✅ Provisioning timer rebuilt: {len(due)} upcoming bookings")
+        return len(due)
+
+    async def start(self) -> None:
+        """
+        Rebuild, start the timer loop and the change poll
+        """
+        await super().start()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop(), name=f"{self.name} poll")
+
+    async def stop(self) -> None:
+        """
+        Stop the change poll and the timer loop
+        """
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        await super().stop()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SCHEDULER_TIMER_POLL_SECONDS)
+            try:
+                await self.poll_changes()
+            except Exception as e:
+                logger.error(f"❌ {self.name} poll failed: {e}")
+
+    async def poll_changes(self) -> int:
+        """
+        Schedule (or drop) upcoming bookings changed since the last poll
+
+        Returns:
+            Number of changed bookings seen
+        """
+        if self._polled_at is None:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        since = self._polled_at - POLL_OVERLAP
+        supabase = get_supabase()
+        with track_dependency("db"):
+            response = await asyncio.to_thread(
+                supabase.table("bookings")
+                .select("id, status, checkin_date, guest_phone, codes_provisioned, updated_at")
+                .gte("updated_at", since.isoformat())
+                .gt("checkin_date", now.isoformat())
+                .execute
+            )
+        self._polled_at = now
+
+        # A row already applied keeps its due time (which may be a provisioning retry)
+        rows = response.data or []
+        changed = [booking for booking in rows if self._polled_versions.get(booking["id"]) != booking["updated_at"]]
+        self._polled_versions = {booking["id"]: booking["updated_at"] for booking in rows}
+
+        for booking in changed:
+            self.schedule(booking)
+        return len(changed)
+
+    async def _fire(self, booking_ids: List[str]) -> None:
+        """
+        Provision codes for every booking that has entered the window
+        """
+        # Imported here to avoid a circular import with booking_sync_service
+        from app.services.booking_sync_service import get_booking_sync_service
+
+        booking_sync_service = get_booking_sync_service()
+
+        for booking_id in booking_ids:
+            logger.info(f"⏰ Booking {booking_id} entered provisioning window")
+
+        # Bookings due together are provisioned concurrently, so codes for locks
+        # they share (e.g. the main entrance) go out in one Tuya commands request
+        results = await asyncio.gather(*[
+            booking_sync_service.provision_booking_by_id(booking_id)
+            for booking_id in booking_ids
+        ], return_exceptions=True)
+
+        for booking_id, success in zip(booking_ids, results):
+            if isinstance(success, Exception):
+                logger.error(f"❌ Provisioning failed for booking {booking_id}: {success}")
+                success = False
+            record_counts(
+                provisioned=1 if success else 0,
+                failed=1 if success is False else 0,
+                skipped=1 if success is None else 0
+            )
+
+            if success is False:
+                retry_at = datetime.now(timezone.utc) + timedelta(
+                    minutes=settings.CODE_PROVISIONING_RETRY_MINUTES
+                )
+                self._set(booking_id, retry_at)
+                logger.warning(f"⚠️ Provisioning for booking {booking_id} will be retried at {retry_at.isoformat()}")
+
+
+# Global instance
+_provisioning_timer: Optional[ProvisioningTimer] = None
+
+
+def get_provisioning_timer() -> ProvisioningTimer:
+    """
+    Get or create provisioning timer singleton
+    """
+    global _provisioning_timer
+    if _provisioning_timer is None:
+        _provisioning_timer = ProvisioningTimer()
+    return _provisioning_timer
+
+
+async def start_provisioning_timer():
+    """
+    Start the provisioning timer (called from application lifespan)
+    """
+    await get_provisioning_timer().start()
+
+
+async def stop_provisioning_timer():
+    """
+    Stop the provisioning timer gracefully
+    """
+    if _provisioning_timer:
+        await _provisioning_timer.stop()
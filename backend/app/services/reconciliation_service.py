@@ -0,0 +1,387 @@
+"""
+Device-vs-database access code reconciliation
+Bulk-lists each device's codes once, diffs them against access_codes with
+set operations and queues only the creates and deletes that are needed
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.deadline_timer import parse_timestamp
+from app.services.tuya_service import get_tuya_service
+from app.services.ring_service import get_ring_service
+from app.services.revocation_service import get_revocation_service, VENDOR_TUYA, VENDOR_RING
+from app.services.job_metrics import record_counts, record_error, track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ring intercoms are the floor doors; every other lock type is a Tuya lock
+RING_LOCK_TYPES = ("floor_door",)
+
+
+def lock_vendor(lock: Dict) -> str:
+    """
+    Vendor managing a lock's codes
+    """
+    return VENDOR_RING if lock["lock_type"] in RING_LOCK_TYPES else VENDOR_TUYA
+
+
+def _epoch(value) -> int:
+    return int(parse_timestamp(value).timestamp())
+
+
+class ReconciliationService:
+    """
+    Compares the codes stored on each lock with the active access_codes rows
+
+    Per device:
+        orphaned   on the device, no active row, ID stored on an access_codes
+                   row (so the app created it)         -> delete from device
+        unmanaged  on the device, ID unknown to the app (owner, cleaner or
+                   resident codes)                     -> reported only
+        missing    active row, not on the device       -> re-create (or revoke row if expired)
+        pending    active row, not on the device, but its create is unconfirmed
+                   (Tuya row stored without an ID) or recent -> reported only
+        backfilled matched by content, row had no/placeholder ID -> store real ID
+
+    The Ring intercom is one device shared by every floor_door lock row, so
+    it is listed once and diffed against the codes of all of those rows.
+    Orphans are only reported when RECONCILIATION_DELETE_ORPHANS is off.
+    """
+
+    def __init__(self):
+        """
+        Initialize reconciliation service
+        """
+        self.supabase = get_supabase()
+        self.tuya_service = get_tuya_service()
+        self.ring_service = get_ring_service()
+        self.revocation_service = get_revocation_service()
+        logger.info("✅ Reconciliation service initialized")
+
+    async def reconcile(self, dry_run: bool = False) -> Dict:
+        """
+        Reconcile every active lock
+
+        Args:
+            dry_run: Only report drift, don't touch devices or the database
+
+        Returns:
+            Drift report with per-device details and totals
+        """
+        logger.info(f"🔄 Starting code reconciliation{' (dry run)' if dry_run else ''}...")
+
+        with track_dependency("db"):
+            locks_result = await asyncio.to_thread(
+                self.supabase.table("locks").select("*").eq("is_active", True).execute
+            )
+            codes_result = await asyncio.to_thread(
+                self.supabase.table("access_codes")
+                .select("*, bookings(guest_name)")
+                .eq("status", "active")
+                .execute
+            )
+
+        locks = [lock for lock in locks_result.data or [] if self._vendor_configured(lock_vendor(lock))]
+
+        codes_by_lock: Dict[str, List[Dict]] = {}
+        for code in codes_result.data or []:
+            codes_by_lock.setdefault(code["lock_id"], []).append(code)
+
+        # (lock, active rows) per device; the Ring intercom once, with the rows of every floor_door lock
+        devices: List[Tuple[Dict, List[Dict]]] = [
+            (lock, codes_by_lock.get(lock["id"], [])) for lock in locks if lock_vendor(lock) == VENDOR_TUYA
+        ]
+        ring_locks = [lock for lock in locks if lock_vendor(lock) == VENDOR_RING]
+        if ring_locks:
+            devices.append((ring_locks[0], [code for lock in ring_locks for code in codes_by_lock.get(lock["id"], [])]))
+
+        # One list call per device, all devices in parallel
+        listings = await asyncio.gather(*[self._list_device_codes(lock) for lock, _ in devices])
+
+        plans = []
+        for (lock, db_codes), device_codes in zip(devices, listings):
+            if device_codes is None:
+                plans.append({"lock": lock, "error": "Device listing failed"})
+                continue
+            plans.append(self._diff(lock, device_codes, db_codes))
+
+        await self._split_unmanaged(plans)
+
+        if not dry_run:
+            await self._apply(plans)
+
+        report = self._report(plans, dry_run)
+        record_counts(
+            devices=len(devices),
+            orphaned=report["totals"]["orphaned"],
+            unmanaged=report["totals"]["unmanaged"],
+            missing=report["totals"]["missing"],
+            backfilled=report["totals"]["backfilled"]
+        )
+        logger.info(
+            f"✅ Reconciliation complete: {report['totals']['orphaned']} orphaned, "
+            f"{report['totals']['unmanaged']} unmanaged, {report['totals']['missing']} missing, "
+            f"{report['totals']['backfilled']} backfilled across {len(devices)} devices"
+        )
+        return report
+
+    def _vendor_configured(self, vendor: str) -> bool:
+        if vendor == VENDOR_RING:
+            return self.ring_service.is_configured
+        return self.tuya_service.is_configured
+
+    async def _list_device_codes(self, lock: Dict) -> Optional[List[Dict]]:
+        """
+        List codes on one device, normalized to {id, name, code, starts_at, ends_at}
+        """
+        if lock_vendor(lock) == VENDOR_RING:
+            codes = await self.ring_service.list_access_codes()
+            if codes is None:
+                return None
+            if isinstance(codes, dict):
+                codes = codes.get("codes", [])
+            return [{
+                "id": str(c.get("id")),
+                "name": c.get("description"),
+                "code": c.get("code"),
+                "starts_at": c.get("starts_at"),
+                "ends_at": c.get("ends_at")
+            } for c in codes]
+
+        passwords = await self.tuya_service.list_temporary_passwords(lock["device_id"])
+        if passwords is None:
+            return None
+        return [{
+            "id": p["id"],
+            "name": p.get("name"),
+            "code": None,
+            "starts_at": p.get("effective_time"),
+            "ends_at": p.get("invalid_time")
+        } for p in passwords]
+
+    def _diff(self, lock: Dict, device_codes: List[Dict], db_codes: List[Dict]) -> Dict:
+        """
+        Set-diff device codes against active DB rows for one lock
+        """
+        vendor = lock_vendor(lock)
+        id_field = "ring_code_id" if vendor == VENDOR_RING else "tuya_password_id"
+
+        device_by_id = {c["id"]: c for c in device_codes}
+        device_ids: Set[str] = set(device_by_id)
+        db_by_external: Dict[str, Dict] = {str(c[id_field]): c for c in db_codes if c.get(id_field)}
+
+        matched_ids = device_ids & set(db_by_external)
+        unmatched_device = device_ids - matched_ids
+        unmatched_db = [c for c in db_codes if str(c.get(id_field)) not in matched_ids]
+
+        # Second pass: rows stored without an ID (or a placeholder like "pwd_123456") match by content
+        by_content: Dict[Tuple, str] = {}
+        for device_id in unmatched_device:
+            c = device_by_id[device_id]
+            by_content[self._content_key(vendor, c["name"], c["code"], c["starts_at"], c["ends_at"])] = device_id
+
+        now = datetime.now(timezone.utc)
+        recent = now - timedelta(minutes=settings.RECONCILIATION_GRACE_MINUTES)
+
+        backfilled: List[Tuple[Dict, str]] = []
+        pending: List[Dict] = []
+        missing: List[Dict] = []
+        for code in unmatched_db:
+            guest_name = (code.get("bookings") or {}).get("guest_name", "")
+            key = self._content_key(vendor, guest_name[:20], code["code"], _epoch(code["valid_from"]), _epoch(code["valid_until"]))
+            device_id = by_content.pop(key, None)
+            if device_id is not None:
+                backfilled.append((code, device_id))
+                unmatched_device.discard(device_id)
+            elif (vendor == VENDOR_TUYA and code.get("tuya_sync_status") == "pending") or (
+                code.get("created_at") and parse_timestamp(code["created_at"]) > recent
+            ):
+                # The create may still be queued or not listed yet - re-creating would duplicate it
+                pending.append(code)
+            else:
+                missing.append(code)
+
+        return {
+            "lock": lock,
+            "vendor": vendor,
+            "id_field": id_field,
+            "on_device": len(device_codes),
+            "in_db": len(db_codes),
+            "matched": len(matched_ids),
+            "orphaned": sorted(unmatched_device),
+            "unmanaged": [],
+            "backfilled": backfilled,
+            "pending": pending,
+            "missing": [c for c in missing if parse_timestamp(c["valid_until"]) > now],
+            "missing_expired": [c for c in missing if parse_timestamp(c["valid_until"]) <= now]
+        }
+
+    async def _split_unmanaged(self, plans: List[Dict]) -> None:
+        """
+        Keep as orphaned only device codes whose ID is stored on some access_codes
+        row (revoked, expired, cancelled...); move the rest to unmanaged
+        """
+        candidates: Dict[str, Set[str]] = {}
+        for plan in plans:
+            if "error" not in plan and plan["orphaned"]:
+                candidates.setdefault(plan["id_field"], set()).update(plan["orphaned"])
+
+        known: Dict[str, Set[str]] = {}
+        for id_field, external_ids in candidates.items():
+            with track_dependency("db"):
+                result = await asyncio.to_thread(
+                    self.supabase.table("access_codes").select(id_field).in_(id_field, sorted(external_ids)).execute
+                )
+            known[id_field] = {str(row[id_field]) for row in result.data or []}
+
+        for plan in plans:
+            if "error" in plan:
+                continue
+            app_codes = known.get(plan["id_field"], set())
+            plan["unmanaged"] = [external_id for external_id in plan["orphaned"] if external_id not in app_codes]
+            plan["orphaned"] = [external_id for external_id in plan["orphaned"] if external_id in app_codes]
+
+    @staticmethod
+    def _content_key(vendor: str, name, code, starts_at, ends_at) -> Tuple:
+        # Ring returns the PIN, Tuya only the name
+        if vendor == VENDOR_RING:
+            return (str(code), int(starts_at or 0), int(ends_at or 0))
+        return (name or "", int(starts_at or 0), int(ends_at or 0))
+
+    async def _apply(self, plans: List[Dict]) -> None:
+        """
+        Execute the queued deletes, creates and backfills
+        """
+        # Orphans: delete from devices through the revocation engine (grouped per device)
+        delete_ops = [
+            (plan["vendor"], plan["lock"]["device_id"], external_id, f"{plan['lock']['id']}:{external_id}")
+            for plan in plans if "error" not in plan
+            for external_id in plan["orphaned"]
+        ] if settings.RECONCILIATION_DELETE_ORPHANS else []
+        if delete_ops:
+            results = await self.revocation_service.delete_device_codes(delete_ops)
+            failed = [key for key, ok in results.items() if not ok]
+            for key in failed:
+                record_error(f"Failed to delete orphaned code {key}")
+
+        # Expired rows that are no longer on the device only need their status fixed
+        expired_ids = [c["id"] for plan in plans if "error" not in plan for c in plan["missing_expired"]]
+        if expired_ids:
+            await asyncio.to_thread(self.revocation_service.mark_revoked, expired_ids, "Reconciliation: not on device")
+
+        for plan in plans:
+            if "error" in plan:
+                continue
+
+            for code, external_id in plan["backfilled"]:
+                update = {plan["id_field"]: external_id}
+                if plan["vendor"] == VENDOR_TUYA:
+                    update["tuya_sync_status"] = "synced"
+                with track_dependency("db"):
+                    await asyncio.to_thread(
+                        self.supabase.table("access_codes").update(update).eq("id", code["id"]).execute
+                    )
+
+            for code in plan["missing"]:
+                await self._recreate(plan, code)
+
+    async def _recreate(self, plan: Dict, code: Dict) -> None:
+        """
+        Put a missing code back on its device and store the new ID
+        """
+        lock = plan["lock"]
+        guest_name = ((code.get("bookings") or {}).get("guest_name") or "Guest")[:20]
+        valid_from = parse_timestamp(code["valid_from"])
+        valid_until = parse_timestamp(code["valid_until"])
+
+        try:
+            if plan["vendor"] == VENDOR_RING:
+                external_id = await self.ring_service.create_access_code(
+                    guest_name=guest_name,
+                    code=code["code"],
+                    valid_from=valid_from,
+                    valid_until=valid_until
+                )
+                update = {"ring_code_id": external_id}
+            else:
+                external_id = await self.tuya_service.create_temporary_password(
+                    device_id=lock["device_id"],
+                    password=code["code"],
+                    valid_from=valid_from,
+                    valid_until=valid_until,
+                    name=guest_name
+                )
+                update = {"tuya_password_id": external_id, "tuya_sync_status": "synced" if external_id else "failed"}
+
+            if not external_id:
+                record_error(f"Failed to re-create code {code['id']} on {lock['device_id']}")
+                return
+
+            with track_dependency("db"):
+                await asyncio.to_thread(self.supabase.table("access_codes").update(update).eq("id", code["id"]).execute)
+            logger.info(f"✅ Re-created missing code {code['id']} on {lock['device_id']}")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to re-create code {code['id']}: {e}")
+            record_error(f"Code {code['id']}: {e}")
+
+    @staticmethod
+    def _report(plans: List[Dict], dry_run: bool) -> Dict:
+        devices = []
+        totals = {
+            "orphaned": 0, "unmanaged": 0, "missing": 0, "missing_expired": 0,
+            "pending": 0, "backfilled": 0, "failed_devices": 0
+        }
+
+        for plan in plans:
+            lock = plan["lock"]
+            if "error" in plan:
+                totals["failed_devices"] += 1
+                devices.append({"device_id": lock["device_id"], "lock_type": lock["lock_type"], "error": plan["error"]})
+                continue
+
+            totals["orphaned"] += len(plan["orphaned"])
+            totals["unmanaged"] += len(plan["unmanaged"])
+            totals["missing"] += len(plan["missing"])
+            totals["missing_expired"] += len(plan["missing_expired"])
+            totals["pending"] += len(plan["pending"])
+            totals["backfilled"] += len(plan["backfilled"])
+            devices.append({
+                "device_id": lock["device_id"],
+                "lock_type": lock["lock_type"],
+                "vendor": plan["vendor"],
+                "on_device": plan["on_device"],
+                "in_db": plan["in_db"],
+                "matched": plan["matched"],
+                "orphaned": plan["orphaned"],
+                "unmanaged": plan["unmanaged"],
+                "missing": [c["id"] for c in plan["missing"]],
+                "missing_expired": [c["id"] for c in plan["missing_expired"]],
+                "pending": [c["id"] for c in plan["pending"]],
+                "backfilled": [c["id"] for c, _ in plan["backfilled"]]
+            })
+
+        return {
+            "dry_run": dry_run,
+            "orphans_deleted": settings.RECONCILIATION_DELETE_ORPHANS and not dry_run,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "totals": totals,
+            "devices": devices
+        }
+
+
+# Global instance
+_reconciliation_service: Optional[ReconciliationService] = None
+
+
+def get_reconciliation_service() -> ReconciliationService:
+    """
+    Get or create reconciliation service singleton
+    """
+    global _reconciliation_service
+    if _reconciliation_service is None:
+        _reconciliation_service = ReconciliationService()
+    return _reconciliation_service
@@ -0,0 +1,250 @@
+"""
+Bulk access code revocation engine
+Shared by booking cancellation, manual revoke-all and the auto-revoke job
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.tuya_service import get_tuya_service
+from app.services.ring_service import get_ring_service
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Vendor keys used to group device deletes
+VENDOR_TUYA = "tuya"
+VENDOR_RING = "ring"
+
+
+def code_device_id(code: Dict) -> Optional[str]:
+    """
+    Resolve the device ID of an access code row
+    Older rows only carry it through the joined lock
+
+    Args:
+        code: access_codes row (optionally joined with locks)
+
+    Returns:
+        Device ID or None
+    """
+    if code.get("device_id"):
+        return code["device_id"]
+    lock = code.get("locks") or {}
+    return lock.get("device_id")
+
+
+def code_vendor(code: Dict) -> Optional[str]:
+    """
+    Vendor holding the code on a device, or None if nothing was provisioned
+
+    Args:
+        code: access_codes row
+
+    Returns:
+        'tuya', 'ring' or None
+    """
+    if code.get("tuya_password_id"):
+        return VENDOR_TUYA
+    if code.get("ring_code_id"):
+        return VENDOR_RING
+    return None
+
+
+class RevocationService:
+    """
+    Revokes access codes in bulk
+
+    Device deletes are grouped by (vendor, device): devices run concurrently
+    under a per-vendor limit. A Tuya device's deletes are issued together so
+    the command batcher sends them in one request; Ring codes go one by one.
+    Results are written back with one bulk UPDATE per revocation reason.
+    """
+
+    def __init__(self):
+        """
+        Initialize revocation service
+        """
+        self.supabase = get_supabase()
+        self.tuya_service = get_tuya_service()
+        self.ring_service = get_ring_service()
+        self._vendor_limits = {
+            VENDOR_TUYA: asyncio.Semaphore(settings.REVOCATION_TUYA_CONCURRENCY),
+            VENDOR_RING: asyncio.Semaphore(settings.REVOCATION_RING_CONCURRENCY),
+        }
+        logger.info("✅ Revocation service initialized")
+
+    async def revoke_codes(self, codes: List[Dict], reason: str) -> Dict:
+        """
+        Delete codes from their devices and mark them revoked
+
+        Codes that were never provisioned on a device are revoked directly
+        with reason "<reason>: no device code".
+
+        Args:
+            codes: access_codes rows (with tuya_password_id/ring_code_id and device_id or locks join)
+            reason: Revocation reason stored on each row
+
+        Returns:
+            Dict with revoked/failed counts and IDs
+        """
+        if not codes:
+            return {"revoked": 0, "failed": 0, "revoked_ids": [], "failed_ids": []}
+
+        # reason -> code IDs to mark revoked
+        by_reason: Dict[str, List[str]] = defaultdict(list)
+        failed_ids: List[str] = []
+
+        device_ops: List[Tuple[str, Optional[str], str, str]] = []
+        for code in codes:
+            vendor = code_vendor(code)
+            if vendor is None:
+                by_reason[f"{reason}: no device code"].append(code["id"])
+                continue
+
+            external_id = code["tuya_password_id"] if vendor == VENDOR_TUYA else code["ring_code_id"]
+            device_ops.append((vendor, code_device_id(code), external_id, code["id"]))
+
+        results = await self.delete_device_codes(device_ops)
+        for code_id, success in results.items():
+            if success:
+                by_reason[reason].append(code_id)
+            else:
+                failed_ids.append(code_id)
+
+        revoked_ids: List[str] = []
+        for revoked_reason, code_ids in by_reason.items():
+            revoked_ids.extend(self.mark_revoked(code_ids, revoked_reason))
+
+        logger.info(f"✅ Revocation complete ({reason}): {len(revoked_ids)} revoked, {len(failed_ids)} failed")
+
+        return {
+            "revoked": len(revoked_ids),
+            "failed": len(failed_ids),
+            "revoked_ids": revoked_ids,
+            "failed_ids": failed_ids
+        }
+
+    async def revoke_booking_codes(self, booking_id: str, reason: str) -> Dict:
+        """
+        Revoke every active code of a booking
+
+        Args:
+            booking_id: UUID of the booking
+            reason: Revocation reason
+
+        Returns:
+            Revocation summary (see revoke_codes)
+        """
+        with track_dependency("db"):
+            codes_result = self.supabase.table("access_codes")\
+                .select("*, locks(*)")\
+                .eq("booking_id", booking_id)\
+                .eq("status", "active")\
+                .execute()
+
+        return await self.revoke_codes(codes_result.data or [], reason)
+
+    async def delete_device_codes(self, device_ops: List[Tuple[str, Optional[str], str, str]]) -> Dict[str, bool]:
+        """
+        Delete codes from devices, grouped per device
+
+        Args:
+            device_ops: (vendor, device_id, external_code_id, key) tuples;
+                        key identifies the operation in the result
+
+        Returns:
+            Dict of key -> success
+        """
+        by_device: Dict[Tuple[str, Optional[str]], List[Tuple[str, str]]] = defaultdict(list)
+        for vendor, device_id, external_id, key in device_ops:
+            by_device[(vendor, device_id)].append((external_id, key))
+
+        results: Dict[str, bool] = {}
+        await asyncio.gather(*[
+            self._delete_on_device(vendor, device_id, ops, results)
+            for (vendor, device_id), ops in by_device.items()
+        ])
+        return results
+
+    async def _delete_on_device(
+        self,
+        vendor: str,
+        device_id: Optional[str],
+        ops: List[Tuple[str, str]],
+        results: Dict[str, bool]
+    ) -> None:
+        """
+        Delete a device's codes, holding a vendor slot
+        """
+        async with self._vendor_limits[vendor]:
+            if vendor == VENDOR_TUYA:
+                if not device_id:
+                    for external_id, key in ops:
+                        logger.error(f"❌ No device ID for Tuya password {external_id}")
+                        results[key] = False
+                    return
+                # Concurrent calls for one device coalesce into a single commands request
+                await asyncio.gather(*[
+                    self._delete_one(vendor, device_id, external_id, key, results)
+                    for external_id, key in ops
+                ])
+            else:
+                for external_id, key in ops:
+                    await self._delete_one(vendor, device_id, external_id, key, results)
+
+    async def _delete_one(
+        self,
+        vendor: str,
+        device_id: Optional[str],
+        external_id: str,
+        key: str,
+        results: Dict[str, bool]
+    ) -> None:
+        try:
+            if vendor == VENDOR_TUYA:
+                results[key] = await self.tuya_service.delete_temporary_password(device_id, external_id)
+            else:
+                results[key] = await self.ring_service.revoke_access_code(external_id)
+
+        except Exception as e:
+            logger.error(f"❌ Failed to delete {vendor} code {external_id}: {e}")
+            results[key] = False
+
+    def mark_revoked(self, code_ids: List[str], reason: str) -> List[str]:
+        """
+        Mark codes revoked with a single bulk UPDATE ... WHERE id = ANY(...)
+
+        Returns:
+            IDs actually updated (codes still active)
+        """
+        if not code_ids:
+            return []
+
+        try:
+            with track_dependency("db"):
+                response = self.supabase.rpc("revoke_access_codes", {
+                    "p_code_ids": code_ids,
+                    "p_reason": reason
+                }).execute()
+            return [row["id"] if isinstance(row, dict) else row for row in response.data or []]
+
+        except Exception as e:
+            logger.error(f"❌ Failed to mark {len(code_ids)} codes revoked ({reason}): {e}", exc_info=True)
+            return []
+
+
+# Global instance
+_revocation_service: Optional[RevocationService] = None
+
+
+def get_revocation_service() -> RevocationService:
+    """
+    Get or create revocation service singleton
+    """
+    global _revocation_service
+    if _revocation_service is None:
+        _revocation_service = RevocationService()
+    return _revocation_service
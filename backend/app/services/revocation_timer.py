@@ -0,0 +1,162 @@
+"""
+Per-code revocation timer
+Revokes each access code from its device as soon as its valid_until passes
+"""
+import asyncio
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.deadline_timer import DeadlineTimer, parse_timestamp
+from app.services.revocation_service import get_revocation_service, code_device_id
+from app.services.job_metrics import record_counts, track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def revocation_due_at(code: Dict) -> datetime:
+    """
+    Moment an access code should be revoked
+
+    valid_until is rounded up to the minute so codes expiring in the same
+    minute coalesce into one batch, then offset by a stable per-device delay
+    (0..REVOCATION_SPREAD_SECONDS) so all locks aren't hit at the same instant.
+
+    Args:
+        code: access_codes row (valid_until, device_id or locks join)
+
+    Returns:
+        Due time for the code's revocation
+    """
+    valid_until = parse_timestamp(code["valid_until"])
+
+    minute = valid_until.replace(second=0, microsecond=0)
+    if minute < valid_until:
+        minute += timedelta(minutes=1)
+
+    spread = settings.REVOCATION_SPREAD_SECONDS
+    device_id = code_device_id(code) or ""
+    offset = zlib.crc32(device_id.encode()) % spread if spread > 0 else 0
+
+    return minute + timedelta(seconds=offset)
+
+
+class RevocationTimer(DeadlineTimer):
+    """
+    Deadline timer keyed by access code ID
+    Codes sharing a due time are revoked together through the revocation engine
+    """
+
+    name = "Revocation timer"
+    job_name = "revoke_expired_codes_timer"
+
+    def schedule(self, code: Dict) -> None:
+        """
+        Add or update an access code in the timer
+        Only active codes held on a device are scheduled
+
+        Args:
+            code: access_codes row
+        """
+        code_id = code.get("id")
+        if not code_id:
+            return
+
+        if code.get("status", "active") != "active" or not (code.get("tuya_password_id") or code.get("ring_code_id")):
+            self.cancel(code_id)
+            return
+
+        self._set(code_id, revocation_due_at(code))
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the schedule from every active code held on a device
+        Codes already past valid_until fire immediately
+
+        Returns:
+            Number of codes scheduled
+        """
+        supabase = get_supabase()
+
+        with track_dependency("db"):
+            response = await asyncio.to_thread(
+                supabase.table("access_codes")
+                .select("id, valid_until, device_id, tuya_password_id, ring_code_id, locks(device_id)")
+                .eq("status", "active")
+                .or_("tuya_password_id.not.is.null,ring_code_id.not.is.null")
+                .execute
+            )
+
+        due = {code["id"]: revocation_due_at(code) for code in response.data or []}
+        self._replace(due)
+
+        logger.info(f"✅ Revocation timer rebuilt: {len(due)} active codes")
+        return len(due)
+
+    async def _fire(self, code_ids: List[str]) -> None:
+        """
+        Revoke a batch of codes whose validity has ended
+        """
+        supabase = get_supabase()
+
+        # Re-read the batch: codes revoked or extended since scheduling are skipped/rescheduled
+        with track_dependency("db"):
+            response = await asyncio.to_thread(
+                supabase.table("access_codes")
+                .select("*, locks(*)")
+                .in_("id", code_ids)
+                .eq("status", "active")
+                .execute
+            )
+
+        now = datetime.now(timezone.utc)
+        expired = []
+        for code in response.data or []:
+            if parse_timestamp(code["valid_until"]) <= now:
+                expired.append(code)
+            else:
+                self.schedule(code)
+
+        if not expired:
+            return
+
+        logger.info(f"⏰ Revoking {len(expired)} expired codes")
+        result = await get_revocation_service().revoke_codes(expired, "Auto-revoke: expired")
+        record_counts(revoked=result["revoked"], failed=result["failed"])
+
+        if result["failed_ids"]:
+            retry_at = now + timedelta(minutes=settings.REVOCATION_RETRY_MINUTES)
+            for code_id in result["failed_ids"]:
+                self._set(code_id, retry_at)
+            logger.warning(f"⚠️ {len(result['failed_ids'])} revocations will be retried at {retry_at.isoformat()}")
+
+
+# Global instance
+_revocation_timer: Optional[RevocationTimer] = None
+
+
+def get_revocation_timer() -> RevocationTimer:
+    """
+    Get or create revocation timer singleton
+    """
+    global _revocation_timer
+    if _revocation_timer is None:
+        _revocation_timer = RevocationTimer()
+    return _revocation_timer
+
+
+async def start_revocation_timer():
+    """
+    Start the revocation timer (called from application lifespan)
+    """
+    await get_revocation_timer().start()
+
+
+async def stop_revocation_timer():
+    """
+    Stop the revocation timer gracefully
+    """
+    if _revocation_timer:
+        await _revocation_timer.stop()
@@ -3,17 +3,34 @@ Ring Intercom integration service
 Manages access codes for Ring intercom (floor door)
 """
 import aiohttp
+import asyncio
 import logging
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
+from app.core.database import get_supabase
+from app.core.resilience import vendor_guard
+from app.core.http import create_vendor_session
+from app.services.job_metrics import timed_dependency, track_dependency
+from app.services.leader_election import get_leader_elector
+from app.services.deadline_timer import parse_timestamp
 
 logger = logging.getLogger(__name__)
 
+# integration_tokens row holding the shared Ring tokens
+RING_TOKEN_PROVIDER = "ring"
+
 
 class RingIntercomService:
     """
     Service for managing Ring Intercom access codes
+    Every Ring call goes through the "ring" vendor guard (bulkhead, timeout, circuit breaker)
+    over one pooled keep-alive session
+
+    Tokens are shared through the integration_tokens table: concurrent callers
+    in a worker await one refresh, and across workers the refresh is claimed
+    so only one of them calls the OAuth endpoint; the others pick up the new
+    access token and the rotated refresh token from the row.
     """
 
     # Ring API endpoints
@@ -28,50 +45,264 @@ class RingIntercomService:
         self.device_id = settings.RING_INTERCOM_DEVICE_ID
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
+        self._token_lock = asyncio.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
 
         logger.info("✅ Ring Intercom service initialized")
 
-    async def _get_access_token(self) -> str:
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_vendor_session("ring")
+        return self._session
+
+    async def open(self) -> None:
+        """
+        Create the pooled HTTP session (called from application lifespan)
+        """
+        self._get_session()
+
+    async def close(self) -> None:
+        """
+        Close the pooled HTTP session
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict] = None,
+        json: Optional[Dict] = None
+    ) -> Tuple[int, Any]:
+        """
+        Send one request to Ring under the vendor guard
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            headers: Request headers
+            json: JSON body
+
+        Returns:
+            (status, decoded JSON or response text)
+
+        Raises:
+            aiohttp.ClientResponseError on 5xx (counted as a vendor failure),
+            aiohttp.ClientError / TimeoutError / CircuitOpenError / BulkheadFullError
+        """
+        guard = vendor_guard("ring")
+        async with guard.call():
+            async with self._get_session().request(method, url, headers=headers, json=json) as response:
+                if response.content_type == "application/json":
+                    body = await response.json()
+                else:
+                    body = await response.text()
+
+                if response.status >= 500:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message=str(body)[:200]
+                    )
+                return response.status, body
+
+    def _token_valid(self) -> bool:
+        return bool(self.access_token and self.token_expires_at and datetime.now(timezone.utc) < self.token_expires_at)
+
+    def _adopt_token(self, access_token: str, expires_at: datetime) -> None:
+        # Use the token until RING_TOKEN_REFRESH_MARGIN_SECONDS before it expires
+        self.access_token = access_token
+        self.token_expires_at = expires_at - timedelta(seconds=settings.RING_TOKEN_REFRESH_MARGIN_SECONDS)
+
+    async def _get_access_token(self, force: bool = False) -> str:
         """
         Get or refresh Ring API access token
 
+        Args:
+            force: Refresh even if the current token is still valid
+
         Returns:
             Valid access token
         """
-        # Check if we have a valid token
-        if self.access_token and self.token_expires_at:
-            if datetime.now(timezone.utc) < self.token_expires_at:
+        if not force and self._token_valid():
+            return self.access_token
+
+        async with self._token_lock:
+            # Another caller may have refreshed while we waited
+            if not force and self._token_valid():
+                return self.access_token
+
+            try:
+                shared = await self._wait_for_refresh_claim(force)
+                if shared is not None:
+                    return shared
+                return await self._refresh_access_token()
+            except Exception as e:
+                logger.error(f"❌ Failed to get Ring access token: {e}", exc_info=True)
+                raise
+
+    async def refresh_access_token(self) -> datetime:
+        """
+        Force a token refresh (admin action)
+
+        Returns:
+            Expiry of the new access token
+        """
+        await self._get_access_token(force=True)
+        return self.token_expires_at + timedelta(seconds=settings.RING_TOKEN_REFRESH_MARGIN_SECONDS)
+
+    async def _wait_for_refresh_claim(self, force: bool) -> Optional[str]:
+        """
+        Adopt a valid shared token, or claim the refresh for this worker
+
+        Returns:
+            Shared access token, or None if this worker should refresh
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.RING_TOKEN_WAIT_SECONDS
+        first_expiry = None
+        first = True
+
+        while True:
+            row = await self._load_shared_token()
+            if row is None:
+                # No shared store (table missing or DB down): refresh locally
+                return None
+
+            if row.get("refresh_token"):
+                self.refresh_token = row["refresh_token"]
+            expires_at = parse_timestamp(row["expires_at"]) if row.get("expires_at") else None
+            if first:
+                first_expiry, first = expires_at, False
+
+            # A forced refresh only accepts a token refreshed after it started
+            fresh = not force or expires_at != first_expiry
+            margin = timedelta(seconds=settings.RING_TOKEN_REFRESH_MARGIN_SECONDS)
+            if fresh and row.get("access_token") and expires_at and datetime.now(timezone.utc) < expires_at - margin:
+                self._adopt_token(row["access_token"], expires_at)
+                logger.info("✅ Ring access token loaded from shared store")
                 return self.access_token
 
-        # Refresh token
+            if await self._claim_refresh():
+                return None
+
+            if loop.time() >= deadline:
+                logger.warning("⚠️ Ring token refresh still claimed by another worker, refreshing anyway")
+                return None
+            await asyncio.sleep(0.5)
+
+    async def _refresh_access_token(self) -> str:
+        """
+        Call the Ring OAuth endpoint and publish the new tokens
+        """
+        tokens = [self.refresh_token]
+        if settings.RING_REFRESH_TOKEN and settings.RING_REFRESH_TOKEN != self.refresh_token:
+            # A stored token that Ring no longer accepts falls back to a newly configured env token
+            tokens.append(settings.RING_REFRESH_TOKEN)
+
         try:
-            async with aiohttp.ClientSession() as session:
+            for i, refresh_token in enumerate(tokens):
                 data = {
                     "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token,
+                    "refresh_token": refresh_token,
                     "client_id": "ring_official_android",  # Ring's official client ID
                 }
 
-                async with session.post(self.OAUTH_ENDPOINT, json=data) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"❌ Ring token refresh failed: {error_text}")
-                        raise Exception(f"Ring authentication failed: {response.status}")
+                status, result = await self._request("POST", self.OAUTH_ENDPOINT, json=data)
+                if status == 200:
+                    break
+                if status in (400, 401) and i + 1 < len(tokens):
+                    logger.warning("⚠️ Stored Ring refresh token rejected, retrying with the configured one")
+                    continue
+                logger.error(f"❌ Ring token refresh failed: {result}")
+                raise Exception(f"Ring authentication failed: {status}")
+
+            # Ring rotates the refresh token; keep the latest one
+            self.refresh_token = result.get("refresh_token") or refresh_token
+            expires_at = datetime.now(timezone.utc) + timedelta(seconds=result.get("expires_in", 3600))
+            self._adopt_token(result["access_token"], expires_at)
+        except Exception:
+            await self._release_refresh_claim()
+            raise
 
-                    result = await response.json()
-                    self.access_token = result["access_token"]
+        await self._store_shared_token(expires_at)
+        logger.info("✅ Ring access token refreshed")
+        return self.access_token
 
-                    # Token typically expires in 1 hour, refresh 5 min early
-                    expires_in = result.get("expires_in", 3600)
-                    self.token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in - 300)
+    async def _load_shared_token(self) -> Optional[Dict]:
+        """
+        Shared token row ({} when none stored yet), or None when the store is unavailable
+        """
+        try:
+            supabase = get_supabase()
+            with track_dependency("db"):
+                result = await asyncio.to_thread(
+                    lambda: supabase.table("integration_tokens")
+                    .select("access_token, refresh_token, expires_at")
+                    .eq("provider", RING_TOKEN_PROVIDER)
+                    .execute()
+                )
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            logger.warning(f"⚠️ Shared Ring token store unavailable: {e}")
+            return None
 
-                    logger.info("✅ Ring access token refreshed")
-                    return self.access_token
+    async def _claim_refresh(self) -> bool:
+        try:
+            supabase = get_supabase()
+            with track_dependency("db"):
+                result = await asyncio.to_thread(
+                    lambda: supabase.rpc("claim_integration_token_refresh", {
+                        "p_provider": RING_TOKEN_PROVIDER,
+                        "p_holder": get_leader_elector().holder_id,
+                        "p_ttl_seconds": settings.RING_TOKEN_CLAIM_SECONDS
+                    }).execute()
+                )
+            return bool(result.data)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not claim Ring token refresh: {e}")
+            return True
 
+    async def _store_shared_token(self, expires_at: datetime) -> None:
+        """
+        Publish the new tokens and release the refresh claim
+        """
+        try:
+            supabase = get_supabase()
+            with track_dependency("db"):
+                await asyncio.to_thread(
+                    lambda: supabase.table("integration_tokens").upsert({
+                        "provider": RING_TOKEN_PROVIDER,
+                        "access_token": self.access_token,
+                        "refresh_token": self.refresh_token,
+                        "expires_at": expires_at.isoformat(),
+                        "refresh_holder": None,
+                        "refresh_claimed_until": None,
+                        "updated_at": datetime.now(timezone.utc).isoformat()
+                    }).execute()
+                )
         except Exception as e:
-            logger.error(f"❌ Failed to get Ring access token: {e}", exc_info=True)
-            raise
+            # The rotated refresh token only lives in memory until the next successful store
+            logger.error(f"❌ Failed to persist Ring tokens: {e}")
 
+    async def _release_refresh_claim(self) -> None:
+        try:
+            supabase = get_supabase()
+            with track_dependency("db"):
+                await asyncio.to_thread(
+                    lambda: supabase.table("integration_tokens")
+                    .update({"refresh_holder": None, "refresh_claimed_until": None})
+                    .eq("provider", RING_TOKEN_PROVIDER)
+                    .eq("refresh_holder", get_leader_elector().holder_id)
+                    .execute()
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release Ring token refresh claim: {e}")
+
+    @timed_dependency("ring")
     async def create_access_code(
         self,
         guest_name: str,
@@ -113,23 +344,21 @@ class RingIntercomService:
 
             url = f"{self.RING_API_BASE}/clients_api/intercoms/{self.device_id}/codes"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status in [200, 201]:
-                        result = await response.json()
-                        code_id = result.get("id") or result.get("code_id") or f"ring_{code}"
+            status, result = await self._request("POST", url, headers=headers, json=payload)
+            if status in [200, 201]:
+                code_id = result.get("id") or result.get("code_id") or f"ring_{code}"
 
-                        logger.info(f"✅ Created Ring access code for {guest_name}: {code_id}")
-                        return code_id
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Ring API error: {response.status} - {error_text}")
-                        return None
+                logger.info(f"✅ Created Ring access code for {guest_name}: {code_id}")
+                return code_id
+            else:
+                logger.error(f"❌ Ring API error: {status} - {result}")
+                return None
 
         except Exception as e:
             logger.error(f"❌ Failed to create Ring access code: {e}", exc_info=True)
             return None
 
+    @timed_dependency("ring")
     async def revoke_access_code(self, code_id: str) -> bool:
         """
         Revoke/delete an access code from Ring intercom
@@ -149,20 +378,19 @@ class RingIntercomService:
 
             url = f"{self.RING_API_BASE}/clients_api/intercoms/{self.device_id}/codes/{code_id}"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.delete(url, headers=headers) as response:
-                    if response.status in [200, 204]:
-                        logger.info(f"✅ Revoked Ring access code: {code_id}")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to revoke Ring code: {response.status} - {error_text}")
-                        return False
+            status, result = await self._request("DELETE", url, headers=headers)
+            if status in [200, 204]:
+                logger.info(f"✅ Revoked Ring access code: {code_id}")
+                return True
+            else:
+                logger.error(f"❌ Failed to revoke Ring code: {status} - {result}")
+                return False
 
         except Exception as e:
             logger.error(f"❌ Failed to revoke Ring access code: {e}", exc_info=True)
             return False
 
+    @timed_dependency("ring")
     async def get_device_status(self) -> Optional[Dict]:
         """
         Get Ring intercom device status
@@ -179,34 +407,38 @@ class RingIntercomService:
 
             url = f"{self.RING_API_BASE}/clients_api/ring_devices"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        devices = await response.json()
-
-                        # Find our specific intercom
-                        for device in devices.get("intercoms", []):
-                            if device.get("id") == int(self.device_id):
-                                logger.info(f"✅ Ring device status retrieved")
-                                return device
+            status, devices = await self._request("GET", url, headers=headers)
+            if status == 200:
+                # Find our specific intercom
+                for device in devices.get("intercoms", []):
+                    if device.get("id") == int(self.device_id):
+                        logger.info(f"✅ Ring device status retrieved")
+                        return device
 
-                        logger.warning(f"⚠️ Ring device {self.device_id} not found")
-                        return None
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to get Ring status: {response.status} - {error_text}")
-                        return None
+                logger.warning(f"⚠️ Ring device {self.device_id} not found")
+                return None
+            else:
+                logger.error(f"❌ Failed to get Ring status: {status} - {devices}")
+                return None
 
         except Exception as e:
             logger.error(f"❌ Failed to get Ring device status: {e}", exc_info=True)
             return None
 
-    async def list_access_codes(self) -> list:
+    @property
+    def is_configured(self) -> bool:
+        """
+        True when Ring credentials and intercom device are configured
+        """
+        return bool(self.refresh_token and self.device_id)
+
+    @timed_dependency("ring")
+    async def list_access_codes(self) -> Optional[list]:
         """
         List all access codes for the Ring intercom
 
         Returns:
-            List of access codes
+            List of access codes, or None if the intercom could not be queried
         """
         try:
             token = await self._get_access_token()
@@ -217,20 +449,17 @@ class RingIntercomService:
 
             url = f"{self.RING_API_BASE}/clients_api/intercoms/{self.device_id}/codes"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        codes = await response.json()
-                        logger.info(f"✅ Retrieved {len(codes)} Ring access codes")
-                        return codes
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to list Ring codes: {response.status} - {error_text}")
-                        return []
+            status, codes = await self._request("GET", url, headers=headers)
+            if status == 200:
+                logger.info(f"✅ Retrieved {len(codes)} Ring access codes")
+                return codes
+            else:
+                logger.error(f"❌ Failed to list Ring codes: {status} - {codes}")
+                return None
 
         except Exception as e:
             logger.error(f"❌ Failed to list Ring access codes: {e}", exc_info=True)
-            return []
+            return None
 
 
 # Global instance
@@ -245,3 +474,18 @@ def get_ring_service() -> RingIntercomService:
     if _ring_service is None:
         _ring_service = RingIntercomService()
     return _ring_service
+
+
+async def open_ring_service():
+    """
+    Create the Ring service and its pooled session (called from application lifespan)
+    """
+    await get_ring_service().open()
+
+
+async def close_ring_service():
+    """
+    Close the Ring service's pooled connections on shutdown
+    """
+    if _ring_service is not None:
+        await _ring_service.close()
@@ -1,15 +1,24 @@
 """
 APScheduler for automated tasks (booking sync, code provisioning, auto-revoke, etc.)
 """
+import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime, timezone
+from typing import Dict
 from app.core.config import settings
 from app.core.database import get_supabase
-from app.services.tuya_service import get_tuya_service
+from app.services.revocation_service import get_revocation_service
 from app.services.notification_service import get_notification_service
 from app.services.booking_sync_service import get_booking_sync_service
+from app.services.provisioning_timer import get_provisioning_timer
+from app.services.revocation_timer import get_revocation_timer
+from app.services.lifecycle_service import get_lifecycle_service
+from app.services.reconciliation_service import get_reconciliation_service
+from app.services.device_telemetry import get_device_telemetry_store
+from app.services.webhook_pipeline import replay_webhook_events
+from app.services.leader_election import leader_only
+from app.services.job_metrics import instrumented_job, prune_job_runs, record_counts, record_error, track_dependency
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +27,7 @@ logger = logging.getLogger(__name__)
 scheduler: AsyncIOScheduler = None
 
 
+@instrumented_job()
 async def sync_bookings_from_lodgify():
     """
     Twice-daily job (12 AM and 6 PM) to sync bookings from Lodgify
@@ -28,15 +38,22 @@ async def sync_bookings_from_lodgify():
         booking_sync_service = get_booking_sync_service()
         result = await booking_sync_service.sync_bookings_from_lodgify()
 
+        record_counts(**result)
+
         if result["status"] == "success":
             logger.info(f"✅ Booking sync complete: {result.get('total', 0)} bookings processed")
         elif result["status"] == "skipped":
             logger.info(f"⏭️ Booking sync skipped: {result.get('reason', 'unknown')}")
+        elif result["status"] == "partial":
+            logger.warning(f"⚠️ Booking sync partially failed: {result.get('message', 'unknown error')}")
+            record_error(result.get("message", "unknown error"))
         else:
             logger.error(f"❌ Booking sync failed: {result.get('message', 'unknown error')}")
+            record_error(result.get("message", "unknown error"), fatal=True)
 
     except Exception as e:
         logger.error(f"❌ Booking sync job failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
         try:
             notification_service = get_notification_service()
             await notification_service.notify_admin_error(
@@ -47,92 +64,38 @@ async def sync_bookings_from_lodgify():
             pass
 
 
-async def provision_access_codes():
-    """
-    Twice-daily job (12 AM and 6 PM) to provision access codes for upcoming bookings
+@instrumented_job()
+async def revoke_expired_codes() -> Dict:
     """
-    logger.info("🔄 Running code provisioning job...")
-
-    try:
-        booking_sync_service = get_booking_sync_service()
-        result = await booking_sync_service.provision_codes_for_upcoming_bookings()
-
-        if result["status"] == "success":
-            logger.info(f"✅ Code provisioning complete: {result.get('codes_provisioned', 0)} bookings processed")
-        else:
-            logger.error(f"❌ Code provisioning failed: {result.get('message', 'unknown error')}")
-
-    except Exception as e:
-        logger.error(f"❌ Code provisioning job failed: {e}", exc_info=True)
-        try:
-            notification_service = get_notification_service()
-            await notification_service.notify_admin_error(
-                "Code Provisioning Job Failed",
-                str(e)
-            )
-        except:
-            pass
+    Daily safety-net job to revoke expired access codes
+    Codes are normally revoked at expiry by the revocation timer; this
+    catches anything it missed (e.g. failed retries, downtime)
 
-
-async def revoke_expired_codes():
-    """
-    Daily job to revoke expired access codes
+    Returns:
+        Revocation summary
     """
     logger.info("🔄 Running auto-revoke job...")
 
     try:
         supabase = get_supabase()
-        tuya_service = get_tuya_service()
 
         # Get all codes that need revocation
-        response = supabase.rpc("codes_to_revoke").execute()
+        with track_dependency("db"):
+            response = supabase.rpc("codes_to_revoke").execute()
 
         codes_to_revoke = response.data
 
         if not codes_to_revoke:
             logger.info("✅ No codes to revoke")
-            return
-
-        revoked_count = 0
-        failed_count = 0
-
-        for code in codes_to_revoke:
-            try:
-                # Delete from Tuya
-                if code.get('tuya_password_id'):
-                    success = tuya_service.delete_temporary_password(
-                        code['device_id'],
-                        code['tuya_password_id']
-                    )
-
-                    if success:
-                        # Update database
-                        supabase.table("access_codes").update({
-                            "status": "revoked",
-                            "revoked_at": datetime.now(timezone.utc).isoformat(),
-                            "revoked_reason": "Auto-revoke: expired"
-                        }).eq("id", code['id']).execute()
-
-                        revoked_count += 1
-                    else:
-                        failed_count += 1
-                else:
-                    # No Tuya ID, just mark as revoked
-                    supabase.table("access_codes").update({
-                        "status": "revoked",
-                        "revoked_at": datetime.now(timezone.utc).isoformat(),
-                        "revoked_reason": "Auto-revoke: no tuya_id"
-                    }).eq("id", code['id']).execute()
-                    revoked_count += 1
-
-            except Exception as e:
-                logger.error(f"Failed to revoke code {code['id']}: {e}")
-                failed_count += 1
-
-        # Update checkout status
-        supabase.table("bookings").update({
-            "status": "checked_out"
-        }).lt("checkout_date", datetime.now(timezone.utc).isoformat()).eq("status", "checked_in").execute()
+            return {"revoked": 0, "failed": 0}
+
+        result = await get_revocation_service().revoke_codes(
+            codes_to_revoke,
+            "Auto-revoke: expired"
+        )
+        revoked_count = result["revoked"]
+        failed_count = result["failed"]
+        record_counts(revoked=revoked_count, failed=failed_count)
 
         logger.info(f"✅ Auto-revoke complete: {revoked_count} revoked, {failed_count} failed")
 
@@ -144,6 +107,8 @@ async def revoke_expired_codes():
             f"❌ Falliti: {failed_count}"
         )
 
+        return {"revoked": revoked_count, "failed": failed_count}
+
     except Exception as e:
         logger.error(f"❌ Auto-revoke job failed: {e}", exc_info=True)
 
@@ -157,10 +122,118 @@ async def revoke_expired_codes():
         except:
             pass
 
+        raise
+
+
+@instrumented_job()
+async def apply_booking_lifecycle():
+    """
+    Frequent job that applies booking status transitions and code expiry
+    in one set-based pass (see LifecycleService)
+    """
+    try:
+        await get_lifecycle_service().apply_transitions()
+    except Exception as e:
+        logger.error(f"❌ Lifecycle job failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+
+
+@instrumented_job()
+async def resync_timers():
+    """
+    Periodic job on the leader that rebuilds the provisioning and revocation timers
+    Picks up bookings and codes created or cancelled through other workers
+    """
+    try:
+        record_counts(
+            bookings_scheduled=await get_provisioning_timer().rebuild(),
+            codes_scheduled=await get_revocation_timer().rebuild()
+        )
+    except Exception as e:
+        logger.error(f"❌ Timer resync failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+
+
+@instrumented_job()
+async def replay_webhooks():
+    """
+    Periodic job on the leader that re-queues webhook events left pending
+    (restart, full queue) or failed
+    """
+    try:
+        record_counts(events_replayed=await replay_webhook_events())
+    except Exception as e:
+        logger.error(f"❌ Webhook replay failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+
+
+@instrumented_job()
+async def reconcile_devices():
+    """
+    Daily job that diffs the codes on every lock against access_codes
+    and repairs the drift (see ReconciliationService)
+    """
+    try:
+        report = await get_reconciliation_service().reconcile()
+        totals = report["totals"]
+
+        if totals["orphaned"] or totals["missing"] or totals["missing_expired"] or totals["pending"] or totals["failed_devices"]:
+            notification_service = get_notification_service()
+            await notification_service.send_telegram(
+                f"🔍 *Daily Code Reconciliation*\n\n"
+                f"🗑️ Orfani {'rimossi' if report['orphans_deleted'] else 'da rimuovere'}: {totals['orphaned']}\n"
+                f"➕ Mancanti ricreati: {totals['missing']}\n"
+                f"⌛ Scaduti revocati: {totals['missing_expired']}\n"
+                f"🔗 ID aggiornati: {totals['backfilled']}\n"
+                f"⏳ In attesa di conferma: {totals['pending']}\n"
+                f"❌ Dispositivi non raggiungibili: {totals['failed_devices']}\n"
+                f"👤 Codici non gestiti (ignorati): {totals['unmanaged']}"
+            )
+
+    except Exception as e:
+        logger.error(f"❌ Reconciliation job failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+        try:
+            notification_service = get_notification_service()
+            await notification_service.notify_admin_error(
+                "Code Reconciliation Failed",
+                str(e)
+            )
+        except:
+            pass
+
+
+@instrumented_job()
+async def downsample_device_telemetry():
+    """
+    Hourly job that rolls device telemetry into hourly/daily buckets
+    and prunes samples past retention
+    """
+    try:
+        result = await asyncio.to_thread(get_device_telemetry_store().downsample)
+        record_counts(**result)
+    except Exception as e:
+        logger.error(f"❌ Telemetry downsampling failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+
+
+@instrumented_job()
+async def prune_job_history():
+    """
+    Daily job that deletes job_runs rows past JOB_RUNS_RETENTION_DAYS
+    """
+    try:
+        record_counts(runs_pruned=await asyncio.to_thread(prune_job_runs))
+    except Exception as e:
+        logger.error(f"❌ Job history prune failed: {e}", exc_info=True)
+        record_error(str(e), fatal=True)
+
 
 def init_scheduler():
     """
     Initialize and start the scheduler
+    Every job is wrapped with leader_only, so with several workers only the
+    elected leader actually runs them
     """
     global scheduler
 
@@ -169,40 +242,92 @@ def init_scheduler():
     # Booking sync jobs (at 12 AM and 6 PM)
     for hour in settings.BOOKING_SYNC_HOURS:
         scheduler.add_job(
-            sync_bookings_from_lodgify,
+            leader_only(sync_bookings_from_lodgify),
             trigger=CronTrigger(hour=hour, minute=0),
             id=f"sync_bookings_{hour:02d}00",
             name=f"Sync bookings from Lodgify at {hour:02d}:00",
             replace_existing=True
         )
 
-    # Code provisioning jobs (at 12 AM and 6 PM)
-    for hour in settings.CODE_PROVISIONING_HOURS:
-        scheduler.add_job(
-            provision_access_codes,
-            trigger=CronTrigger(hour=hour, minute=0),
-            id=f"provision_codes_{hour:02d}00",
-            name=f"Provision access codes at {hour:02d}:00",
-            replace_existing=True
-        )
-
-    # Daily auto-revoke job at 2 PM
+    # Daily auto-revoke safety net at 2 PM
     scheduler.add_job(
-        revoke_expired_codes,
+        leader_only(revoke_expired_codes),
         trigger=CronTrigger(hour=settings.AUTO_REVOKE_HOUR, minute=0),
         id="auto_revoke_codes",
         name="Auto-revoke expired codes",
         replace_existing=True
     )
 
+    # Booking lifecycle transitions
+    scheduler.add_job(
+        leader_only(apply_booking_lifecycle),
+        trigger=IntervalTrigger(minutes=settings.LIFECYCLE_INTERVAL_MINUTES),
+        id="booking_lifecycle",
+        name="Apply booking lifecycle transitions",
+        replace_existing=True
+    )
+
+    # Timer resync (safety net; the provisioning timer also polls for changes made on other workers)
+    scheduler.add_job(
+        leader_only(resync_timers),
+        trigger=IntervalTrigger(minutes=settings.SCHEDULER_TIMER_RESYNC_MINUTES),
+        id="resync_timers",
+        name="Resync provisioning and revocation timers",
+        replace_existing=True
+    )
+
+    # Webhook replay (events stored but never processed)
+    scheduler.add_job(
+        leader_only(replay_webhooks),
+        trigger=IntervalTrigger(minutes=settings.WEBHOOK_REPLAY_INTERVAL_MINUTES),
+        id="replay_webhooks",
+        name="Replay unprocessed webhook events",
+        replace_existing=True
+    )
+
+    # Daily device-vs-database reconciliation
+    scheduler.add_job(
+        leader_only(reconcile_devices),
+        trigger=CronTrigger(hour=settings.RECONCILIATION_HOUR, minute=0),
+        id="reconcile_devices",
+        name="Reconcile device codes with database",
+        replace_existing=True
+    )
+
+    # Hourly telemetry rollups (a few minutes past the hour so the last hour is complete)
+    scheduler.add_job(
+        leader_only(downsample_device_telemetry),
+        trigger=CronTrigger(minute=5),
+        id="downsample_device_telemetry",
+        name="Downsample device telemetry",
+        replace_existing=True
+    )
+
+    # Daily job_runs retention
+    scheduler.add_job(
+        leader_only(prune_job_history),
+        trigger=CronTrigger(hour=settings.JOB_RUNS_PRUNE_HOUR, minute=15),
+        id="prune_job_runs",
+        name="Prune job run history",
+        replace_existing=True
+    )
+
     scheduler.start()
     sync_times = ", ".join([f"{h:02d}:00" for h in settings.BOOKING_SYNC_HOURS])
-    provisioning_times = ", ".join([f"{h:02d}:00" for h in settings.CODE_PROVISIONING_HOURS])
-    total_jobs = 1 + len(settings.BOOKING_SYNC_HOURS) + len(settings.CODE_PROVISIONING_HOURS)
+    total_jobs = 7 + len(settings.BOOKING_SYNC_HOURS)
     logger.info(f"✅ Scheduler started with {total_jobs} jobs (timezone: {settings.SCHEDULER_TIMEZONE})")
     logger.info(f"   - Booking sync: daily at {sync_times}")
-    logger.info(f"   - Code provisioning: daily at {provisioning_times}")
-    logger.info(f"   - Auto-revoke: daily at {settings.AUTO_REVOKE_HOUR}:00")
+    logger.info(f"   - Code provisioning: event-driven timer, resync every {settings.SCHEDULER_TIMER_RESYNC_MINUTES} min")
+    logger.info(f"   - Auto-revoke: per-code timer, sweep daily at {settings.AUTO_REVOKE_HOUR}:00")
+    logger.info(f"   - Booking lifecycle: every {settings.LIFECYCLE_INTERVAL_MINUTES} min")
+    logger.info(f"   - Timer resync: every {settings.SCHEDULER_TIMER_RESYNC_MINUTES} min")
+    logger.info(f"   - Webhook replay: every {settings.WEBHOOK_REPLAY_INTERVAL_MINUTES} min")
+    logger.info(f"   - Code reconciliation: daily at {settings.RECONCILIATION_HOUR}:00")
+    logger.info("   - Telemetry downsampling: hourly at :05")
+    logger.info(
+        f"   - Job history prune: daily at {settings.JOB_RUNS_PRUNE_HOUR}:15 "
+        f"(keeps {settings.JOB_RUNS_RETENTION_DAYS} days)"
+    )
 
 
 def shutdown_scheduler():
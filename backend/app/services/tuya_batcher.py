@@ -0,0 +1,138 @@
+"""
+Per-device Tuya command batching
+Commands with different codes for the same device issued within a short
+window are sent as one multi-command request (cloud POST
+/v1.0/devices/{id}/commands or one local DP write) and the response is
+mapped back to each caller
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PendingCommand = Tuple[Dict, asyncio.Future]
+CommandSender = Callable[[str, List[Dict]], Awaitable[Dict]]
+
+
+class TuyaCommandBatcher:
+    """
+    Coalesces device commands into multi-command requests
+
+    The first command for a device opens a TUYA_COMMAND_BATCH_WINDOW_SECONDS
+    window; every command for that device queued before it closes goes out in
+    the same request (immediately once TUYA_COMMAND_BATCH_MAX are waiting).
+    Only commands with different codes share a request (e.g. the delete and
+    create of a turnover): a command whose code is already waiting sends the
+    pending batch right away and starts a new one, since commands with one
+    code would share a single result (and a DP holds one value per write).
+    Tuya accepts or rejects a commands request as a whole, so a rejected
+    batch is resent one command per request to find out which one failed.
+    """
+
+    def __init__(self, send: CommandSender):
+        """
+        Initialize command batcher
+
+        Args:
+            send: Coroutine function (device_id, commands) -> response envelope
+        """
+        self.send_commands = send
+        self._pending: Dict[str, List[PendingCommand]] = {}
+        self._windows: Dict[str, asyncio.Task] = {}
+        # Batches sent early (full, or a repeated code); kept so they aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def send(self, device_id: str, command: Dict) -> Dict:
+        """
+        Queue a command and wait for the response of the request carrying it
+
+        Args:
+            device_id: Tuya device ID
+            command: {"code": ..., "value": ...}
+
+        Returns:
+            Response envelope for this command ({"success", "result", ...})
+
+        Raises:
+            TuyaAPIError / httpx.HTTPError if the request failed
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(device_id, [])
+        if any(queued["code"] == command["code"] for queued, _ in pending):
+            self._send_now(device_id, self._pending.pop(device_id))
+        pending = self._pending.setdefault(device_id, [])
+        pending.append((command, future))
+
+        if len(pending) >= settings.TUYA_COMMAND_BATCH_MAX:
+            self._send_now(device_id, self._pending.pop(device_id))
+        elif device_id not in self._windows:
+            self._windows[device_id] = asyncio.create_task(self._close_window(device_id))
+
+        return await future
+
+    def _send_now(self, device_id: str, batch: List[PendingCommand]) -> None:
+        """
+        Send a batch without waiting for its window to close
+        """
+        task = asyncio.create_task(self._execute(device_id, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _close_window(self, device_id: str) -> None:
+        """
+        Send whatever is pending for a device once its window elapses
+        """
+        try:
+            await asyncio.sleep(settings.TUYA_COMMAND_BATCH_WINDOW_SECONDS)
+        finally:
+            self._windows.pop(device_id, None)
+        batch = self._pending.pop(device_id, None)
+        if batch:
+            await self._execute(device_id, batch)
+
+    async def _execute(self, device_id: str, batch: List[PendingCommand]) -> None:
+        """
+        Send one commands request and resolve every caller's future
+        """
+        try:
+            result = await self.send_commands(device_id, [command for command, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if len(batch) > 1:
+            if not result.get("success"):
+                logger.warning(
+                    f"⚠️ Tuya rejected a batch of {len(batch)} commands for {device_id} "
+                    f"({result.get('msg')}), resending individually"
+                )
+                await asyncio.gather(*[self._execute(device_id, [item]) for item in batch])
+                return
+            logger.info(f"📦 Sent {len(batch)} commands to {device_id} in one request")
+
+        # Per-command results when the API returns a list, the shared envelope otherwise
+        results: Optional[List] = result.get("result") if isinstance(result.get("result"), list) else None
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if results is not None and len(results) == len(batch):
+                future.set_result({**result, "result": results[i]})
+            else:
+                future.set_result(result)
+
+    async def flush(self) -> None:
+        """
+        Send everything still pending (called on shutdown)
+        """
+        for task in list(self._windows.values()):
+            task.cancel()
+        self._windows.clear()
+        pending, self._pending = self._pending, {}
+        await asyncio.gather(
+            *[self._execute(device_id, batch) for device_id, batch in pending.items()],
+            *list(self._tasks)
+        )
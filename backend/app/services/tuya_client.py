@@ -0,0 +1,204 @@
+"""
+Async Tuya OpenAPI client
+Signed requests over a pooled HTTP connection with a cached access token
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from app.core.config import settings
+from app.core.resilience import vendor_guard
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# TUYA_REGION -> OpenAPI endpoint (same region codes as tinytuya)
+TUYA_ENDPOINTS = {
+    "cn": "https://openapi.tuyacn.com",
+    "us": "https://openapi.tuyaus.com",
+    "us-e": "https://openapi-ueaz.tuyaus.com",
+    "eu": "https://openapi.tuyaeu.com",
+    "eu-w": "https://openapi-weaz.tuyaeu.com",
+    "in": "https://openapi.tuyain.com",
+}
+
+# Error codes meaning the access token must be fetched again
+TOKEN_INVALID_CODES = {1010, 1011}
+
+
+class TuyaAPIError(Exception):
+    """
+    Tuya OpenAPI request failed (HTTP error or success=false)
+    """
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class TuyaOpenAPIClient:
+    """
+    Tuya OpenAPI client (HMAC-SHA256 request signing)
+
+    The access token is cached and refreshed TUYA_TOKEN_REFRESH_MARGIN_SECONDS
+    before it expires; concurrent callers share one refresh. A token rejected
+    by the API is dropped and the request retried once with a new token.
+    """
+
+    def __init__(self, client_id: str, secret: str, region: Optional[str] = None):
+        """
+        Initialize Tuya OpenAPI client (the HTTP client is created lazily)
+
+        Args:
+            client_id: Tuya cloud project Access ID
+            secret: Tuya cloud project Access Secret
+            region: TUYA_REGION code (cn, us, us-e, eu, eu-w, in)
+        """
+        self.client_id = client_id
+        self.secret = secret
+        self.base_url = TUYA_ENDPOINTS.get((region or "eu").lower(), TUYA_ENDPOINTS["eu"])
+        self._client: Optional[httpx.AsyncClient] = None
+        self._access_token: Optional[str] = None
+        self._refresh_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        logger.info(f"✅ Tuya OpenAPI client initialized ({self.base_url})")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.TUYA_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=settings.TUYA_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TUYA_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    def _sign(self, method: str, path: str, params: Optional[Dict], body: str, access_token: str) -> Dict[str, str]:
+        """
+        Build signed headers for a request
+
+        sign = HMAC-SHA256(secret, client_id + access_token + t + nonce + stringToSign)
+        stringToSign = METHOD \n SHA256(body) \n (no signed headers) \n url
+        """
+        t = str(int(time.time() * 1000))
+        nonce = uuid.uuid4().hex
+        url = path
+        if params:
+            url = f"{path}?{urlencode(sorted(params.items()))}"
+
+        string_to_sign = "\n".join([
+            method.upper(),
+            hashlib.sha256(body.encode()).hexdigest(),
+            "",
+            url
+        ])
+        message = self.client_id + access_token + t + nonce + string_to_sign
+        sign = hmac.new(self.secret.encode(), message.encode(), hashlib.sha256).hexdigest().upper()
+
+        headers = {
+            "client_id": self.client_id,
+            "sign": sign,
+            "sign_method": "HMAC-SHA256",
+            "t": t,
+            "nonce": nonce
+        }
+        if access_token:
+            headers["access_token"] = access_token
+        return headers
+
+    async def _send(self, method: str, path: str, params: Optional[Dict], body: Optional[Dict], access_token: str) -> Dict:
+        """
+        Send one signed request and decode the response envelope
+        """
+        body_str = json.dumps(body, separators=(",", ":")) if body is not None else ""
+        headers = self._sign(method, path, params, body_str, access_token)
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+
+        response = await self._get_client().request(
+            method,
+            path,
+            params=sorted(params.items()) if params else None,
+            content=body_str if body is not None else None,
+            headers=headers
+        )
+        if response.status_code != 200:
+            raise TuyaAPIError(f"Tuya HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def _get_token(self) -> str:
+        """
+        Cached access token, fetched or refreshed ahead of expiry
+        """
+        if self._access_token and time.monotonic() < self._token_expires_at:
+            return self._access_token
+
+        async with self._token_lock:
+            # Another caller may have refreshed while we waited
+            if self._access_token and time.monotonic() < self._token_expires_at:
+                return self._access_token
+
+            result = None
+            if self._refresh_token:
+                result = await self._send("GET", f"/v1.0/token/{self._refresh_token}", None, None, "")
+                if not result.get("success"):
+                    logger.warning(f"⚠️ Tuya token refresh failed, requesting a new token: {result.get('msg')}")
+                    result = None
+            if result is None:
+                result = await self._send("GET", "/v1.0/token", {"grant_type": 1}, None, "")
+
+            if not result.get("success"):
+                raise TuyaAPIError(f"Tuya token request failed: {result.get('msg')}", result.get("code"))
+
+            token = result["result"]
+            self._access_token = token["access_token"]
+            self._refresh_token = token.get("refresh_token")
+            self._token_expires_at = (
+                time.monotonic() + int(token.get("expire_time", 7200)) - settings.TUYA_TOKEN_REFRESH_MARGIN_SECONDS
+            )
+            logger.info("🔑 Tuya access token refreshed")
+            return self._access_token
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None, body: Optional[Dict] = None) -> Dict:
+        """
+        Call a Tuya OpenAPI endpoint
+
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/v1.0/devices/{id}/commands")
+            params: Query parameters
+            body: JSON body
+
+        Returns:
+            Response envelope ({"success", "result", "code", "msg", ...})
+
+        Raises:
+            TuyaAPIError / httpx.HTTPError on transport or HTTP failures
+            CircuitOpenError / BulkheadFullError / TimeoutError from the "tuya" guard
+        """
+        async with vendor_guard("tuya").call():
+            result = await self._send(method, path, params, body, await self._get_token())
+
+            if not result.get("success") and result.get("code") in TOKEN_INVALID_CODES:
+                self._access_token = None
+                self._token_expires_at = 0.0
+                result = await self._send(method, path, params, body, await self._get_token())
+
+        return result
+
+    async def close(self) -> None:
+        """
+        Close pooled connections
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("🛑 Tuya OpenAPI client closed")
+        self._client = None
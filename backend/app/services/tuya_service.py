@@ -4,47 +4,93 @@ Tuya Smart Lock integration service
 from datetime import datetime
 from typing import List, Dict, Optional
 from app.core.config import settings
+from app.services.job_metrics import timed_dependency
+from app.services.tuya_client import TuyaOpenAPIClient
+from app.services.tuya_batcher import TuyaCommandBatcher
+from app.services.tuya_local import TuyaLocalTransport, TuyaLocalError, TUYA_LOCAL_AVAILABLE
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Try to import Tuya library - gracefully handle if not available
-try:
-    import tinytuya
-    TUYA_AVAILABLE = True
-    logger.info("✅ TinyTuya library loaded")
-except ImportError:
-    TUYA_AVAILABLE = False
-    logger.warning("⚠️ TinyTuya not available - Tuya features will be mocked")
-
 
 class TuyaLockService:
     """
     Service for interacting with Tuya Cloud API to manage smart locks
+    All calls are async (TuyaOpenAPIClient) and never block the event loop;
+    password creates/deletes go through a per-device command batcher.
+    Devices listed in TUYA_LOCAL_DEVICES are controlled over the LAN first,
+    falling back to the cloud when the local request fails.
     """
 
     def __init__(self):
         """
-        Initialize Tuya Cloud API client
+        Initialize Tuya Cloud API client and local transport
         """
-        if not TUYA_AVAILABLE:
-            logger.warning("⚠️ Tuya service running in MOCK mode")
-            self.cloud = None
-            return
+        self.local = None
+        if settings.TUYA_LOCAL_DEVICES:
+            if TUYA_LOCAL_AVAILABLE:
+                self.local = TuyaLocalTransport(settings.TUYA_LOCAL_DEVICES)
+            else:
+                logger.warning("⚠️ TUYA_LOCAL_DEVICES set but TinyTuya is not installed - using the cloud only")
 
-        try:
-            # Initialize TinyTuya Cloud
-            self.cloud = tinytuya.Cloud(
-                apiRegion=settings.TUYA_REGION,
-                apiKey=settings.TUYA_CLIENT_ID,
-                apiSecret=settings.TUYA_SECRET
+        if settings.TUYA_CLIENT_ID and settings.TUYA_SECRET:
+            self.cloud = TuyaOpenAPIClient(
+                client_id=settings.TUYA_CLIENT_ID,
+                secret=settings.TUYA_SECRET,
+                region=settings.TUYA_REGION
             )
-            logger.info("✅ Tuya Cloud API initialized")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Tuya: {e}")
+        elif self.local:
+            logger.warning("⚠️ Tuya credentials not configured - only locally configured devices are reachable")
+            self.cloud = None
+        else:
+            logger.warning("⚠️ Tuya credentials not configured - Tuya service running in MOCK mode")
             self.cloud = None
 
-    def create_temporary_password(
+        self.batcher = TuyaCommandBatcher(self._send_commands) if self.cloud or self.local else None
+
+    async def _send_commands(self, device_id: str, commands: List[Dict]) -> Dict:
+        """
+        Send a batch of commands over the LAN when possible, else through the cloud
+
+        Args:
+            device_id: Tuya device ID
+            commands: [{"code": ..., "value": ...}]
+
+        Returns:
+            Response envelope ({"success", "result", ...})
+        """
+        if self.local and self.local.can_handle(device_id, [command["code"] for command in commands]):
+            try:
+                return await self.local.send_commands(device_id, commands)
+            except TuyaLocalError as e:
+                if not self.cloud:
+                    logger.error(f"❌ Local Tuya request failed for {device_id}: {e}")
+                    return {"success": False, "msg": f"Local request failed: {e}"}
+                logger.warning(f"⚠️ Local Tuya request failed for {device_id} ({e}), falling back to cloud")
+
+        if not self.cloud:
+            return {"success": False, "msg": f"Device {device_id} is not reachable locally and cloud is not configured"}
+
+        return await self.cloud.request(
+            "POST",
+            f"/v1.0/devices/{device_id}/commands",
+            body={"commands": commands}
+        )
+
+    async def _get_local_info(self, device_id: str) -> Optional[Dict]:
+        """
+        Device details read over the LAN, or None when the cloud should be asked
+        """
+        if not self.local or not self.local.can_handle(device_id):
+            return None
+        try:
+            return await self.local.get_device_info(device_id)
+        except TuyaLocalError as e:
+            logger.warning(f"⚠️ Local Tuya status failed for {device_id} ({e}), falling back to cloud")
+            return None
+
+    @timed_dependency("tuya")
+    async def create_temporary_password(
         self,
         device_id: str,
         password: str,
@@ -65,37 +111,38 @@ class TuyaLockService:
         Returns:
             Tuya password ID if successful, None otherwise
         """
-        if not TUYA_AVAILABLE or not self.cloud:
+        if not self.batcher:
             logger.warning(f"⚠️ MOCK: Would create password '{password}' for {name}")
             return f"mock_password_{password}"
 
         try:
-            # Convert to timestamps (seconds for TinyTuya)
+            # Convert to timestamps (seconds)
             start_time = int(valid_from.timestamp())
             end_time = int(valid_until.timestamp())
 
             # Call Tuya Cloud API
             # Note: The exact API endpoint may vary - this is a placeholder
             # You'll need to configure this with real Tuya credentials
-            result = self.cloud.sendcommand(
-                device_id,
-                {
-                    "commands": [{
-                        "code": "temporary_password",
-                        "value": {
-                            "password": password,
-                            "effective_time": start_time,
-                            "invalid_time": end_time,
-                            "name": name
-                        }
-                    }]
+            result = await self.batcher.send(device_id, {
+                "code": "temporary_password",
+                "value": {
+                    "password": password,
+                    "effective_time": start_time,
+                    "invalid_time": end_time,
+                    "name": name
                 }
-            )
+            })
 
             if result and result.get("success"):
-                password_id = result.get("result", {}).get("id", f"pwd_{password}")
+                payload = result.get("result")
+                password_id = payload.get("id") if isinstance(payload, dict) else None
+                if not password_id:
+                    # Never store a PIN-derived placeholder: it can't be revoked.
+                    # Reconciliation backfills the real ID by name and validity.
+                    logger.error(f"❌ Tuya accepted the password for device {device_id} but returned no ID: {result}")
+                    return None
                 logger.info(f"✅ Created temporary password on device {device_id}")
-                return password_id
+                return str(password_id)
             else:
                 logger.error(f"❌ Failed to create password: {result}")
                 return None
@@ -104,7 +151,8 @@ class TuyaLockService:
             logger.error(f"❌ Tuya API error: {e}", exc_info=True)
             return None
 
-    def delete_temporary_password(self, device_id: str, password_id: str) -> bool:
+    @timed_dependency("tuya")
+    async def delete_temporary_password(self, device_id: str, password_id: str) -> bool:
         """
         Delete a temporary password from Tuya lock
 
@@ -115,21 +163,16 @@ class TuyaLockService:
         Returns:
             True if successful
         """
-        if not TUYA_AVAILABLE or not self.cloud:
+        if not self.batcher:
             logger.warning(f"⚠️ MOCK: Would delete password {password_id}")
             return True
 
         try:
             # Call Tuya Cloud API to delete password
-            result = self.cloud.sendcommand(
-                device_id,
-                {
-                    "commands": [{
-                        "code": "delete_temporary_password",
-                        "value": {"id": password_id}
-                    }]
-                }
-            )
+            result = await self.batcher.send(device_id, {
+                "code": "delete_temporary_password",
+                "value": {"id": password_id}
+            })
 
             if result and result.get("success"):
                 logger.info(f"✅ Deleted password {password_id} from device {device_id}")
@@ -142,7 +185,8 @@ class TuyaLockService:
             logger.error(f"❌ Tuya API error: {e}", exc_info=True)
             return False
 
-    def get_device_status(self, device_id: str) -> Optional[Dict]:
+    @timed_dependency("tuya")
+    async def get_device_status(self, device_id: str) -> Optional[Dict]:
         """
         Get lock device status
 
@@ -152,12 +196,18 @@ class TuyaLockService:
         Returns:
             Device status dict or None
         """
-        if not TUYA_AVAILABLE or not self.cloud:
+        if not self.cloud and not self.local:
             logger.warning(f"⚠️ MOCK: Would get status for device {device_id}")
             return {"online": True, "status": "mock"}
 
+        info = await self._get_local_info(device_id)
+        if info is not None:
+            return info["status"]
+        if not self.cloud:
+            return None
+
         try:
-            result = self.cloud.getstatus(device_id)
+            result = await self.cloud.request("GET", f"/v1.0/devices/{device_id}/status")
 
             if result and result.get("success"):
                 return result.get("result")
@@ -169,7 +219,49 @@ class TuyaLockService:
             logger.error(f"❌ Tuya API error: {e}", exc_info=True)
             return None
 
-    def list_temporary_passwords(self, device_id: str) -> List[Dict]:
+    @timed_dependency("tuya")
+    async def get_device_info(self, device_id: str) -> Optional[Dict]:
+        """
+        Get lock device details (online flag plus the latest data points)
+
+        Args:
+            device_id: Tuya device ID
+
+        Returns:
+            Device dict ({"online", "status": [{"code", "value"}], ...}) or None
+        """
+        if not self.cloud and not self.local:
+            logger.warning(f"⚠️ MOCK: Would get details for device {device_id}")
+            return {"online": True, "status": []}
+
+        info = await self._get_local_info(device_id)
+        if info is not None:
+            return info
+        if not self.cloud:
+            return None
+
+        try:
+            result = await self.cloud.request("GET", f"/v1.0/devices/{device_id}")
+
+            if result and result.get("success"):
+                return result.get("result")
+            else:
+                logger.error(f"❌ Failed to get device details: {result}")
+                return None
+
+        except Exception as e:
+            logger.error(f"❌ Tuya API error: {e}", exc_info=True)
+            return None
+
+    @property
+    def is_configured(self) -> bool:
+        """
+        True when talking to real devices, via the cloud or the LAN (not mock mode)
+        """
+        return self.cloud is not None or self.local is not None
+
+    @timed_dependency("tuya")
+    async def list_temporary_passwords(self, device_id: str) -> Optional[List[Dict]]:
         """
         List all temporary passwords for a device
 
@@ -177,21 +269,43 @@ class TuyaLockService:
             device_id: Tuya device ID
 
         Returns:
-            List of password dictionaries
+            List of password dicts (id, name, effective_time, invalid_time, phase),
+            or None if the device could not be queried
         """
-        if not TUYA_AVAILABLE or not self.cloud:
+        if not self.cloud:
+            if self.local:
+                # Password listing is a cloud API; the lock doesn't expose it as a DP
+                logger.warning(f"⚠️ Cannot list passwords for {device_id} without Tuya cloud credentials")
+                return None
             logger.warning(f"⚠️ MOCK: Would list passwords for device {device_id}")
             return []
 
         try:
-            # This endpoint might not be directly available in TinyTuya
-            # May need to use raw API calls
-            logger.warning("⚠️ list_temporary_passwords not yet implemented for TinyTuya")
-            return []
+            result = await self.cloud.request("GET", f"/v1.0/devices/{device_id}/door-lock/temp-passwords")
+
+            if not result or not result.get("success"):
+                logger.error(f"❌ Failed to list passwords: {result}")
+                return None
+
+            passwords = []
+            for item in result.get("result") or []:
+                # Phase 0 = deleted, no longer occupies a slot
+                if str(item.get("phase")) == "0":
+                    continue
+                passwords.append({
+                    "id": str(item.get("id")),
+                    "name": item.get("name"),
+                    "effective_time": item.get("effective_time"),
+                    "invalid_time": item.get("invalid_time"),
+                    "phase": item.get("phase")
+                })
+
+            logger.info(f"✅ Retrieved {len(passwords)} passwords from device {device_id}")
+            return passwords
 
         except Exception as e:
             logger.error(f"❌ Tuya API error: {e}", exc_info=True)
-            return []
+            return None
 
 
 # Global instance
@@ -206,3 +320,15 @@ def get_tuya_service() -> TuyaLockService:
     if _tuya_service is None:
         _tuya_service = TuyaLockService()
     return _tuya_service
+
+
+async def close_tuya_service():
+    """
+    Send pending batched commands and close the Tuya client's pooled connections on shutdown
+    """
+    if _tuya_service is None:
+        return
+    if _tuya_service.batcher is not None:
+        await _tuya_service.batcher.flush()
+    if _tuya_service.cloud is not None:
+        await _tuya_service.cloud.close()
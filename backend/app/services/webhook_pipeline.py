@@ -0,0 +1,541 @@
+"""
+Webhook ingestion pipeline
+Booking webhooks are persisted to webhook_events, acknowledged and
+processed in the background: upsert the booking, then provision,
+re-provision or revoke codes for that booking only
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.booking_sync_service import get_booking_sync_service, with_content_hash
+from app.services.job_metrics import track_dependency
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_HOSPITABLE = "hospitable"
+PROVIDER_LODGIFY = "lodgify"
+
+# Event actions
+ACTION_UPSERT = "upsert"
+ACTION_CANCEL = "cancel"
+ACTION_IGNORE = "ignore"
+
+HOSPITABLE_STATUS_MAP = {
+    "accepted": "confirmed",
+    "confirmed": "confirmed",
+    "checked_in": "checked_in",
+    "checked_out": "checked_out",
+    "cancelled": "cancelled",
+    "canceled": "cancelled",
+    "declined": "cancelled",
+    "expired": "cancelled"
+}
+
+
+def event_type_of(payload: Dict) -> str:
+    """
+    Event type of a webhook payload (Hospitable: action/event_type, Lodgify: action)
+    """
+    return str(payload.get("action") or payload.get("event_type") or payload.get("type") or "unknown")
+
+
+def reservation_of(payload: Dict) -> Optional[Dict]:
+    """
+    Reservation object of a webhook payload (Hospitable: data/reservation, Lodgify: booking/data)
+    """
+    reservation = payload.get("data") or payload.get("reservation") or payload.get("booking")
+    return reservation if isinstance(reservation, dict) else None
+
+
+def event_id_of(payload: Dict, delivery_id: Optional[str] = None) -> str:
+    """
+    Dedupe key of a webhook event
+
+    An explicit event or delivery ID is used as is. Otherwise the key is
+    built from the reservation ID, the event type and the reservation's
+    updated_at (or a hash of its content), so a retried delivery repeats
+    the key while every later change to the reservation gets a new one.
+    The payload's "id" is never used on its own: some providers put the
+    reservation ID there.
+
+    Args:
+        payload: Raw webhook payload
+        delivery_id: Provider delivery ID from the request headers, if any
+
+    Returns:
+        Event key
+    """
+    explicit = delivery_id or payload.get("event_id")
+    if explicit:
+        return str(explicit)
+
+    reservation = reservation_of(payload) or {}
+    version = reservation.get("updated_at") or hashlib.sha256(
+        json.dumps(reservation or payload, sort_keys=True, default=str).encode()
+    ).hexdigest()[:32]
+    return f"{reservation.get('id', '')}:{event_type_of(payload)}:{version}"
+
+
+def map_hospitable_reservation(reservation: Dict) -> Dict:
+    """
+    Map a Hospitable reservation to a bookings row
+
+    Args:
+        reservation: Reservation object from the webhook "data" field
+
+    Returns:
+        bookings row with content hash
+    """
+    guest = reservation.get("guest") or {}
+    name = guest.get("name") or " ".join(
+        part for part in (guest.get("first_name"), guest.get("last_name")) if part
+    )
+    phones = guest.get("phone_numbers") or []
+    guests = reservation.get("guests") or {}
+    language = (guest.get("language") or "en")[:2].lower()
+
+    return with_content_hash({
+        "hospitable_id": str(reservation.get("id")),
+        "confirmation_code": reservation.get("code") or reservation.get("confirmation_code"),
+        "guest_name": name or "Guest",
+        "guest_email": guest.get("email") or "",
+        "guest_phone": guest.get("phone") or (phones[0] if phones else ""),
+        "guest_language": language if language in ("it", "en") else "en",
+        "property_id": settings.DEFAULT_PROPERTY_ID,
+        "checkin_date": reservation.get("arrival_date") or reservation.get("check_in"),
+        "checkout_date": reservation.get("departure_date") or reservation.get("check_out"),
+        "num_guests": (guests.get("total") if isinstance(guests, dict) else None) or 1,
+        "status": HOSPITABLE_STATUS_MAP.get(str(reservation.get("status", "")).lower(), "confirmed")
+    })
+
+
+def classify_event(provider: str, payload: Dict) -> Tuple[str, Optional[Dict]]:
+    """
+    Decide what a webhook means for our bookings table
+
+    Args:
+        provider: 'hospitable' or 'lodgify'
+        payload: Raw webhook payload
+
+    Returns:
+        (action, mapped bookings row or None)
+    """
+    event_type = event_type_of(payload).lower()
+
+    if provider == PROVIDER_HOSPITABLE:
+        if not event_type.startswith("reservation"):
+            return ACTION_IGNORE, None
+        reservation = reservation_of(payload)
+        if not reservation:
+            return ACTION_IGNORE, None
+        row = map_hospitable_reservation(reservation)
+    else:
+        if not event_type.startswith("booking"):
+            return ACTION_IGNORE, None
+        reservation = payload.get("booking") or payload.get("data")
+        if not reservation:
+            return ACTION_IGNORE, None
+        booking_sync_service = get_booking_sync_service()
+        row = booking_sync_service.map_lodgify_booking({
+            **reservation,
+            "arrival": reservation.get("arrival") or reservation.get("date_arrival"),
+            "departure": reservation.get("departure") or reservation.get("date_departure"),
+            "status": reservation.get("status") or ""
+        }, booking_sync_service.property_for_lodgify_id(reservation.get("property_id")))
+
+    if row["status"] == "cancelled" or "cancel" in event_type or "declined" in event_type:
+        # Re-hash after the override so the stored hash matches the stored row
+        return ACTION_CANCEL, with_content_hash({**row, "status": "cancelled"})
+    return ACTION_UPSERT, row
+
+
+class RecentEventIds:
+    """
+    Bounded set of recently seen event keys with a TTL
+
+    Every key lives for the same TTL, so insertion order is also expiry
+    order and eviction only ever looks at the oldest entries.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self._ttl = ttl_seconds
+        self._max_size = max_size
+        self._expires: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        self._expire()
+        return key in self._expires
+
+    def add(self, key: Tuple[str, str]) -> bool:
+        """
+        Record a key
+
+        Returns:
+            False if the key was already seen within the TTL
+        """
+        now = self._expire()
+        if key in self._expires:
+            return False
+
+        self._expires[key] = now + self._ttl
+        if len(self._expires) > self._max_size:
+            self._expires.popitem(last=False)
+        return True
+
+    def _expire(self) -> float:
+        now = time.monotonic()
+        while self._expires:
+            oldest_key, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            del self._expires[oldest_key]
+        return now
+
+
+class WebhookPipeline:
+    """
+    In-memory queue of stored webhook events drained by a background collector
+
+    Every event is inserted into webhook_events (status 'pending') before it
+    is acknowledged; the collector gathers queued events into a micro-batch
+    keyed by reservation. Every WEBHOOK_BATCH_WINDOW_SECONDS the batch is flushed:
+    the last event per reservation wins, all reservations are written with
+    one upsert_bookings() call, codes are provisioned or revoked per changed
+    booking, and event outcomes are recorded with one call per status.
+
+    Duplicates (provider retries, n8n replays) are dropped by the unique
+    (provider, event_id) constraint at insert; a TTL set of event IDs already
+    stored by this process skips the insert for repeated retries. Events left
+    pending by a restart or a full queue, and failed events, are replayed by
+    the leader every WEBHOOK_REPLAY_INTERVAL_MINUTES.
+    """
+
+    def __init__(self):
+        """
+        Initialize webhook pipeline
+        """
+        self.supabase = get_supabase()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WEBHOOK_QUEUE_SIZE)
+        self._seen = RecentEventIds(settings.WEBHOOK_DEDUPE_TTL_SECONDS, settings.WEBHOOK_DEDUPE_MAX_SIZE)
+        self._tasks: List[asyncio.Task] = []
+        # Database IDs of events queued in this process and not yet completed
+        self._queued: Set[str] = set()
+        # (provider, hospitable_id) -> {"row": mapped booking, "event_ids": [...]}
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self._ignored: List[str] = []
+        self._unmappable: List[str] = []
+        self._has_pending = asyncio.Event()
+        logger.info("✅ Webhook pipeline initialized")
+
+    async def accept(self, provider: str, payload: Dict, delivery_id: Optional[str] = None) -> str:
+        """
+        Store a webhook and queue it for background processing
+
+        The event is inserted into webhook_events before the caller
+        acknowledges it; the unique (provider, event_id) constraint drops
+        retries of stored events. Insert errors propagate so the provider
+        retries.
+
+        Args:
+            provider: 'hospitable' or 'lodgify'
+            payload: Raw webhook payload
+            delivery_id: Provider delivery ID header, if sent
+
+        Returns:
+            'queued', 'duplicate', or 'stored' (queue full, picked up by the leader's replay)
+        """
+        event = {
+            "provider": provider,
+            "event_id": event_id_of(payload, delivery_id),
+            "event_type": event_type_of(payload),
+            "payload": payload
+        }
+        key = (provider, event["event_id"])
+        if event["event_id"] and key in self._seen:
+            return "duplicate"
+
+        stored = await asyncio.to_thread(self.persist, event)
+        if event["event_id"]:
+            self._seen.add(key)
+        if stored is None:
+            return "duplicate"
+
+        try:
+            self._queue.put_nowait(stored)
+        except asyncio.QueueFull:
+            return "stored"
+        self._queued.add(stored["id"])
+        return "queued"
+
+    def persist(self, event: Dict) -> Optional[Dict]:
+        """
+        Insert an event into webhook_events
+
+        Args:
+            event: Dict with provider, event_id, event_type, payload
+
+        Returns:
+            Event with its database id, or None if the event ID was already stored
+        """
+        with track_dependency("db"):
+            result = self.supabase.table("webhook_events").upsert({
+                "provider": event["provider"],
+                "event_id": event.get("event_id"),
+                "event_type": event.get("event_type"),
+                "payload": event["payload"],
+                "status": "pending"
+            }, on_conflict="provider,event_id", ignore_duplicates=True).execute()
+
+        if not result.data:
+            return None
+        return {**event, "id": result.data[0]["id"], "attempts": 0}
+
+    async def start(self) -> None:
+        """
+        Start the collector and the batch flusher
+        """
+        if self._tasks:
+            return
+        # One collector is enough: it only moves events into the batch, the flusher does the work
+        self._tasks = [
+            asyncio.create_task(self._collector(), name="Webhook collector"),
+            asyncio.create_task(self._flusher(), name="Webhook batch flusher")
+        ]
+        logger.info("✅ Webhook pipeline started")
+
+    async def stop(self) -> None:
+        """
+        Stop the collector and the batch flusher
+        Queued and collected events are left in webhook_events for replay
+        """
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+        # Queued events are already stored as pending; the leader replays them
+        left = self._queue.qsize() + sum(len(entry["event_ids"]) for entry in self._pending.values())
+        logger.info(f"🛑 Webhook pipeline stopped ({left} unprocessed events left for replay)")
+
+    async def replay_unprocessed(self) -> int:
+        """
+        Re-queue pending/failed events from webhook_events (leader, on election and periodically)
+
+        Events younger than WEBHOOK_REPLAY_MIN_AGE_SECONDS are skipped: they
+        are most likely still queued in the worker that received them.
+
+        Returns:
+            Number of events re-queued
+        """
+        received_before = datetime.now(timezone.utc) - timedelta(seconds=settings.WEBHOOK_REPLAY_MIN_AGE_SECONDS)
+        try:
+            with track_dependency("db"):
+                result = await asyncio.to_thread(
+                    self.supabase.table("webhook_events")
+                    .select("id, provider, event_id, event_type, payload, attempts")
+                    .in_("status", ["pending", "failed"])
+                    .lt("attempts", settings.WEBHOOK_MAX_ATTEMPTS)
+                    .lt("received_at", received_before.isoformat())
+                    .order("received_at")
+                    .limit(settings.WEBHOOK_QUEUE_SIZE)
+                    .execute
+                )
+        except Exception as e:
+            logger.error(f"❌ Failed to load unprocessed webhook events: {e}", exc_info=True)
+            return 0
+
+        events = [event for event in result.data or [] if event["id"] not in self._queued]
+        for event in events:
+            if event.get("event_id"):
+                self._seen.add((event["provider"], event["event_id"]))
+            self._queued.add(event["id"])
+            await self._queue.put(event)
+
+        if events:
+            logger.info(f"🔁 Replaying {len(events)} unprocessed webhook events")
+        return len(events)
+
+    async def _collector(self) -> None:
+        """
+        Drain the queue into the current batch
+        """
+        while True:
+            event = await self._queue.get()
+            try:
+                self._collect(event)
+            except Exception as e:
+                logger.error(f"❌ Webhook pipeline error: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _collect(self, event: Dict) -> None:
+        """
+        Add a persisted event to the batch; later events for a reservation replace earlier ones
+        """
+        try:
+            action, row = classify_event(event["provider"], event["payload"])
+        except Exception as e:
+            logger.error(f"❌ Failed to map webhook event {event['id']}: {e}")
+            self._unmappable.append(event["id"])
+        else:
+            if action == ACTION_IGNORE:
+                self._ignored.append(event["id"])
+            else:
+                key = (event["provider"], row["hospitable_id"])
+                entry = self._pending.setdefault(key, {"row": row, "event_ids": []})
+                entry["row"] = row
+                entry["event_ids"].append(event["id"])
+        self._has_pending.set()
+
+    async def _flusher(self) -> None:
+        """
+        Flush the batch WEBHOOK_BATCH_WINDOW_SECONDS after its first event
+        """
+        while True:
+            await self._has_pending.wait()
+            await asyncio.sleep(settings.WEBHOOK_BATCH_WINDOW_SECONDS)
+
+            pending, self._pending = self._pending, {}
+            ignored, self._ignored = self._ignored, []
+            unmappable, self._unmappable = self._unmappable, []
+            self._has_pending.clear()
+
+            try:
+                await self._complete([{"id": event_id} for event_id in unmappable], "failed", "Unmappable payload")
+                await self._flush(pending, ignored)
+            except Exception as e:
+                logger.error(f"❌ Webhook batch flush failed: {e}", exc_info=True)
+
+    async def _flush(self, pending: Dict[Tuple[str, str], Dict], ignored: List[str]) -> None:
+        """
+        Apply one micro-batch: one bookings read, one bulk upsert, per-booking code actions
+        """
+        if ignored:
+            await self._complete([{"id": event_id} for event_id in ignored], "ignored")
+        if not pending:
+            return
+
+        booking_sync_service = get_booking_sync_service()
+        rows = [entry["row"] for entry in pending.values()]
+        hospitable_ids = [row["hospitable_id"] for row in rows]
+
+        try:
+            with track_dependency("db"):
+                previous_result = await asyncio.to_thread(
+                    self.supabase.table("bookings").select("*").in_("hospitable_id", hospitable_ids).execute
+                )
+            written, _ = await asyncio.to_thread(booking_sync_service.upsert_bookings, rows)
+        except Exception as e:
+            logger.error(f"❌ Webhook batch write failed: {e}", exc_info=True)
+            await self._complete(
+                [{"id": event_id} for entry in pending.values() for event_id in entry["event_ids"]],
+                "failed",
+                str(e)[:1000]
+            )
+            return
+
+        previous = {row["hospitable_id"]: row for row in previous_result.data or []}
+        written_by_id = {row["hospitable_id"]: row for _, row in written}
+
+        processed: List[Dict] = []
+        failed: List[Dict] = []
+        actions: Dict[str, int] = {}
+
+        for (provider, hospitable_id), entry in pending.items():
+            previous_row = previous.get(hospitable_id)
+            booking = written_by_id.get(hospitable_id)
+
+            if booking is None:
+                if previous_row and previous_row.get("content_hash") == entry["row"]["content_hash"]:
+                    # Content unchanged - nothing to provision or revoke
+                    outcome = {"action": "unchanged"}
+                    booking = previous_row
+                else:
+                    failed.extend({"id": event_id} for event_id in entry["event_ids"])
+                    continue
+            else:
+                try:
+                    outcome = await booking_sync_service.apply_booking_change(previous_row, booking)
+                except Exception as e:
+                    logger.error(f"❌ Failed to apply change for booking {booking['id']}: {e}", exc_info=True)
+                    failed.extend({"id": event_id, "booking_id": booking["id"]} for event_id in entry["event_ids"])
+                    continue
+
+            actions[outcome["action"]] = actions.get(outcome["action"], 0) + 1
+            processed.extend({"id": event_id, "booking_id": booking["id"]} for event_id in entry["event_ids"])
+
+        await self._complete(processed, "processed")
+        await self._complete(failed, "failed", "Booking write or code update failed")
+
+        event_count = sum(len(entry["event_ids"]) for entry in pending.values())
+        summary = ", ".join(f"{count} {action}" for action, count in actions.items()) or "none applied"
+        logger.info(f"📨 Webhook batch: {event_count} events -> {len(pending)} bookings ({summary}, {len(failed)} events failed)")
+
+    async def _complete(self, events: List[Dict], status: str, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of many events with one complete_webhook_events() call
+        """
+        if not events:
+            return
+        self._queued.difference_update(event["id"] for event in events)
+        try:
+            with track_dependency("db"):
+                await asyncio.to_thread(
+                    self.supabase.rpc("complete_webhook_events", {
+                        "p_events": events,
+                        "p_status": status,
+                        "p_error": error
+                    }).execute
+                )
+        except Exception as e:
+            logger.error(f"❌ Failed to mark {len(events)} webhook events {status}: {e}")
+
+
+# Global instance
+_webhook_pipeline: Optional[WebhookPipeline] = None
+
+
+def get_webhook_pipeline() -> WebhookPipeline:
+    """
+    Get or create webhook pipeline singleton
+    """
+    global _webhook_pipeline
+    if _webhook_pipeline is None:
+        _webhook_pipeline = WebhookPipeline()
+    return _webhook_pipeline
+
+
+async def start_webhook_pipeline():
+    """
+    Start the webhook collector and flusher (called from application lifespan, every worker process)
+    """
+    await get_webhook_pipeline().start()
+
+
+async def stop_webhook_pipeline():
+    """
+    Stop the webhook collector and flusher gracefully
+    """
+    if _webhook_pipeline:
+        await _webhook_pipeline.stop()
+
+
+async def replay_webhook_events() -> int:
+    """
+    Re-queue unprocessed webhook events (called when this process becomes leader, and by the scheduler)
+
+    Returns:
+        Number of events re-queued
+    """
+    return await get_webhook_pipeline().replay_unprocessed()
@@ -0,0 +1,123 @@
+"""
+Intercom open latency benchmark
+Runs a fake Home Assistant that timestamps every button press, fires
+POST /api/intercom/open at a running API and reports p50/p99 of
+request -> Home Assistant call and of the full round trip.
+
+Usage (from backend/):
+    # 1. Start the API against the fake Home Assistant
+    HOME_ASSISTANT_URL=http://127.0.0.1:18123 HOME_ASSISTANT_TOKEN=bench HOME_ASSISTANT_WS_ENABLED=false \\
+        uvicorn app.main:app --port 8000
+
+    # 2. Run the benchmark with the guest portal token of an active booking
+    python scripts/bench_intercom.py --token <guest_token> --requests 200
+
+Requests are sent one at a time so every press can be matched to its request.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+import aiohttp
+from aiohttp import web
+
+
+class FakeHomeAssistant:
+    """
+    Answers button.press like Home Assistant and records when each press arrived
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.presses: asyncio.Queue = asyncio.Queue()
+
+    async def press(self, request: web.Request) -> web.Response:
+        self.presses.put_nowait(time.perf_counter())
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return web.json_response([])
+
+    async def start(self, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/api/services/button/press", self.press)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        return runner
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name: str, values: List[float]) -> None:
+    if not values:
+        print(f"{name:<24} no samples")
+        return
+    ms = [v * 1000 for v in values]
+    print(
+        f"{name:<24} p50 {percentile(ms, 50):7.2f} ms   p99 {percentile(ms, 99):7.2f} ms   "
+        f"mean {statistics.mean(ms):7.2f} ms   max {max(ms):7.2f} ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    fake_ha = FakeHomeAssistant(args.ha_delay)
+    runner = await fake_ha.start(args.ha_port)
+
+    to_ha: List[float] = []
+    round_trip: List[float] = []
+    errors = 0
+
+    url = f"{args.api_url.rstrip('/')}/api/intercom/open"
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            for i in range(args.warmup + args.requests):
+                started = time.perf_counter()
+                async with session.post(url, headers=headers) as response:
+                    await response.read()
+                    status = response.status
+                finished = time.perf_counter()
+
+                pressed: Optional[float] = None
+                try:
+                    pressed = await asyncio.wait_for(fake_ha.presses.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+                if status != 200 or pressed is None:
+                    errors += 1
+                    if errors == 1:
+                        print(f"⚠️ Request failed with HTTP {status} (press received: {pressed is not None})")
+                    continue
+                if i < args.warmup:
+                    continue
+
+                to_ha.append(pressed - started)
+                round_trip.append(finished - started)
+    finally:
+        await runner.cleanup()
+
+    print(f"\n{len(round_trip)} requests measured ({args.warmup} warmup, {errors} failed)\n")
+    report("request -> HA call", to_ha)
+    report("round trip", round_trip)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Intercom open latency benchmark")
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True, help="Guest portal token of an active booking")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--ha-port", type=int, default=18123, help="Port for the fake Home Assistant")
+    parser.add_argument("--ha-delay", type=float, default=0.0, help="Seconds the fake Home Assistant takes to answer")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
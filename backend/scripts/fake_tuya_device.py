@@ -0,0 +1,152 @@
+"""
+Fake Tuya lock for exercising the local LAN transport without hardware
+Speaks enough of protocol 3.3 (55AA framing, AES-ECB with the local key) for
+tinytuya's status() and set_multiple_values() to work against it.
+
+Usage (from backend/):
+    python scripts/fake_tuya_device.py --device-id bf123 --local-key 0123456789abcdef \\
+        --dps '{"8": 87, "52": ""}'
+
+then point TUYA_LOCAL_DEVICES at it, e.g.
+    TUYA_LOCAL_DEVICES='{"bf123": {"ip": "127.0.0.1", "local_key": "0123456789abcdef",
+                         "dps": {"delete_temporary_password": "52", "residual_electricity": "8"}}}'
+
+--delay and --fail simulate a slow or broken device so the cloud fallback
+can be checked too.
+"""
+import argparse
+import asyncio
+import binascii
+import json
+import logging
+import struct
+import time
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+logger = logging.getLogger("fake_tuya_device")
+
+PREFIX = 0x000055AA
+SUFFIX = 0x0000AA55
+HEADER_FMT = ">4I"
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+VERSION_HEADER = b"3.3" + b"\0" * 12
+
+CMD_CONTROL = 7
+CMD_STATUS = 8
+CMD_HEART_BEAT = 9
+CMD_DP_QUERY = 10
+
+
+class FakeTuyaDevice:
+    """
+    One fake device: holds a DP map and answers local protocol 3.3 requests
+    """
+
+    def __init__(self, device_id: str, local_key: str, dps: dict, delay: float = 0.0, fail: bool = False):
+        self.device_id = device_id
+        self.key = local_key.encode()
+        self.dps = dps
+        self.delay = delay
+        self.fail = fail
+
+    def _encrypt(self, data: bytes) -> bytes:
+        padder = padding.PKCS7(128).padder()
+        encryptor = Cipher(algorithms.AES(self.key), modes.ECB()).encryptor()
+        return encryptor.update(padder.update(data) + padder.finalize()) + encryptor.finalize()
+
+    def _decrypt(self, data: bytes) -> bytes:
+        decryptor = Cipher(algorithms.AES(self.key), modes.ECB()).decryptor()
+        unpadder = padding.PKCS7(128).unpadder()
+        return unpadder.update(decryptor.update(data) + decryptor.finalize()) + unpadder.finalize()
+
+    @staticmethod
+    def _frame(seqno: int, cmd: int, payload: bytes) -> bytes:
+        # Device frames carry a 4-byte return code ahead of the payload
+        body = struct.pack(">I", 0) + payload
+        header = struct.pack(HEADER_FMT, PREFIX, seqno, cmd, len(body) + 8)
+        crc = binascii.crc32(header + body) & 0xFFFFFFFF
+        return header + body + struct.pack(">2I", crc, SUFFIX)
+
+    def _dps_payload(self) -> bytes:
+        return json.dumps({"devId": self.device_id, "dps": self.dps, "t": int(time.time())}).encode()
+
+    def handle(self, seqno: int, cmd: int, payload: bytes) -> list:
+        """
+        Build the response frames for one request frame
+        """
+        if cmd == CMD_HEART_BEAT:
+            return [self._frame(seqno, CMD_HEART_BEAT, b"")]
+
+        if payload.startswith(VERSION_HEADER[:3]):
+            payload = payload[len(VERSION_HEADER):]
+        request = json.loads(self._decrypt(payload)) if payload else {}
+
+        if cmd == CMD_DP_QUERY:
+            logger.info("📦 DP query")
+            return [self._frame(seqno, CMD_DP_QUERY, self._encrypt(self._dps_payload()))]
+
+        if cmd == CMD_CONTROL:
+            changes = request.get("dps") or {}
+            self.dps.update(changes)
+            logger.info(f"📦 Control: {changes}")
+            # Ack, then the updated DPs as an async status report
+            return [
+                self._frame(seqno, CMD_CONTROL, b""),
+                self._frame(seqno, CMD_STATUS, VERSION_HEADER + self._encrypt(self._dps_payload()))
+            ]
+
+        logger.warning(f"⚠️ Unsupported command {cmd}")
+        return [self._frame(seqno, cmd, b"")]
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        logger.info(f"🔄 Connection from {peer}")
+        try:
+            while True:
+                header = await reader.readexactly(HEADER_LEN)
+                prefix, seqno, cmd, length = struct.unpack(HEADER_FMT, header)
+                if prefix != PREFIX:
+                    logger.warning(f"⚠️ Bad prefix {prefix:08X}, closing")
+                    break
+                rest = await reader.readexactly(length)
+                payload = rest[:-8]
+
+                if self.fail:
+                    logger.warning("⚠️ Failing request (--fail)")
+                    break
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                for frame in self.handle(seqno, cmd, payload):
+                    writer.write(frame)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except Exception as e:
+            logger.error(f"❌ {e}")
+        finally:
+            writer.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Tuya lock (local protocol 3.3)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6668)
+    parser.add_argument("--device-id", required=True)
+    parser.add_argument("--local-key", required=True, help="16-character local key")
+    parser.add_argument("--dps", default='{"8": 100}', help="Initial data points as JSON")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail", action="store_true", help="Drop every request")
+    args = parser.parse_args()
+
+    device = FakeTuyaDevice(args.device_id, args.local_key, json.loads(args.dps), args.delay, args.fail)
+    server = await asyncio.start_server(device.serve, args.host, args.port)
+    logger.info(f"✅ Fake Tuya device {args.device_id} listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
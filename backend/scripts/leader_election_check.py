@@ -0,0 +1,212 @@
+"""
+Leader election check
+Starts N worker processes running LeaderElector against the real
+scheduler_leases table (migration 008) on a separate lease name, then checks
+that exactly one worker leads at any time and that leadership fails over
+within the lease TTL when the leader crashes (SIGKILL, lease left behind) or
+shuts down (SIGTERM, lease released).
+
+Usage (from backend/, with SUPABASE_URL / SUPABASE_SERVICE_KEY set):
+    python scripts/leader_election_check.py --workers 3
+
+Uses SCHEDULER_LEASE_TTL_SECONDS and SCHEDULER_HEARTBEAT_SECONDS from the
+environment; the production "scheduler" lease is not touched.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.leader_election import LeaderElector  # noqa: E402
+
+# (worker index, wall time, is leader)
+Report = Tuple[int, float, bool]
+
+
+def worker(index: int, lease_name: str, reports: multiprocessing.Queue) -> None:
+    """
+    One simulated API worker: heartbeat the lease and report leadership every 100 ms
+    """
+    logging.basicConfig(level=logging.WARNING)
+
+    async def run() -> None:
+        elector = LeaderElector(lease_name)
+        stopping = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+
+        await elector.start()
+        while not stopping.is_set():
+            reports.put((index, time.time(), elector.is_leader))
+            try:
+                await asyncio.wait_for(stopping.wait(), 0.1)
+            except asyncio.TimeoutError:
+                pass
+
+        # Graceful shutdown releases the lease, like the API lifespan does
+        await elector.stop()
+        reports.put((index, time.time(), False))
+
+    asyncio.run(run())
+
+
+class Monitor:
+    """
+    Collects worker reports and answers leadership questions about them
+    """
+
+    def __init__(self, reports: multiprocessing.Queue):
+        self.reports = reports
+        self.history: List[Report] = []
+        self.latest: Dict[int, bool] = {}
+
+    def drain(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                report = self.reports.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+            self.history.append(report)
+            self.latest[report[0]] = report[2]
+
+    def leaders(self, alive: List[int]) -> List[int]:
+        return [index for index in alive if self.latest.get(index)]
+
+    def wait_for_leader(self, alive: List[int], timeout: float, after: float = 0.0) -> Optional[Tuple[int, float]]:
+        """
+        First worker in alive reporting leadership after the given wall time
+        """
+        deadline = time.monotonic() + timeout
+        seen = len(self.history)
+        while time.monotonic() < deadline:
+            self.drain(0.1)
+            for index, at, leader in self.history[seen:]:
+                if leader and index in alive and at >= after:
+                    return index, at
+            seen = len(self.history)
+        return None
+
+    def overlaps(self) -> List[str]:
+        """
+        Pairs of workers whose leadership periods overlapped (by their own timestamps)
+        """
+        periods: List[Tuple[float, float, int]] = []
+        open_since: Dict[int, float] = {}
+        last_true: Dict[int, float] = {}
+        for index, at, leader in sorted(self.history, key=lambda report: report[1]):
+            if leader:
+                open_since.setdefault(index, at)
+                last_true[index] = at
+            elif index in open_since:
+                periods.append((open_since.pop(index), last_true[index], index))
+        for index, started in open_since.items():
+            periods.append((started, last_true[index], index))
+
+        periods.sort()
+        problems = []
+        for (start_a, end_a, a), (start_b, end_b, b) in zip(periods, periods[1:]):
+            if a != b and start_b <= end_a:
+                problems.append(f"worker {a} led until {end_a:.3f} but worker {b} led from {start_b:.3f}")
+        return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Leader election check")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--lease", default="leader_election_check", help="Lease name used for the check")
+    parser.add_argument("--observe", type=float, default=10.0, help="Seconds to watch a stable leader")
+    args = parser.parse_args()
+
+    if args.workers < 3:
+        parser.error("--workers must be at least 3 (one leader is killed, one stopped, one takes over)")
+    if not settings.SCHEDULER_LEADER_ELECTION:
+        parser.error("SCHEDULER_LEADER_ELECTION is disabled; every worker would report leadership")
+
+    ttl = settings.SCHEDULER_LEASE_TTL_SECONDS
+    heartbeat = settings.SCHEDULER_HEARTBEAT_SECONDS
+    # A crashed leader's lease expires after the TTL; a waiting worker notices on its next heartbeat
+    crash_bound = ttl + heartbeat + 1.0
+    release_bound = heartbeat + 1.0
+
+    context = multiprocessing.get_context("spawn")
+    reports = context.Queue()
+    processes = {
+        index: context.Process(target=worker, args=(index, args.lease, reports), daemon=True)
+        for index in range(args.workers)
+    }
+    for process in processes.values():
+        process.start()
+
+    monitor = Monitor(reports)
+    alive = list(processes)
+    failures: List[str] = []
+
+    try:
+        print(f"🔄 {args.workers} workers started (lease TTL {ttl}s, heartbeat {heartbeat}s)")
+
+        elected = monitor.wait_for_leader(alive, timeout=crash_bound + 5)
+        if elected is None:
+            failures.append("no worker became leader")
+            return
+        leader = elected[0]
+        print(f"👑 Worker {leader} elected")
+
+        monitor.drain(args.observe)
+        leaders = monitor.leaders(alive)
+        print(f"📦 After {args.observe:.0f}s: leaders {leaders}")
+        if leaders != [leader]:
+            failures.append(f"expected worker {leader} as the only leader, got {leaders}")
+
+        for how, sig, bound in (("crash", signal.SIGKILL, crash_bound), ("shutdown", signal.SIGTERM, release_bound)):
+            killed_at = time.time()
+            os.kill(processes[leader].pid, sig)
+            processes[leader].join(10)
+            alive.remove(leader)
+
+            elected = monitor.wait_for_leader(alive, timeout=bound + 5, after=killed_at)
+            if elected is None:
+                failures.append(f"no failover after leader {how}")
+                return
+            took = elected[1] - killed_at
+            status = "✅" if took <= bound else "❌"
+            print(f"{status} Leader {how}: worker {elected[0]} took over in {took:.1f}s (bound {bound:.1f}s)")
+            if took > bound:
+                failures.append(f"failover after {how} took {took:.1f}s (bound {bound:.1f}s)")
+
+            monitor.drain(heartbeat)
+            leaders = monitor.leaders(alive)
+            if leaders != [elected[0]]:
+                failures.append(f"after {how} expected worker {elected[0]} as the only leader, got {leaders}")
+            leader = elected[0]
+
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(10)
+        monitor.drain(0.5)
+
+        failures.extend(monitor.overlaps())
+        if failures:
+            print("\n❌ Leader election check failed:")
+            for failure in failures:
+                print(f"   - {failure}")
+            sys.exit(1)
+        print("\n✅ Exactly one leader at a time; failover within bounds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+-- =====================================================
+-- MIGRATION 007: Create Bulk Revoke Access Codes Function
+-- =====================================================
+-- Marks a batch of access codes as revoked in a single
+-- UPDATE, used by the revocation engine after device deletes
+-- =====================================================
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS revoke_access_codes(UUID[], TEXT);
+
+-- Create function to revoke many codes at once
+CREATE OR REPLACE FUNCTION revoke_access_codes(p_code_ids UUID[], p_reason TEXT)
+RETURNS TABLE (
+    id UUID
+) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE access_codes ac
+    SET
+        status = 'revoked',
+        revoked_at = NOW(),
+        revoked_reason = p_reason
+    WHERE
+        ac.id = ANY(p_code_ids)
+        -- Never overwrite codes revoked or expired in the meantime
+        AND ac.status = 'active'
+    RETURNING ac.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comment
+COMMENT ON FUNCTION revoke_access_codes(UUID[], TEXT) IS 'Marks the given active access codes revoked with one reason; returns the IDs updated';
@@ -0,0 +1,62 @@
+-- =====================================================
+-- MIGRATION 008: Scheduler Leader Election Leases
+-- =====================================================
+-- Lease rows with heartbeat so exactly one API worker runs
+-- the scheduler jobs and timers. Works through PostgREST RPC
+-- (session-level advisory locks do not survive between calls).
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR(100) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    acquired_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    renewed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+ALTER TABLE scheduler_leases ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON scheduler_leases FOR ALL USING (auth.role() = 'service_role');
+
+-- Drop existing functions if they exist
+DROP FUNCTION IF EXISTS acquire_scheduler_lease(TEXT, TEXT, INTEGER);
+DROP FUNCTION IF EXISTS release_scheduler_lease(TEXT, TEXT);
+
+-- Acquire or renew a lease; returns true if p_holder holds it afterwards
+CREATE OR REPLACE FUNCTION acquire_scheduler_lease(p_name TEXT, p_holder TEXT, p_ttl_seconds INTEGER)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_holder TEXT;
+BEGIN
+    INSERT INTO scheduler_leases AS sl (name, holder, acquired_at, renewed_at, expires_at)
+    VALUES (p_name, p_holder, NOW(), NOW(), NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+    SET
+        holder = EXCLUDED.holder,
+        acquired_at = CASE WHEN sl.holder = EXCLUDED.holder THEN sl.acquired_at ELSE NOW() END,
+        renewed_at = NOW(),
+        expires_at = EXCLUDED.expires_at
+    WHERE
+        -- Renewal by the current holder, or takeover of an expired lease
+        sl.holder = EXCLUDED.holder
+        OR sl.expires_at < NOW()
+    RETURNING sl.holder INTO v_holder;
+
+    RETURN v_holder IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Release a lease held by p_holder (graceful shutdown)
+CREATE OR REPLACE FUNCTION release_scheduler_lease(p_name TEXT, p_holder TEXT)
+RETURNS BOOLEAN AS $$
+BEGIN
+    DELETE FROM scheduler_leases
+    WHERE name = p_name AND holder = p_holder;
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON TABLE scheduler_leases IS 'Leader election leases for scheduler jobs (one holder per lease name)';
+COMMENT ON FUNCTION acquire_scheduler_lease(TEXT, TEXT, INTEGER) IS 'Acquires or renews a scheduler lease for p_ttl_seconds; returns true if p_holder is the leader';
+COMMENT ON FUNCTION release_scheduler_lease(TEXT, TEXT) IS 'Releases a scheduler lease if held by p_holder';
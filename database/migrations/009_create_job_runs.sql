@@ -0,0 +1,39 @@
+-- =====================================================
+-- MIGRATION 009: Scheduler Job Run History
+-- =====================================================
+-- One row per scheduler job / timer run with duration,
+-- item counts, error samples and per-dependency timings
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+
+    -- Job details
+    job_name VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('running', 'success', 'failed')),
+    worker VARCHAR(255),
+
+    -- Timing
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    duration_ms INTEGER,
+
+    -- Results
+    counts JSONB DEFAULT '{}'::jsonb,         -- e.g. {"revoked": 12, "failed": 1}
+    dependency_ms JSONB DEFAULT '{}'::jsonb,  -- e.g. {"db": 120.5, "tuya": 3400.2}
+    errors JSONB DEFAULT '[]'::jsonb,         -- bounded sample of error messages
+
+    -- Metadata
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Indexes for job_runs
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs(job_name, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_job_runs_status ON job_runs(status);
+
+ALTER TABLE job_runs ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON job_runs FOR ALL USING (auth.role() = 'service_role');
+
+-- Add comments
+COMMENT ON TABLE job_runs IS 'History of scheduler job runs with duration, counts and per-dependency timings';
+COMMENT ON COLUMN job_runs.dependency_ms IS 'Milliseconds spent per external dependency (db, tuya, ring, twilio, telegram)';
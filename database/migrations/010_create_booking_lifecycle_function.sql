@@ -0,0 +1,85 @@
+-- =====================================================
+-- MIGRATION 010: Booking Lifecycle Transition Engine
+-- =====================================================
+-- Applies every booking/code status transition in one
+-- set-based pass and returns the changed IDs:
+--   confirmed   -> checked_in   (first door open or check-in time)
+--   confirmed/checked_in -> checked_out (checkout time passed)
+--   active code -> expired      (validity ended, nothing on a device)
+-- =====================================================
+
+-- expire_old_codes() now returns the expired IDs and only touches codes
+-- that were never provisioned on a device. Codes held on a Tuya lock or
+-- Ring intercom must stay 'active' until the revocation engine deletes them.
+DROP FUNCTION IF EXISTS expire_old_codes();
+
+CREATE OR REPLACE FUNCTION expire_old_codes()
+RETURNS TABLE (
+    id UUID
+) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE access_codes ac
+    SET status = 'expired',
+        updated_at = NOW()
+    WHERE ac.status = 'active'
+    AND ac.valid_until < NOW()
+    AND ac.tuya_password_id IS NULL
+    AND ac.ring_code_id IS NULL
+    RETURNING ac.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS apply_booking_lifecycle();
+
+-- Create lifecycle transition function
+CREATE OR REPLACE FUNCTION apply_booking_lifecycle()
+RETURNS TABLE (
+    entity_type VARCHAR,
+    entity_id UUID,
+    old_status VARCHAR,
+    new_status VARCHAR
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH transitions AS (
+        SELECT
+            b.id,
+            b.status AS from_status,
+            CASE
+                WHEN b.checkout_date <= NOW() THEN 'checked_out'
+                WHEN b.status = 'confirmed' AND (
+                    b.checkin_date <= NOW()
+                    OR EXISTS (
+                        SELECT 1
+                        FROM audit_logs al
+                        WHERE al.entity_type = 'booking'
+                        AND al.entity_id = b.id
+                        AND al.event_type IN ('door_open', 'intercom_opened')
+                    )
+                ) THEN 'checked_in'
+            END AS to_status
+        FROM bookings b
+        WHERE b.status IN ('confirmed', 'checked_in')
+    ),
+    updated_bookings AS (
+        UPDATE bookings b
+        SET status = t.to_status
+        FROM transitions t
+        WHERE b.id = t.id
+        AND t.to_status IS NOT NULL
+        AND t.to_status <> t.from_status
+        RETURNING b.id, t.from_status, b.status
+    )
+    SELECT 'booking'::VARCHAR, ub.id, ub.from_status::VARCHAR, ub.status::VARCHAR
+    FROM updated_bookings ub
+    UNION ALL
+    SELECT 'code'::VARCHAR, ec.id, 'active'::VARCHAR, 'expired'::VARCHAR
+    FROM expire_old_codes() ec;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON FUNCTION expire_old_codes() IS 'Expires active codes past valid_until that are not held on any device; returns their IDs';
+COMMENT ON FUNCTION apply_booking_lifecycle() IS 'Applies booking status transitions and code expiry in one pass; returns every changed entity';
@@ -0,0 +1,63 @@
+-- =====================================================
+-- MIGRATION 011: Create Bulk Upsert Bookings Function
+-- =====================================================
+-- Upserts a batch of synced bookings in one statement and
+-- reports whether each row was inserted or updated
+-- (xmax = 0 only for freshly inserted tuples)
+-- =====================================================
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS upsert_bookings(JSONB);
+
+-- Create bulk upsert function
+CREATE OR REPLACE FUNCTION upsert_bookings(p_bookings JSONB)
+RETURNS TABLE (
+    inserted BOOLEAN,
+    booking JSONB
+) AS $$
+BEGIN
+    RETURN QUERY
+    INSERT INTO bookings AS b (
+        hospitable_id,
+        confirmation_code,
+        guest_name,
+        guest_email,
+        guest_phone,
+        guest_language,
+        property_id,
+        checkin_date,
+        checkout_date,
+        num_guests,
+        status
+    )
+    SELECT
+        r.hospitable_id,
+        r.confirmation_code,
+        r.guest_name,
+        r.guest_email,
+        r.guest_phone,
+        COALESCE(r.guest_language, 'en'),
+        r.property_id,
+        r.checkin_date,
+        r.checkout_date,
+        COALESCE(r.num_guests, 1),
+        COALESCE(r.status, 'confirmed')
+    FROM jsonb_populate_recordset(NULL::bookings, p_bookings) r
+    ON CONFLICT (hospitable_id) DO UPDATE
+    SET
+        confirmation_code = EXCLUDED.confirmation_code,
+        guest_name = EXCLUDED.guest_name,
+        guest_email = EXCLUDED.guest_email,
+        guest_phone = EXCLUDED.guest_phone,
+        guest_language = EXCLUDED.guest_language,
+        property_id = EXCLUDED.property_id,
+        checkin_date = EXCLUDED.checkin_date,
+        checkout_date = EXCLUDED.checkout_date,
+        num_guests = EXCLUDED.num_guests,
+        status = EXCLUDED.status
+    RETURNING (b.xmax = 0), to_jsonb(b.*);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comment
+COMMENT ON FUNCTION upsert_bookings(JSONB) IS 'Upserts a JSON array of bookings on hospitable_id; returns each row with an inserted flag';
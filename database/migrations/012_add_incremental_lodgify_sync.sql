@@ -0,0 +1,83 @@
+-- =====================================================
+-- MIGRATION 012: Incremental Lodgify Sync
+-- =====================================================
+-- Per-property sync watermark plus a content hash on
+-- bookings, so unchanged reservations are never rewritten
+-- =====================================================
+
+-- Sync watermark per property
+CREATE TABLE IF NOT EXISTS lodgify_sync_state (
+    property_id VARCHAR(50) PRIMARY KEY,
+    last_synced_at TIMESTAMP WITH TIME ZONE,       -- start of the last successful sync
+    last_full_sync_at TIMESTAMP WITH TIME ZONE,    -- start of the last sync without updatedSince
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE lodgify_sync_state ENABLE ROW LEVEL SECURITY;
+
+-- Hash of the mapped Lodgify reservation (see BookingSyncService)
+ALTER TABLE bookings
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+-- Bulk upsert now skips rows whose content hash is unchanged;
+-- skipped rows are not returned
+DROP FUNCTION IF EXISTS upsert_bookings(JSONB);
+
+CREATE OR REPLACE FUNCTION upsert_bookings(p_bookings JSONB)
+RETURNS TABLE (
+    inserted BOOLEAN,
+    booking JSONB
+) AS $$
+BEGIN
+    RETURN QUERY
+    INSERT INTO bookings AS b (
+        hospitable_id,
+        confirmation_code,
+        guest_name,
+        guest_email,
+        guest_phone,
+        guest_language,
+        property_id,
+        checkin_date,
+        checkout_date,
+        num_guests,
+        status,
+        content_hash
+    )
+    SELECT
+        r.hospitable_id,
+        r.confirmation_code,
+        r.guest_name,
+        r.guest_email,
+        r.guest_phone,
+        COALESCE(r.guest_language, 'en'),
+        r.property_id,
+        r.checkin_date,
+        r.checkout_date,
+        COALESCE(r.num_guests, 1),
+        COALESCE(r.status, 'confirmed'),
+        r.content_hash
+    FROM jsonb_populate_recordset(NULL::bookings, p_bookings) r
+    ON CONFLICT (hospitable_id) DO UPDATE
+    SET
+        confirmation_code = EXCLUDED.confirmation_code,
+        guest_name = EXCLUDED.guest_name,
+        guest_email = EXCLUDED.guest_email,
+        guest_phone = EXCLUDED.guest_phone,
+        guest_language = EXCLUDED.guest_language,
+        property_id = EXCLUDED.property_id,
+        checkin_date = EXCLUDED.checkin_date,
+        checkout_date = EXCLUDED.checkout_date,
+        num_guests = EXCLUDED.num_guests,
+        status = EXCLUDED.status,
+        content_hash = EXCLUDED.content_hash
+    -- No write (and no updated_at trigger) for unchanged reservations
+    WHERE b.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING (b.xmax = 0), to_jsonb(b.*);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON TABLE lodgify_sync_state IS 'Per-property Lodgify sync watermark used for delta syncs';
+COMMENT ON COLUMN bookings.content_hash IS 'SHA-256 of the mapped Lodgify reservation; unchanged hashes skip the upsert';
+COMMENT ON FUNCTION upsert_bookings(JSONB) IS 'Upserts a JSON array of bookings on hospitable_id, skipping unchanged content hashes; returns each written row with an inserted flag';
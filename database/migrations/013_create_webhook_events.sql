@@ -0,0 +1,30 @@
+-- =====================================================
+-- MIGRATION 013: Webhook Event Store
+-- =====================================================
+-- Raw Hospitable/Lodgify webhook events, persisted before
+-- processing so unprocessed events are replayed on restart
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    provider VARCHAR(50) NOT NULL,          -- 'hospitable' or 'lodgify'
+    event_id VARCHAR(255),                  -- provider event ID, if sent
+    event_type VARCHAR(100),
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processed', 'ignored', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    booking_id UUID REFERENCES bookings(id) ON DELETE SET NULL,
+    received_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    processed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Replay scan: unprocessed events oldest first
+CREATE INDEX IF NOT EXISTS idx_webhook_events_unprocessed
+    ON webhook_events(received_at)
+    WHERE status IN ('pending', 'failed');
+
+ALTER TABLE webhook_events ENABLE ROW LEVEL SECURITY;
+
+-- Add comment
+COMMENT ON TABLE webhook_events IS 'Raw booking webhooks; processed asynchronously by the webhook pipeline';
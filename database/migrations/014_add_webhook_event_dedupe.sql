@@ -0,0 +1,50 @@
+-- =====================================================
+-- MIGRATION 014: Webhook Event Dedupe and Batch Completion
+-- =====================================================
+-- Provider retries carry the same event ID: a unique
+-- (provider, event_id) constraint drops them at insert.
+-- complete_webhook_events() records the outcome of a whole
+-- micro-batch of events in one statement.
+-- =====================================================
+
+-- Keep the earliest copy of any event already stored twice
+DELETE FROM webhook_events we
+USING webhook_events older
+WHERE we.provider = older.provider
+AND we.event_id = older.event_id
+AND we.received_at > older.received_at;
+
+-- NULL event IDs never conflict
+ALTER TABLE webhook_events
+DROP CONSTRAINT IF EXISTS webhook_events_provider_event_id_key;
+
+ALTER TABLE webhook_events
+ADD CONSTRAINT webhook_events_provider_event_id_key UNIQUE (provider, event_id);
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS complete_webhook_events(JSONB, VARCHAR, TEXT);
+
+-- Mark a batch of events with one outcome
+-- p_events: [{"id": uuid, "booking_id": uuid|null}, ...]
+CREATE OR REPLACE FUNCTION complete_webhook_events(p_events JSONB, p_status VARCHAR, p_error TEXT DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE webhook_events we
+    SET
+        status = p_status,
+        attempts = we.attempts + 1,
+        last_error = p_error,
+        booking_id = COALESCE(e.booking_id, we.booking_id),
+        processed_at = NOW()
+    FROM jsonb_to_recordset(p_events) AS e(id UUID, booking_id UUID)
+    WHERE we.id = e.id;
+
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comment
+COMMENT ON FUNCTION complete_webhook_events(JSONB, VARCHAR, TEXT) IS 'Sets status, attempts and booking_id for a batch of webhook events';
@@ -0,0 +1,19 @@
+-- =====================================================
+-- MIGRATION 015: Per-Property Lodgify Credentials
+-- =====================================================
+-- Each active property with a Lodgify property ID is synced
+-- on its own (concurrently, with its own watermark)
+-- =====================================================
+
+ALTER TABLE properties
+ADD COLUMN IF NOT EXISTS lodgify_property_id VARCHAR(50),
+ADD COLUMN IF NOT EXISTS lodgify_api_key TEXT;
+
+-- Sync looks up properties by Lodgify ID for webhooks
+CREATE UNIQUE INDEX IF NOT EXISTS idx_properties_lodgify_property_id
+    ON properties(lodgify_property_id)
+    WHERE lodgify_property_id IS NOT NULL;
+
+-- Add comments
+COMMENT ON COLUMN properties.lodgify_property_id IS 'Lodgify property ID; properties without one are not synced';
+COMMENT ON COLUMN properties.lodgify_api_key IS 'Lodgify API key for this property (falls back to LODGIFY_API_KEY)';
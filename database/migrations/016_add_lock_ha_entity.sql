@@ -0,0 +1,13 @@
+-- =====================================================
+-- MIGRATION 016: Home Assistant Entity per Lock
+-- =====================================================
+-- The device status poller reads the lock state (and the
+-- battery level, when the vendor doesn't report one) from
+-- this Home Assistant entity
+-- =====================================================
+
+ALTER TABLE locks
+ADD COLUMN IF NOT EXISTS ha_entity_id VARCHAR(255);
+
+-- Add comments
+COMMENT ON COLUMN locks.ha_entity_id IS 'Home Assistant entity (e.g. lock.tuya_main_entrance) polled for lock state; optional';
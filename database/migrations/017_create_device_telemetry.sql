@@ -0,0 +1,158 @@
+-- =====================================================
+-- MIGRATION 017: Device Telemetry Time Series
+-- =====================================================
+-- Polled lock status (online, battery, signal, status call
+-- latency) kept at raw resolution for a few days and rolled
+-- up into hourly and daily buckets for long-term retention
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS device_telemetry (
+    id BIGSERIAL PRIMARY KEY,
+    lock_id UUID NOT NULL REFERENCES locks(id) ON DELETE CASCADE,
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL,
+
+    -- Sample
+    online BOOLEAN,
+    battery SMALLINT,     -- percent
+    signal SMALLINT,      -- vendor-reported signal (RSSI dBm or percent)
+    latency_ms INTEGER    -- duration of the status call(s)
+);
+
+CREATE INDEX IF NOT EXISTS idx_device_telemetry_lock_time ON device_telemetry(lock_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_device_telemetry_recorded_at ON device_telemetry(recorded_at);
+
+CREATE TABLE IF NOT EXISTS device_telemetry_rollups (
+    lock_id UUID NOT NULL REFERENCES locks(id) ON DELETE CASCADE,
+    resolution VARCHAR(10) NOT NULL CHECK (resolution IN ('hour', 'day')),
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+
+    -- Aggregates over the bucket
+    samples INTEGER NOT NULL,
+    online_ratio REAL,
+    battery_min SMALLINT,
+    battery_avg REAL,
+    battery_max SMALLINT,
+    signal_avg REAL,
+    latency_avg_ms REAL,
+    latency_max_ms INTEGER,
+
+    PRIMARY KEY (lock_id, resolution, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_device_telemetry_rollups_bucket ON device_telemetry_rollups(resolution, bucket);
+
+ALTER TABLE device_telemetry ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON device_telemetry FOR ALL USING (auth.role() = 'service_role');
+
+ALTER TABLE device_telemetry_rollups ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON device_telemetry_rollups FOR ALL USING (auth.role() = 'service_role');
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS downsample_device_telemetry(INTEGER, INTEGER, INTEGER);
+
+-- Roll recent raw samples into hourly buckets and recent hours into daily
+-- buckets (re-aggregated, so re-running is harmless), then prune expired rows.
+-- Only completed hours/days are written.
+CREATE OR REPLACE FUNCTION downsample_device_telemetry(
+    p_raw_retention_days INTEGER,
+    p_hourly_retention_days INTEGER,
+    p_daily_retention_days INTEGER
+)
+RETURNS TABLE (
+    hourly_buckets INTEGER,
+    daily_buckets INTEGER,
+    raw_pruned INTEGER,
+    rollups_pruned INTEGER
+) AS $$
+DECLARE
+    current_hour TIMESTAMP WITH TIME ZONE := date_trunc('hour', NOW());
+    current_day TIMESTAMP WITH TIME ZONE := date_trunc('day', NOW());
+BEGIN
+    -- Hourly buckets from the last two days of raw samples
+    INSERT INTO device_telemetry_rollups (
+        lock_id, resolution, bucket, samples, online_ratio,
+        battery_min, battery_avg, battery_max, signal_avg, latency_avg_ms, latency_max_ms
+    )
+    SELECT
+        lock_id,
+        'hour',
+        date_trunc('hour', recorded_at),
+        COUNT(*),
+        AVG(CASE WHEN online THEN 1.0 WHEN NOT online THEN 0.0 END),
+        MIN(battery),
+        AVG(battery),
+        MAX(battery),
+        AVG(signal),
+        AVG(latency_ms),
+        MAX(latency_ms)
+    FROM device_telemetry
+    WHERE recorded_at >= current_hour - INTERVAL '2 days'
+    AND recorded_at < current_hour
+    GROUP BY lock_id, date_trunc('hour', recorded_at)
+    ON CONFLICT (lock_id, resolution, bucket) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        online_ratio = EXCLUDED.online_ratio,
+        battery_min = EXCLUDED.battery_min,
+        battery_avg = EXCLUDED.battery_avg,
+        battery_max = EXCLUDED.battery_max,
+        signal_avg = EXCLUDED.signal_avg,
+        latency_avg_ms = EXCLUDED.latency_avg_ms,
+        latency_max_ms = EXCLUDED.latency_max_ms;
+
+    GET DIAGNOSTICS hourly_buckets = ROW_COUNT;
+
+    -- Daily buckets from the last three days of hourly buckets (sample-weighted)
+    INSERT INTO device_telemetry_rollups (
+        lock_id, resolution, bucket, samples, online_ratio,
+        battery_min, battery_avg, battery_max, signal_avg, latency_avg_ms, latency_max_ms
+    )
+    SELECT
+        lock_id,
+        'day',
+        date_trunc('day', bucket),
+        SUM(samples),
+        SUM(online_ratio * samples) / NULLIF(SUM(samples) FILTER (WHERE online_ratio IS NOT NULL), 0),
+        MIN(battery_min),
+        SUM(battery_avg * samples) / NULLIF(SUM(samples) FILTER (WHERE battery_avg IS NOT NULL), 0),
+        MAX(battery_max),
+        SUM(signal_avg * samples) / NULLIF(SUM(samples) FILTER (WHERE signal_avg IS NOT NULL), 0),
+        SUM(latency_avg_ms * samples) / NULLIF(SUM(samples) FILTER (WHERE latency_avg_ms IS NOT NULL), 0),
+        MAX(latency_max_ms)
+    FROM device_telemetry_rollups
+    WHERE resolution = 'hour'
+    AND bucket >= current_day - INTERVAL '3 days'
+    AND bucket < current_day
+    GROUP BY lock_id, date_trunc('day', bucket)
+    ON CONFLICT (lock_id, resolution, bucket) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        online_ratio = EXCLUDED.online_ratio,
+        battery_min = EXCLUDED.battery_min,
+        battery_avg = EXCLUDED.battery_avg,
+        battery_max = EXCLUDED.battery_max,
+        signal_avg = EXCLUDED.signal_avg,
+        latency_avg_ms = EXCLUDED.latency_avg_ms,
+        latency_max_ms = EXCLUDED.latency_max_ms;
+
+    GET DIAGNOSTICS daily_buckets = ROW_COUNT;
+
+    -- Retention
+    DELETE FROM device_telemetry
+    WHERE recorded_at < NOW() - make_interval(days => p_raw_retention_days);
+
+    GET DIAGNOSTICS raw_pruned = ROW_COUNT;
+
+    DELETE FROM device_telemetry_rollups
+    WHERE (resolution = 'hour' AND bucket < NOW() - make_interval(days => p_hourly_retention_days))
+    OR (resolution = 'day' AND bucket < NOW() - make_interval(days => p_daily_retention_days));
+
+    GET DIAGNOSTICS rollups_pruned = ROW_COUNT;
+
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON TABLE device_telemetry IS 'Raw polled lock status samples (kept DEVICE_TELEMETRY_RAW_DAYS)';
+COMMENT ON TABLE device_telemetry_rollups IS 'Hourly and daily aggregates of device_telemetry for long-term history';
+COMMENT ON COLUMN device_telemetry.latency_ms IS 'Duration of the vendor status call(s) for this sample';
+COMMENT ON FUNCTION downsample_device_telemetry(INTEGER, INTEGER, INTEGER) IS 'Rolls raw samples into hourly/daily buckets and prunes rows past retention';
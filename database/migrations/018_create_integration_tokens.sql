@@ -0,0 +1,55 @@
+-- =====================================================
+-- MIGRATION 018: Shared Integration Tokens
+-- =====================================================
+-- OAuth tokens shared by every API worker. Ring rotates its
+-- refresh token on each refresh, so the latest one is kept
+-- here (instead of only in process memory) together with the
+-- current access token; a short claim makes sure only one
+-- worker refreshes at a time.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS integration_tokens (
+    provider VARCHAR(50) PRIMARY KEY,
+    access_token TEXT,
+    refresh_token TEXT,
+    expires_at TIMESTAMP WITH TIME ZONE,
+    refresh_holder VARCHAR(255),
+    refresh_claimed_until TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE integration_tokens ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON integration_tokens FOR ALL USING (auth.role() = 'service_role');
+
+-- Drop existing functions if they exist
+DROP FUNCTION IF EXISTS claim_integration_token_refresh(TEXT, TEXT, INTEGER);
+
+-- Claim the right to refresh a provider's token for p_ttl_seconds;
+-- returns true if p_holder holds the claim afterwards
+CREATE OR REPLACE FUNCTION claim_integration_token_refresh(p_provider TEXT, p_holder TEXT, p_ttl_seconds INTEGER)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_holder TEXT;
+BEGIN
+    INSERT INTO integration_tokens AS it (provider, refresh_holder, refresh_claimed_until)
+    VALUES (p_provider, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (provider) DO UPDATE
+    SET
+        refresh_holder = EXCLUDED.refresh_holder,
+        refresh_claimed_until = EXCLUDED.refresh_claimed_until
+    WHERE
+        -- No refresh in progress, our own claim, or an abandoned one
+        it.refresh_holder IS NULL
+        OR it.refresh_holder = EXCLUDED.refresh_holder
+        OR it.refresh_claimed_until < NOW()
+    RETURNING it.refresh_holder INTO v_holder;
+
+    RETURN v_holder IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON TABLE integration_tokens IS 'Current OAuth access/refresh tokens per integration, shared across API workers';
+COMMENT ON COLUMN integration_tokens.refresh_token IS 'Latest (rotated) refresh token; falls back to the env token when empty';
+COMMENT ON COLUMN integration_tokens.refresh_holder IS 'Worker currently refreshing the token (NULL when idle)';
+COMMENT ON FUNCTION claim_integration_token_refresh(TEXT, TEXT, INTEGER) IS 'Claims the token refresh for a provider; returns true if p_holder may refresh';
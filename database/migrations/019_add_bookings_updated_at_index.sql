@@ -0,0 +1,14 @@
+-- =====================================================
+-- MIGRATION 019: Bookings Change Poll Index
+-- =====================================================
+-- The leader's provisioning timer polls bookings changed
+-- since its last poll (updated_at, kept by the
+-- update_bookings_updated_at trigger), so bookings written
+-- by other API workers are scheduled within seconds
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_bookings_updated_at
+    ON bookings(updated_at);
+
+-- Add comment
+COMMENT ON INDEX idx_bookings_updated_at IS 'Change poll of the provisioning timer (bookings written by other workers)';
@@ -0,0 +1,36 @@
+-- =====================================================
+-- MIGRATION 020: Property Credentials
+-- =====================================================
+-- properties is readable with the anon key (guest portal),
+-- so per-property Lodgify API keys move out of it into a
+-- table only the service role can read
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS property_credentials (
+    property_id UUID PRIMARY KEY REFERENCES properties(id) ON DELETE CASCADE,
+    lodgify_api_key TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE property_credentials ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON property_credentials FOR ALL USING (auth.role() = 'service_role');
+REVOKE ALL ON property_credentials FROM anon, authenticated;
+
+-- Move keys stored by migration 015, then drop the exposed column
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'properties' AND column_name = 'lodgify_api_key'
+    ) THEN
+        INSERT INTO property_credentials (property_id, lodgify_api_key)
+        SELECT id, lodgify_api_key FROM properties WHERE lodgify_api_key IS NOT NULL
+        ON CONFLICT (property_id) DO UPDATE SET lodgify_api_key = EXCLUDED.lodgify_api_key, updated_at = NOW();
+
+        ALTER TABLE properties DROP COLUMN lodgify_api_key;
+    END IF;
+END $$;
+
+-- Add comments
+COMMENT ON TABLE property_credentials IS 'Per-property integration secrets; service role only (properties is anon-readable)';
+COMMENT ON COLUMN property_credentials.lodgify_api_key IS 'Lodgify API key for this property (falls back to LODGIFY_API_KEY)';
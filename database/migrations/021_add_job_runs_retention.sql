@@ -0,0 +1,31 @@
+-- =====================================================
+-- MIGRATION 021: Job Run Retention
+-- =====================================================
+-- job_runs gets one row per scheduler job and per timer
+-- fire, so it grows without bound. The leader prunes rows
+-- older than JOB_RUNS_RETENTION_DAYS once a day
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_started_at
+    ON job_runs(started_at);
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS prune_job_runs(INTEGER);
+
+-- Delete runs that started more than p_retention_days ago
+CREATE OR REPLACE FUNCTION prune_job_runs(p_retention_days INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    DELETE FROM job_runs
+    WHERE started_at < NOW() - make_interval(days => p_retention_days);
+
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments
+COMMENT ON INDEX idx_job_runs_started_at IS 'Daily job_runs retention prune';
+COMMENT ON FUNCTION prune_job_runs(INTEGER) IS 'Deletes job_runs rows older than the retention window, returns the number deleted';
@@ -0,0 +1,29 @@
+-- =====================================================
+-- MIGRATION 022: Shared Device Status
+-- =====================================================
+-- Only the elected leader polls lock status from the
+-- vendor APIs; it writes the latest result per lock here
+-- and the other API workers mirror it into their caches
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS device_status (
+    lock_id UUID PRIMARY KEY REFERENCES locks(id) ON DELETE CASCADE,
+
+    -- Last successful poll
+    online BOOLEAN,
+    battery SMALLINT,        -- percent
+    lock_state VARCHAR(50),  -- Home Assistant entity state (locked, unlocked, ...)
+    checked_at TIMESTAMP WITH TIME ZONE,
+
+    -- Last poll failure (cleared by the next success)
+    error TEXT,
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE device_status ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Service role full access" ON device_status FOR ALL USING (auth.role() = 'service_role');
+
+-- Add comments
+COMMENT ON TABLE device_status IS 'Latest polled status per lock, written by the leader and read by every API worker';
+COMMENT ON COLUMN device_status.checked_at IS 'Time of the last successful poll; a failed poll only sets error';
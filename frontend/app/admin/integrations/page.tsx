@@ -24,8 +24,10 @@ interface IntegrationDetail {
   devices?: {
     id: string
     name: string
-    battery?: number
+    battery?: number | null
     online: boolean
+    stale?: boolean
+    lastSeen?: string | null
     location: string
   }[]
   lastSync?: string
@@ -261,7 +263,7 @@ export default function IntegrationsPage() {
                           </div>
                         </div>
                         <div className="flex items-center gap-4">
-                          {device.battery !== undefined && (
+                          {device.battery != null && (
                             <div className="flex items-center gap-2 text-sm">
                               <Battery className={`w-4 h-4 ${device.battery > 50 ? 'text-green-600' : device.battery > 20 ? 'text-yellow-600' : 'text-red-600'
                                 }`} />
@@ -273,6 +275,14 @@ export default function IntegrationsPage() {
                             <span className={`font-light ${device.online ? 'text-green-700' : 'text-mono-400'}`}>
                               {device.online ? 'Online' : 'Offline'}
                             </span>
+                            {device.stale && (
+                              <span
+                                className="text-xs text-yellow-600 font-light"
+                                title={device.lastSeen ? `Last checked ${new Date(device.lastSeen).toLocaleString()}` : 'Not checked yet'}
+                              >
+                                (stale)
+                              </span>
+                            )}
                           </div>
                         </div>
                       </div>
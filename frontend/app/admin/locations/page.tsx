@@ -13,8 +13,10 @@ interface Lock {
   display_name_en: string
   display_order: number
   is_active: boolean
-  battery?: number
+  battery?: number | null
   online: boolean
+  status_checked_at?: string | null
+  status_stale?: boolean
 }
 
 interface Location {
@@ -213,7 +215,7 @@ export default function LocationsPage() {
 
                       {/* Lock Stats */}
                       <div className="flex items-center gap-6 mr-4">
-                        {lock.battery !== undefined && (
+                        {lock.battery != null && (
                           <div className="text-center">
                             <p className={`text-sm font-medium ${lock.battery > 50 ? 'text-green-600' : lock.battery > 20 ? 'text-yellow-600' : 'text-red-600'
                               }`}>
@@ -225,7 +227,12 @@ export default function LocationsPage() {
                         <div className="text-center">
                           <div className={`w-2 h-2 rounded-full mx-auto mb-1 ${lock.online ? 'bg-green-500' : 'bg-mono-300'
                             }`}></div>
-                          <p className="text-[10px] text-mono-400 uppercase tracking-wider">{lock.online ? 'Online' : 'Offline'}</p>
+                          <p
+                            className="text-[10px] text-mono-400 uppercase tracking-wider"
+                            title={lock.status_checked_at ? `Last checked ${new Date(lock.status_checked_at).toLocaleString()}` : 'Not checked yet'}
+                          >
+                            {lock.status_stale ? 'Stale' : lock.online ? 'Online' : 'Offline'}
+                          </p>
                         </div>
                       </div>
 
@@ -131,7 +131,7 @@ export default function GuestPortalPage() {
             <>
               <div className="md:col-span-2">
                 <IntercomButton
-                  bookingId={data.booking.id}
+                  token={token}
                   locale={locale}
                 />
               </div>
@@ -7,11 +7,11 @@ import { useState } from 'react'
 import { DoorOpen, Loader2 } from 'lucide-react'
 
 interface IntercomButtonProps {
-  bookingId: string
+  token: string
   locale: 'it' | 'en'
 }
 
-export default function IntercomButton({ bookingId, locale }: IntercomButtonProps) {
+export default function IntercomButton({ token, locale }: IntercomButtonProps) {
   const [loading, setLoading] = useState(false)
   const [success, setSuccess] = useState(false)
   const [error, setError] = useState(false)
@@ -23,8 +23,10 @@ export default function IntercomButton({ bookingId, locale }: IntercomButtonProp
 
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-      const response = await fetch(`${apiUrl}/api/intercom/open?booking_id=${bookingId}`, {
+      // The guest portal token identifies (and authorizes) the booking
+      const response = await fetch(`${apiUrl}/api/intercom/open`, {
         method: 'POST',
+        headers: { Authorization: `Bearer ${token}` },
       })
 
       if (response.ok) {